@@ -0,0 +1,39 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# The tests import the tools of plot_tools as the scripts do, and read the
+# logs of the repository.
+
+from pathlib import Path
+import sys
+
+import pytest
+
+PLOT_TOOLS = Path(__file__).resolve().parents[1]
+REPO = PLOT_TOOLS.parent
+
+sys.path.insert(0, str(PLOT_TOOLS))
+
+import vine_scripts
+
+
+def load_script(path):
+    # path of a plot script relative to the repository
+    return vine_scripts.load_script(REPO / path)
+
+
+@pytest.fixture
+def repo_log():
+    def log(path):
+        return str(REPO / path)
+    return log
+
+
+@pytest.fixture(scope="session")
+def synthetic_log(tmp_path_factory):
+    # a small log of vine_txn_gen.py with retries, worker failures, and libraries
+    from vine_txn_gen import generate
+    log = tmp_path_factory.mktemp("synthetic") / "transactions"
+    generate(log, tasks=600, workers=12, cores=4, retry_rate=0.1, disconnect_rate=0.01, libraries=2, seed=1)
+    return str(log)
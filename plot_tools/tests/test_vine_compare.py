@@ -0,0 +1,17 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+from vine_compare import summarize
+from vine_txn import ParseTxn
+
+
+def test_retried_tasks_are_done_once(synthetic_log):
+    (m,) = ParseTxn(synthetic_log, cache=False).managers.values()
+    retrieved = m.tasks[m.tasks["RETRIEVED"].notna()]
+    assert retrieved["task_id"].duplicated().any()
+
+    (run,) = summarize(synthetic_log, "start-manager", cache=False)
+    assert run["tasks"] == retrieved["task_id"].nunique()
+    assert len(run["done"]) == run["tasks"]
+    assert run["done"][-1] == retrieved["RETRIEVED"].max()
@@ -0,0 +1,46 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import json
+
+import numpy as np
+import pytest
+
+from vine_dashboard import view
+from vine_pyramid import read_pyramid
+
+
+@pytest.fixture(scope="module")
+def pyramid(synthetic_log):
+    return read_pyramid(synthetic_log, cache=False)
+
+
+def test_aggregate_view_of_the_whole_log(pyramid):
+    (content_type, body, headers) = view(pyramid, {"metric": ["failures"], "width": ["200"], "height": ["4"]})
+    assert content_type == "application/octet-stream"
+    header = json.loads(headers["X-View"])
+    assert header["kind"] == "aggregate" and header["metric"] == "failures"
+    values = np.frombuffer(body, dtype=np.float32).reshape(header["groups"], header["buckets"])
+    assert header["groups"] <= 4
+    # failures are counts, and every failed attempt is in some bucket
+    assert values.sum() == pytest.approx(pyramid.tasks["failed"].sum())
+
+
+def test_raw_view_of_a_short_window(pyramid):
+    start = float(np.median(pyramid.tasks["start"]))
+    (content_type, body, _) = view(pyramid, {"t0": [str(start)], "t1": [str(start + 0.001)], "width": ["1000"]})
+    assert content_type == "application/json"
+    found = json.loads(body)
+    assert found["kind"] == "raw"
+    tasks = found["tasks"]
+    assert len(tasks["start"]) > 0
+    # the tasks of the view overlap the window
+    assert all(s <= start + 0.001 and e >= start for (s, e) in zip(tasks["start"], tasks["end"]))
+
+
+def test_bad_views_are_errors(pyramid):
+    with pytest.raises(ValueError):
+        view(pyramid, {"metric": ["nope"]})
+    with pytest.raises(ValueError):
+        view(pyramid, {"t0": ["10"], "t1": ["5"]})
@@ -0,0 +1,19 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+from vine_latency import latency_report
+from vine_txn import ParseTxn
+
+
+def test_report_includes_attempts_lost_at_disconnection(repo_log):
+    (m,) = ParseTxn(repo_log("taskvine_paper/colmena/transactions_peer_enabled"), expand_waiting=True, cache=False).managers.values()
+    lost = m.tasks[m.tasks["reason"] == "DISCONNECTION"]
+    assert len(lost) == 9
+
+    rows = {row["phase"]: row for row in latency_report(m.tasks, ["all"])["all"]}
+    assert rows["queued"]["count"] == len(m.tasks)
+    assert rows["lost"]["count"] == len(lost)
+    assert rows["executing"]["count"] == m.tasks["RETRIEVED"].notna().sum()
+    expected = (lost["DISCONNECTION"] - lost["time_commit_end"]).sum()
+    assert abs(rows["lost"]["total_seconds"] - expected) < 1e-6
@@ -0,0 +1,23 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import json
+
+from vine_libraries import assign_calls, json_summary, library_stats, read_libraries, summary
+
+
+def test_calls_fit_the_slots_of_their_library(repo_log):
+    # the libraries have 1 core, and run 2 calls of 1 core on workers of 2 cores
+    ((libraries, calls),) = read_libraries(repo_log("serverless_logs/paper/200_workers_2000_tasks/transactions")).values()
+    calls = assign_calls(libraries, calls)
+    ls = library_stats(libraries, calls)
+
+    started = ls[ls["calls"] > 0]
+    assert (started["slots"] == 2).all()
+    assert (started["max_running"] <= started["slots"]).all()
+    assert (started["slot_utilization"] <= 1 + 1e-9).all()
+
+    stats = summary(ls, calls)
+    assert 0 < stats["slot_utilization_mean"] <= 1
+    json.dumps(json_summary(stats), allow_nan=False)
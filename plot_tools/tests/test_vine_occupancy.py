@@ -0,0 +1,24 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import numpy as np
+
+from vine_latency import attempt_cores
+from vine_occupancy import integrate, occupancy
+from vine_txn import ParseTxn
+
+
+def test_committed_includes_attempts_lost_at_disconnection(repo_log):
+    # the cores of an attempt lost when its worker disconnected stay
+    # committed until the disconnection
+    log = repo_log("taskvine_paper/colmena/transactions_peer_enabled")
+    (retrieved,) = ParseTxn(log, cache=False).managers.values()
+    (m,) = ParseTxn(log, expand_waiting=True, cache=False).managers.values()
+    lost = m.tasks[m.tasks["reason"] == "DISCONNECTION"]
+    assert len(lost) == 9
+
+    expected = ((lost["DISCONNECTION"] - lost["RUNNING"]).to_numpy(dtype=float) * attempt_cores(lost)).sum()
+    df = occupancy(m)
+    assert np.isclose(integrate(df, "committed") - integrate(occupancy(retrieved), "committed"), expected)
+    assert np.isclose(integrate(df, "executing"), integrate(occupancy(retrieved), "executing"))
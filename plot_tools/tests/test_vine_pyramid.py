@@ -0,0 +1,24 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import numpy as np
+
+from vine_pyramid import read_pyramid
+from vine_txn import ParseTxn
+
+
+def test_index_includes_attempts_lost_at_disconnection(repo_log):
+    log = repo_log("taskvine_paper/colmena/transactions_peer_enabled")
+    (m,) = ParseTxn(log, expand_waiting=True, cache=False).managers.values()
+    lost = m.tasks[m.tasks["reason"] == "DISCONNECTION"]
+    assert len(lost) == 9
+
+    p = read_pyramid(log, cache=False)
+    assert len(p.tasks["start"]) == len(m.tasks)
+    assert set(lost["task_id"]) <= set(p.tasks["task_id"][p.tasks["failed"]])
+
+    # lost attempts are busy until the disconnection of their worker
+    lost_ends = np.sort(lost["DISCONNECTION"].to_numpy(dtype=float))
+    assert np.isin(lost_ends, p.tasks["end"][p.tasks["failed"]]).all()
+    assert p.levels[-1]["failures"].sum() == p.tasks["failed"].sum()
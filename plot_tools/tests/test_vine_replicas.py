@@ -0,0 +1,37 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import pandas as pd
+
+from vine_replicas import file_stats, replicate
+
+
+def transfers(rows):
+    return pd.DataFrame(rows, columns=["direction", "filename", "filetype", "worker_id", "start_time", "wall_time", "size"])
+
+
+def test_fetches_with_a_copy_available_are_redundant():
+    name = "url-md5-0123456789abcdef"
+    xs = transfers([
+        ("INPUT", name, "url", "worker-a", 0.0, 1.0, 10.0),
+        # worker-a has a copy from time 1
+        ("INPUT", name, "url", "worker-b", 2.0, 1.0, 10.0),
+        # worker-b is gone at 4 and worker-a at 5, no copy is left
+        ("INPUT", name, "url", "worker-c", 6.0, 1.0, 10.0),
+        # cache hit of worker-c, nothing moved
+        ("INPUT", name, "url", "worker-c", 8.0, 0.0, 10.0),
+        ("OUTPUT", "out", "file", "worker-c", 9.0, 1.0, 1.0),
+    ])
+    workers = pd.DataFrame({"worker_id": ["worker-a", "worker-b", "worker-c"], "DISCONNECTION": [5.0, 4.0, None]})
+    (fetches, copies) = replicate(xs, workers, termination=10.0)
+
+    assert len(fetches) == 4
+    assert fetches["copies_available"].tolist() == [0, 1, 0, 0]
+    assert fetches["redundant"].tolist() == [False, True, False, False]
+    assert copies["worker_id"].tolist() == ["worker-a", "worker-b", "worker-c"]
+    assert copies["gone"].tolist() == [5.0, 4.0, 10.0]
+
+    (f,) = file_stats(fetches, copies).itertuples()
+    assert (f.fetches, f.workers, f.redundant, f.MB_moved, f.MB_redundant) == (3, 3, 1, 30.0, 10.0)
+    assert f.max_copies == 2
@@ -0,0 +1,24 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import pytest
+
+from vine_sim import read_workload, simulate
+
+
+@pytest.mark.parametrize("path", ["taskvine_paper/blast/cold", "taskvine_paper/colmena/transactions_peer_enabled"])
+def test_replay_on_own_workers_gives_log_makespan(repo_log, path):
+    w = read_workload(repo_log(path), cache=False)
+    for transfers in ["manager", "peer"]:
+        r = simulate(w, workers=w.workers, cores=w.worker_cores, transfers=transfers)
+        assert r["makespan"] == pytest.approx(w.makespan, rel=0.1)
+
+
+def test_more_workers_are_faster(repo_log):
+    # the urls and minitasks of blast are fetched and run by each worker, and
+    # do not use the manager link
+    w = read_workload(repo_log("taskvine_paper/blast/cold"), cache=False)
+    makespans = [simulate(w, workers=n, cores=w.worker_cores)["makespan"] for n in [50, 200, 700]]
+    assert makespans == sorted(makespans, reverse=True)
+    assert simulate(w, workers=100, cores=w.worker_cores)["manager_MB"] < 1000
@@ -0,0 +1,42 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import json
+
+from vine_trace import export
+from vine_txn import ParseTxn
+
+
+def test_json_trace_has_a_slice_per_attempt(synthetic_log, tmp_path):
+    output = tmp_path / "trace.json"
+    export(synthetic_log, str(output))
+    with open(output) as f:
+        events = json.load(f)["traceEvents"]
+
+    (m,) = ParseTxn(synthetic_log, expand_waiting=True, cache=False).managers.values()
+    attempts = [e for e in events if e["ph"] == "X" and e["name"].startswith("task ")]
+    assert len(attempts) == len(m.tasks)
+    assert all(e["dur"] >= 0 for e in events if e["ph"] == "X")
+    # each flow that starts at a source also ends at a worker
+    starts = {e["id"] for e in events if e["ph"] == "s"}
+    ends = {e["id"] for e in events if e["ph"] == "f"}
+    assert starts == ends
+
+
+def test_perfetto_trace_is_a_sequence_of_packets(synthetic_log, tmp_path):
+    output = tmp_path / "trace.pftrace"
+    export(synthetic_log, str(output))
+    data = output.read_bytes()
+    # every Trace.packet is field 1, length delimited, up to the end of the file
+    (i, packets) = (0, 0)
+    while i < len(data):
+        assert data[i] == 0x0a
+        (size, shift, i) = (0, 0, i + 1)
+        while True:
+            size |= (data[i] & 0x7f) << shift
+            (shift, i) = (shift + 7, i + 1)
+            if data[i - 1] < 0x80:
+                break
+        (i, packets) = (i + size, packets + 1)
+    assert i == len(data) and packets > 1
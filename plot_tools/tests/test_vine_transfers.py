@@ -0,0 +1,41 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import numpy as np
+
+from vine_transfers import read_transfers
+from vine_txn import ParseTxn
+from vine_txn import ParseTxn
+
+
+def test_old_and_current_transfer_formats(tmp_path):
+    # the old records (MB, seconds, no start time) give the same values as
+    # the current ones (bytes, microseconds, start time)
+    log = tmp_path / "transactions"
+    log.write_text("\n".join([
+        "1000000000 7 MANAGER 7 START",
+        "1000000000 7 WORKER worker-1 CONNECTION h:1",
+        "1001000000 7 TASK 1 WAITING default FIRST_RESOURCES 1 {}",
+        "1001000000 7 TASK 1 RUNNING worker-1 FIRST_RESOURCES {}",
+        "1002000000 7 WORKER worker-1 CACHE_UPDATE url-a 2.5 0.5",
+        "1003000000 7 WORKER worker-1 TRANSFER INPUT file-b 1.25 0.25",
+        "1004000000 7 WORKER worker-1 CACHE_UPDATE url-a 2500000 500000 1003500000",
+        "1005000000 7 WORKER worker-1 TRANSFER INPUT file-b 1250000 250000 1004750000",
+        "1006000000 7 TASK 1 RETRIEVED SUCCESS 0 {} {\"time_worker_start\":[1001.5,\"s\"],\"time_worker_end\":[1005.5,\"s\"]}",
+        "1006000000 7 TASK 1 DONE SUCCESS 0",
+        "1006000000 7 MANAGER 7 END",
+    ]) + "\n")
+
+    (xs,) = read_transfers(log).values()
+    assert list(xs["direction"]) == ["CACHE_UPDATE", "INPUT"] * 2
+    assert list(xs["filetype"]) == ["url", "file"] * 2
+    assert np.allclose(xs["time"], [2, 3, 4, 5])
+    assert np.allclose(xs["size"], [2.5, 1.25] * 2)
+    assert np.allclose(xs["wall_time"], [0.5, 0.25] * 2)
+    assert np.allclose(xs["start_time"], [1.5, 2.75, 3.5, 4.75])
+
+    # and the parser reads them as well
+    (m,) = ParseTxn(str(log), cache=False).managers.values()
+    columns = ["time", "size", "wall_time", "start_time"]
+    assert np.allclose(m.transfers[columns], xs[columns])
@@ -0,0 +1,51 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import numpy as np
+import pytest
+
+from conftest import load_script
+from vine_txn import ParseTxn
+
+
+def test_library_wall_time_after_complete_tasks(repo_log):
+    # plot_gmo keeps library tasks on their workers until the manager
+    # terminates, and their measured wall time is taken from those times, as
+    # the plot script did before using the shared parser.
+    plot_gmo = load_script("taskvine_paper/gmo/plot_gmo")
+    p = plot_gmo.LibraryParseTxn(repo_log("taskvine_paper/gmo/transactions"), cache=False)
+    (m,) = p.managers.values()
+    libraries = m.tasks[m.tasks["library"] > 0]
+
+    assert len(libraries) == 201
+    assert (libraries["time_worker_end"] == m.termination).all()
+    expected = m.termination - libraries["time_worker_start"]
+    assert np.allclose(libraries["measured_wall_time"], expected)
+    assert np.isclose(libraries["measured_wall_time"].iloc[0], 651.85, atol=0.01)
+
+
+def test_old_waiting_format_counts_attempts(tmp_path):
+    # old logs write WAITING without the attempt number
+    log = tmp_path / "transactions"
+    log.write_text("\n".join([
+        "1000000000 7 MANAGER 7 START",
+        "1000000000 7 WORKER worker-1 CONNECTION h:1",
+        "1001000000 7 TASK 1 WAITING default FIRST_RESOURCES {}",
+        "1001000000 7 TASK 1 RUNNING worker-1 FIRST_RESOURCES {}",
+        "1002000000 7 TASK 1 RETRIEVED RESOURCE_EXHAUSTION 0 {} {}",
+        "1002000000 7 TASK 1 WAITING default MAX_RESOURCES {}",
+        "1002000000 7 TASK 1 RUNNING worker-1 MAX_RESOURCES {}",
+        '1004000000 7 TASK 1 RETRIEVED SUCCESS 0 {} {"time_worker_start":[1002.5,"s"],"time_worker_end":[1003.5,"s"]}',
+        "1004000000 7 TASK 1 DONE SUCCESS 0",
+        "1004000000 7 MANAGER 7 END",
+    ]) + "\n")
+    (m,) = ParseTxn(str(log), cache=False).managers.values()
+    assert list(m.tasks["attempt_number"]) == [1, 2]
+    assert list(m.tasks["reason"]) == ["RESOURCE_EXHAUSTION", "SUCCESS"]
+
+
+def test_oldest_format_is_unsupported(repo_log, capsys):
+    with pytest.raises(SystemExit):
+        ParseTxn(repo_log("blast_base_caching_logs/base_runs/blast_caching_50_workers_run_11_tr.log"), cache=False)
+    assert "Unsupported format" in capsys.readouterr().out
@@ -0,0 +1,29 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import pandas as pd
+import pytest
+
+from vine_txn import ParseTxn
+
+
+@pytest.mark.parametrize("start", [50, 200])
+def test_time_window_drops_libraries_done_before_it(repo_log, start):
+    # the libraries of this log are DONE before their LIBRARY STARTED record,
+    # which is dropped with the rest of the task when before the window
+    log = repo_log("taskvine_paper/gmo/transactions")
+    (full,) = ParseTxn(log, cache=False).managers.values()
+    (m,) = ParseTxn(log, cache=False, filter_spec=f"time={start}:").managers.values()
+
+    ends = full.tasks[["RETRIEVED", "DONE", "DISCONNECTION", "time_worker_end"]].astype(float).max(axis=1)
+    expected = full.tasks[~(ends < start)].drop(columns="slot").reset_index(drop=True)
+    pd.testing.assert_frame_equal(m.tasks.drop(columns="slot").reset_index(drop=True), expected)
+
+
+def test_time_window_with_end_on_libraries(repo_log):
+    (m,) = ParseTxn(repo_log("taskvine_paper/gmo/transactions"), cache=False, filter_spec="time=50:100").managers.values()
+    ends = m.tasks[["RETRIEVED", "DONE", "DISCONNECTION", "time_worker_end"]].astype(float).max(axis=1)
+    assert len(m.tasks) > 0
+    assert (ends >= 50).all()
+    assert (m.tasks["last_state_time"] < 100).all()
@@ -0,0 +1,79 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load_script
+
+
+def follow_in_chunks(parser_class, log, tmp_path, chunks, **options):
+    # parse a copy of the log that is written a chunk of lines at a time
+    lines = open(log).readlines()
+    partial = tmp_path / "transactions"
+    partial.write_text("")
+    parser = None
+    for chunk in np.array_split(np.arange(len(lines)), chunks):
+        with open(partial, "a") as f:
+            f.writelines(lines[i] for i in chunk)
+        if parser is None:
+            parser = parser_class(str(partial), follow=True, cache=False, **options)
+        else:
+            parser.update()
+    return parser
+
+
+def by_attempt(tasks):
+    return tasks.sort_values(["task_id", "attempt_number"], ignore_index=True)
+
+
+def assert_slots_disjoint(tasks, start):
+    for (_, ts) in tasks.groupby(["worker_id", "slot"]):
+        ts = ts.sort_values(start)
+        assert (ts[start].to_numpy()[1:] >= ts["time_worker_end"].to_numpy()[:-1]).all()
+
+
+@pytest.mark.parametrize("expand_waiting", [False, True])
+def test_follow_tables_equal_full_parse(repo_log, tmp_path, expand_waiting):
+    # the tables updated while following are those of parsing the whole log,
+    # besides the order of the rows and the slots of the attempts
+    plot_gmo = load_script("taskvine_paper/gmo/plot_gmo")
+    log = repo_log("taskvine_paper/gmo/transactions")
+    full = plot_gmo.LibraryParseTxn(log, expand_waiting, cache=False)
+    followed = follow_in_chunks(plot_gmo.LibraryParseTxn, log, tmp_path, 7, expand_waiting=expand_waiting)
+
+    (m,) = full.managers.values()
+    (f,) = followed.managers.values()
+    expected = by_attempt(m.tasks)
+    tasks = by_attempt(f.tasks)
+    pd.testing.assert_frame_equal(tasks.drop(columns="slot"), expected.drop(columns="slot"))
+    assert_slots_disjoint(tasks, "RUNNING" if expand_waiting else "time_worker_start")
+
+    pd.testing.assert_frame_equal(f.workers.sort_values("CONNECTION", ignore_index=True),
+                                  m.workers.sort_values("CONNECTION", ignore_index=True))
+    columns = list(m.transfers.columns)
+    pd.testing.assert_frame_equal(f.transfers.sort_values(columns, ignore_index=True),
+                                  m.transfers.sort_values(columns, ignore_index=True))
+
+
+def test_follow_keeps_slots_of_placed_attempts(repo_log, tmp_path):
+    # attempts keep their slot once placed, so bars do not move between refreshes
+    plot_gmo = load_script("taskvine_paper/gmo/plot_gmo")
+    log = repo_log("taskvine_paper/gmo/transactions")
+    lines = open(log).readlines()
+    half = len(lines) // 2
+    partial = tmp_path / "transactions"
+    partial.write_text("".join(lines[:half]))
+
+    parser = plot_gmo.LibraryParseTxn(str(partial), follow=True, cache=False)
+    (m,) = parser.managers.values()
+    placed = m.tasks[m.tasks["library"].isna()].set_index(["task_id", "attempt_number"])["slot"]
+
+    with open(partial, "a") as f:
+        f.writelines(lines[half:])
+    assert parser.update()
+    assert len(m.tasks) > len(placed)
+    slots = m.tasks.set_index(["task_id", "attempt_number"])["slot"]
+    assert (slots.loc[placed.index] == placed).all()
@@ -0,0 +1,30 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+from vine_txn_gen import generate
+
+
+def test_no_worker_lines_after_disconnection(tmp_path):
+    log = tmp_path / "transactions"
+    generate(log, tasks=2000, workers=20, disconnect_rate=0.05, libraries=5, seed=3)
+
+    disconnected = set()
+    library_worker = {}
+    lost = 0
+    for line in open(log):
+        if line.startswith("#"):
+            continue
+        (_, _, subject, target, rest) = line.split(maxsplit=4)
+        if subject == "WORKER":
+            assert target not in disconnected, line
+            if rest.startswith("DISCONNECTION"):
+                disconnected.add(target)
+                lost += rest.startswith("DISCONNECTION FAILURE")
+        elif subject == "LIBRARY":
+            (event, worker) = rest.split()
+            if event == "SENT":
+                library_worker[target] = worker
+            elif event == "STARTED":
+                assert library_worker[target] not in disconnected, line
+    assert lost > 0
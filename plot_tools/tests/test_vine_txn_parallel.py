@@ -0,0 +1,29 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import pandas as pd
+import pytest
+
+from vine_txn import ParseTxn
+from vine_txn_parallel import line_ranges, range_lines
+
+
+def test_line_ranges_split_at_lines(synthetic_log):
+    lines = open(synthetic_log).read().split("\n")[:-1]
+    ranges = line_ranges(synthetic_log, 7)
+    assert len(ranges) == 7
+    assert [line for (start, end) in ranges for line in range_lines(synthetic_log, start, end, chunk_size=1000)] == lines
+
+
+@pytest.mark.parametrize("filter_spec", [None, "time=20:60 reason=SUCCESS"])
+def test_parallel_tables_equal_sequential(synthetic_log, filter_spec):
+    # without a filter the log is split into byte ranges, with a filter every
+    # process reads the whole log
+    sequential = ParseTxn(synthetic_log, cache=False, filter_spec=filter_spec)
+    parallel = ParseTxn(synthetic_log, cache=False, jobs=3, filter_spec=filter_spec)
+    assert list(parallel.managers) == list(sequential.managers)
+    for (a, b) in zip(sequential.managers.values(), parallel.managers.values()):
+        assert a.termination == b.termination
+        for table in ["tasks", "workers", "transfers"]:
+            pd.testing.assert_frame_equal(getattr(b, table), getattr(a, table))
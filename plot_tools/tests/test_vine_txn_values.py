@@ -0,0 +1,28 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import math
+
+from vine_txn_values import ValueDecoder
+
+
+def test_decoder_values_of_names():
+    decoder = ValueDecoder(["cores", "memory", "disk", "gpus"])
+    values = decoder.decode('{"cores":[4,"cores"],"memory":[-1,"MB"],"disk":[250.5,"MB"]}')
+    assert list(values) == ["cores", "memory", "disk", "gpus"]
+    assert values["cores"] == 4 and values["disk"] == 250.5
+    # negative and missing values are NaN
+    assert math.isnan(values["memory"]) and math.isnan(values["gpus"])
+
+
+def test_decoder_reuses_decoded_objects():
+    decoder = ValueDecoder(["cores"], cache_size=2)
+    blob = '{"cores":[1,"cores"]}'
+    assert decoder.decode(blob) is decoder.decode(blob)
+    # evicted objects are decoded again, to the same values
+    first = decoder.decode(blob)
+    decoder.decode('{"cores":[2,"cores"]}')
+    decoder.decode('{"cores":[3,"cores"]}')
+    again = decoder.decode(blob)
+    assert again is not first and again == first
@@ -0,0 +1,55 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+import pandas as pd
+
+from vine_txn import ParseTxn
+
+RESOURCES = '{"cores":[1,"cores"]}'
+REPORT = '{"time_worker_start":[4.0,"s"],"time_worker_end":[5.0,"s"],"time_commit_start":[3.5,"s"],"time_commit_end":[3.6,"s"]}'
+
+LOG = f"""1000000 1 MANAGER 1 START 0
+1000000 1 WORKER worker-a CONNECTION 10.0.0.1:9000
+1000000 1 WORKER worker-b CONNECTION 10.0.0.2:9000
+2000000 1 TASK 1 WAITING default FIRST_RESOURCES 1 {RESOURCES}
+2000000 1 TASK 2 WAITING default FIRST_RESOURCES 1 {RESOURCES}
+2000000 1 TASK 3 WAITING default FIRST_RESOURCES 1 {RESOURCES}
+2000000 1 TASK 4 WAITING default FIRST_RESOURCES 1 {RESOURCES}
+3000000 1 TASK 1 RUNNING worker-a FIRST_RESOURCES {RESOURCES}
+3000000 1 TASK 2 RUNNING worker-b FIRST_RESOURCES {RESOURCES}
+3000000 1 TASK 3 RUNNING worker-b FIRST_RESOURCES {RESOURCES}
+3000000 1 TASK 4 RUNNING worker-a FIRST_RESOURCES {RESOURCES}
+4000000 1 TASK 3 DONE UNKNOWN -1
+6000000 1 TASK 4 RETRIEVED SUCCESS 0 {{}} {REPORT}
+6000000 1 TASK 4 DONE SUCCESS 0
+7000000 1 WORKER worker-a DISCONNECTION FAILURE
+8000000 1 WORKER worker-b DISCONNECTION FAILURE
+9000000 1 MANAGER 1 END 0
+"""
+
+
+def parse(tmp_path):
+    log = tmp_path / "transactions"
+    log.write_text(LOG)
+    (m,) = ParseTxn(str(log), expand_waiting=True, cache=False).managers.values()
+    return m.tasks.set_index("task_id")
+
+
+def test_disconnection_loses_only_the_tasks_of_its_worker(tmp_path):
+    # task 2 is still running on worker-b after worker-a disconnects
+    tasks = parse(tmp_path)
+    assert tasks.loc[1, "reason"] == "DISCONNECTION"
+    assert tasks.loc[1, "DISCONNECTION"] == 6
+    assert tasks.loc[2, "reason"] == "DISCONNECTION"
+    assert tasks.loc[2, "DISCONNECTION"] == 7
+
+
+def test_done_tasks_are_not_lost_at_disconnection(tmp_path):
+    # task 3 is done without being retrieved, as libraries, before its worker
+    # disconnects
+    tasks = parse(tmp_path)
+    assert tasks.loc[3, "last_state"] == "DONE"
+    assert pd.isna(tasks.loc[3, "DISCONNECTION"])
+    assert tasks.loc[3, "reason"] != "DISCONNECTION"
+    assert tasks.loc[4, "reason"] == "SUCCESS"
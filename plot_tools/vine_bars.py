@@ -0,0 +1,57 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Horizontal bars drawn as one collection per style.
+#
+# Drawing each task, transfer, and worker lifetime with barh creates one
+# matplotlib patch per bar, which is slow to draw and makes large vector
+# outputs. BarLayers collects the bars of a plot instead, and draws all the
+# bars with the same colors and line width as a single PolyCollection.
+#
+# Layers are drawn in the order their first bar was added, so a plot that
+# adds its bars by groups (e.g. by worker) should add the styles in the same
+# order for every group. Bars of a layer may be rasterized, so that the size
+# of pdf or svg outputs depends on the resolution and not on the number of bars.
+
+import numpy as np
+
+
+class BarLayers:
+    def __init__(self, rasterized=False):
+        self.rasterized = rasterized
+        # (facecolor, edgecolor, linewidth) -> list of (y, left, width, height) arrays
+        self.layers = {}
+
+    def add(self, y, left, width, color, height=0.8, linewidth=0.5, edgecolor=None, align="edge"):
+        # arguments as for matplotlib's barh. edgecolor None is the same as color.
+        (y, left, width, height) = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (y, left, width, height)))
+        if align == "center":
+            y = y - height/2
+
+        # the layer is created even without bars, to keep the order of the styles
+        key = (color, edgecolor if edgecolor else color, linewidth)
+        self.layers.setdefault(key, []).append((y.ravel(), left.ravel(), width.ravel(), height.ravel()))
+
+    def draw(self, ax):
+        # adds a collection per layer to ax, and clears the layers.
+        if not self.layers:
+            return
+        from matplotlib.collections import PolyCollection
+
+        for ((facecolor, edgecolor, linewidth), bars) in self.layers.items():
+            (y, left, width, height) = (np.concatenate(v) for v in zip(*bars))
+            shown = ~(np.isnan(y) | np.isnan(left) | np.isnan(width) | np.isnan(height))
+            (y, left, width, height) = (y[shown], left[shown], width[shown], height[shown])
+
+            # corners of the rectangles, counterclockwise from (left, y)
+            verts = np.empty((len(y), 4, 2))
+            verts[:, 0] = np.column_stack([left, y])
+            verts[:, 1] = np.column_stack([left + width, y])
+            verts[:, 2] = np.column_stack([left + width, y + height])
+            verts[:, 3] = np.column_stack([left, y + height])
+
+            bars = PolyCollection(verts, facecolors=facecolor, edgecolors=edgecolor, linewidths=linewidth, rasterized=self.rasterized)
+            ax.add_collection(bars, autolim=True)
+        self.layers = {}
+        ax.autoscale_view()
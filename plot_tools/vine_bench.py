@@ -0,0 +1,250 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Benchmark of the stages of the plotting tools on synthetic logs of
+# increasing size, written by vine_txn_gen.py.
+#
+# Stages:
+#   generate   writing the synthetic log
+#   read       reading and tokenizing the lines of the log
+#   parse      ParseTxn, without making the tables
+#   tables     making the tables, without assigning slots
+#   slots      assigning the task attempts to the slots of their worker
+#   render     drawing the workers view of a plot script to a png
+#
+# Each size runs in its own process, so that its peak memory is measured
+# independently of the other sizes. The results are written as json, one row
+# per size and stage, so that runs of different versions can be compared
+# with --compare.
+#
+# Running the program:
+#   python vine_bench.py [--sizes 10000,100000,1000000] [--output bench.json] [--compare old.json]
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from vine_txn import Manager, ParseTxn, PARSER_VERSION, read_events
+from vine_txn_gen import generate
+from vine_scripts import load_script
+
+stages = ["generate", "read", "parse", "tables", "slots", "render"]
+
+default_script = Path(__file__).resolve().parents[1] / "taskvine_paper" / "colmena" / "plot_colmena"
+
+
+def generator_options(n, seed):
+    # options of vine_txn_gen for a log of n tasks
+    return {"tasks": n, "workers": min(10000, max(10, n // 100)), "cores": 4,
+            "retry_rate": 0.05, "disconnect_rate": 0.001, "libraries": 10,
+            "inputs": 1, "cached": 1, "files": 10, "seed": seed}
+
+
+class StagedManager(Manager):
+    # makes the tables only when asked after parsing, and assigns the slots
+    # separately, so that each stage is measured on its own.
+    def __init__(self, manager_pid, origin):
+        super().__init__(manager_pid, origin)
+        self.expand_waiting = None
+        self.unassigned = None
+
+    def make_tables(self, expand_waiting):
+        self.expand_waiting = expand_waiting
+
+    def make_tables_now(self):
+        super().make_tables(self.expand_waiting)
+
+    def assign_slots(self, ts, expand_waiting):
+        self.unassigned = ts
+        return ts
+
+    def assign_slots_now(self):
+        self.tasks = super().assign_slots(self.unassigned, self.expand_waiting)
+
+
+class StagedParseTxn(ParseTxn):
+    manager_class = StagedManager
+
+
+def max_rss_mb():
+    # peak resident memory of this process so far. ru_maxrss is in KB in linux, and in bytes in macos.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / (1 << 10)
+
+
+def run_stages(log, selected, script, trace_memory, jobs=1):
+    # runs in its own process. Returns {stage: {"seconds", "peak_mb"}} for the
+    # selected stages besides generate. The stages run one after the other,
+    # and peak_mb is the peak of the memory allocated during the stage with
+    # trace_memory, or the peak resident memory of the process at the end of
+    # the stage otherwise.
+    results = {}
+
+    def measure(stage, f):
+        if trace_memory:
+            tracemalloc.start()
+        t = time.perf_counter()
+        value = f()
+        results[stage] = {"seconds": time.perf_counter() - t}
+        if trace_memory:
+            results[stage]["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+            tracemalloc.stop()
+        else:
+            results[stage]["peak_mb"] = max_rss_mb()
+        return value
+
+    if "read" in selected:
+        measure("read", lambda: sum(1 for _ in read_events(log)))
+
+    p = None
+    if {"parse", "tables", "slots", "render"} & set(selected):
+        p = measure("parse", lambda: StagedParseTxn(log, cache=False, jobs=jobs))
+        managers = [m for m in p.managers.values() if m.expand_waiting is not None]
+        measure("tables", lambda: [m.make_tables_now() for m in managers])
+        measure("slots", lambda: [m.assign_slots_now() for m in managers])
+
+    if "render" in selected:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        module = load_script(script)
+        with tempfile.TemporaryDirectory() as tmp:
+            args = module.argument_parser().parse_args([log, str(Path(tmp) / "workers.png"), "--mode", "workers", "--dpi", "100", "--no-cache"])
+
+            def render():
+                plot = module.plot_modes["workers"](p.managers, args)
+                plt.close(plot.fig)
+            measure("render", render)
+
+    return {stage: r for (stage, r) in results.items() if stage in selected}
+
+
+def benchmark(sizes, selected, directory, seed=0, script=default_script, trace_memory=False, keep=False, jobs=1):
+    rows = []
+    for n in sizes:
+        options = generator_options(n, seed)
+        log = Path(directory) / f"synthetic_{n}_{seed}.log"
+
+        row = {"tasks": n, "workers": options["workers"]}
+        if "generate" in selected or not log.exists():
+            t = time.perf_counter()
+            generate(log, **options)
+            if "generate" in selected:
+                rows.append(dict(row, stage="generate", seconds=time.perf_counter() - t, peak_mb=None))
+                print_row(rows[-1])
+        row["log_mb"] = log.stat().st_size / 1e6
+
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results = pool.submit(run_stages, str(log), selected, script, trace_memory, jobs).result()
+        for stage in stages:
+            if stage in results:
+                rows.append(dict(row, stage=stage, **results[stage]))
+                print_row(rows[-1])
+
+        if not keep:
+            log.unlink()
+    return rows
+
+
+def print_row(row):
+    peak = f"{row['peak_mb']:>10.1f}" if row.get("peak_mb") is not None else f"{'':>10}"
+    print(f"{row['tasks']:>10} {row['stage']:>10} {row['seconds']:>10.3f} {peak} {1e6 * row['seconds'] / row['tasks']:>10.2f}", flush=True)
+
+
+def version():
+    # git description of the tree of this file, if available
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import matplotlib
+    import numpy
+    import pandas
+    return {"version": version(),
+            "parser_version": PARSER_VERSION,
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "matplotlib": matplotlib.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+def compare(rows, previous, tolerance, trace_memory=False, jobs=1):
+    # prints the ratio of the seconds of each (tasks, stage) to a previous
+    # run. Returns the number of stages slower than tolerance times before.
+    before = {(r["tasks"], r["stage"]): r for r in previous["results"]}
+    print(f"\ncompared to {previous['environment'].get('version')} ({previous['environment'].get('date')})")
+    if previous.get("trace_memory") != trace_memory:
+        print("warning: only one of the runs traced memory, which makes the stages slower")
+    if previous.get("jobs", 1) != jobs:
+        print(f"warning: the runs parsed with {previous.get('jobs', 1)} and {jobs} jobs")
+    print(f"{'tasks':>10} {'stage':>10} {'before':>10} {'now':>10} {'ratio':>8}")
+    slower = 0
+    for r in rows:
+        b = before.get((r["tasks"], r["stage"]))
+        if not b or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        mark = ""
+        if ratio > tolerance:
+            mark = " slower"
+            slower += 1
+        print(f"{r['tasks']:>10} {r['stage']:>10} {b['seconds']:>10.3f} {r['seconds']:>10.3f} {ratio:>8.2f}{mark}")
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark parsing, making tables, assigning slots, and rendering on synthetic transaction logs.')
+    parser.add_argument('--sizes', help='comma separated number of tasks of the logs', default="10000,100000,1000000")
+    parser.add_argument('--stages', help=f"comma separated stages to run, from: {', '.join(stages)}", default=",".join(stages))
+    parser.add_argument('--seed', type=int, help='seed of the synthetic logs', default=0)
+    parser.add_argument('--dir', help='directory for the synthetic logs. Default is a temporary directory.', default=None)
+    parser.add_argument('--keep', action='store_true', help='keep the synthetic logs in --dir, and reuse them if they exist and generate is not a stage')
+    parser.add_argument('--script', help='plot script used by the render stage', default=str(default_script))
+    parser.add_argument('--trace-memory', action='store_true', help='measure the peak memory allocated by each stage with tracemalloc (slower), instead of the peak resident memory of the process')
+    parser.add_argument('--jobs', type=int, help='number of processes of the parse stage', default=1)
+    parser.add_argument('--output', help='json file for the results', default=None)
+    parser.add_argument('--compare', help='json file of a previous run to compare against', default=None)
+    parser.add_argument('--tolerance', type=float, help='with --compare, exit with an error if a stage takes more than this times as long as before', default=1.25)
+    args = parser.parse_args()
+
+    selected = args.stages.split(",")
+    for stage in selected:
+        if stage not in stages:
+            parser.error(f"unknown stage {stage}")
+    if args.keep and not args.dir:
+        parser.error("--keep needs --dir")
+
+    print(f"{'tasks':>10} {'stage':>10} {'seconds':>10} {'peak_mb':>10} {'us/task':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = benchmark([int(n) for n in args.sizes.split(",")], selected, args.dir or tmp, args.seed,
+                         args.script, args.trace_memory, args.keep, args.jobs)
+
+    report = {"environment": environment(), "seed": args.seed, "trace_memory": args.trace_memory, "jobs": args.jobs, "results": rows}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(rows, previous, args.tolerance, args.trace_memory, args.jobs):
+            sys.exit(1)
@@ -0,0 +1,35 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Cumulative curves of events over time, with a bounded number of points.
+#
+# Plotting one point per event makes huge lines for logs with millions of
+# transfers. Instead, the curve is sampled at the edges of time buckets. The
+# edges are the union of evenly spaced times and the times of every
+# n/resolution-th event, so that the curve is off by at most one bucket in
+# time and by at most 1/resolution in fraction of events, both on long quiet
+# periods and on bursts of events.
+
+import numpy as np
+
+DEFAULT_RESOLUTION = 2000
+
+
+def cumulative_curve(times, resolution=DEFAULT_RESOLUTION):
+    # times: times of the events, in any order. NaN times are ignored.
+    # resolution: number of buckets, or 0 for one point per event.
+    # Returns (xs, ys), with ys the fraction of events at or before xs.
+    times = np.asarray(times, dtype=float)
+    times = np.sort(times[~np.isnan(times)])
+    n = len(times)
+
+    if resolution <= 0 or n <= resolution:
+        return (times, np.arange(1, n + 1) / max(1, n))
+
+    by_time = np.linspace(times[0], times[-1], resolution + 1)
+    by_count = times[np.linspace(0, n - 1, resolution + 1).astype(np.int64)]
+    edges = np.union1d(by_time, by_count)
+
+    counts = np.searchsorted(times, edges, side="right")
+    return (edges, counts / n)
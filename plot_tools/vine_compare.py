@@ -0,0 +1,179 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Comparison of runs of the same workflow with different configurations.
+#
+# Each transaction log is parsed in its own process (using the cache of
+# vine_txn when available), and summarized as the completion times of its
+# tasks. The runs are aligned on the chosen origin, and their cumulative task
+# completion (makespan) and throughput curves are drawn on the same axes. A
+# table compares the makespan, mean task wall time, share of time spent in
+# transfers, and the speedup of each run against a baseline run.
+#
+# Running the program:
+#   python vine_compare.py <log>... [-o output] [--names a,b,...] [--baseline name] [--origin ...]
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import os
+import numpy as np
+
+from vine_buckets import DEFAULT_RESOLUTION, cumulative_curve
+from vine_lazy import plt, use_backend
+from vine_txn import ParseTxn
+
+origins = ["dispatched-first-task", "waiting-first-task", "connected-first-worker", "start-manager"]
+
+
+def determine_origin(m, spec):
+    # as the --origin of the plot scripts, in seconds from the manager start
+    if spec == "dispatched-first-task":
+        return m.tasks["time_commit_start"].min()
+    if spec == "waiting-first-task":
+        return m.tasks["WAITING"].min()
+    if spec == "connected-first-worker":
+        return m.workers["CONNECTION"].min()
+    return 0
+
+
+def summarize(log, origin_spec, cache=True):
+    # runs in a process of the pool. Returns a list with the summary of each
+    # manager in log, with only numpy arrays and numbers to send back.
+    runs = []
+    for m in ParseTxn(log, cache=cache).managers.values():
+        ts = m.tasks
+        origin = determine_origin(m, origin_spec)
+        if origin != origin:
+            origin = 0   # NaN, e.g. no workers connected
+
+        done = ts[~ts["RETRIEVED"].isna()]
+        execution = (done["time_worker_end"] - done["time_worker_start"]).to_numpy(dtype=float)
+
+        # time to get the inputs of the task to the worker, and the outputs back to the manager
+        transfers = (done["time_worker_start"] - done["time_commit_start"] + done["time_output_mgr"].fillna(0)).to_numpy(dtype=float)
+
+        # a task is done when its last attempt is retrieved, so that retried
+        # tasks are counted once
+        finished = done.groupby("task_id")["RETRIEVED"].max().to_numpy(dtype=float)
+
+        runs.append({"pid": m.pid,
+                     "tasks": len(finished),
+                     "done": np.sort(finished - origin),
+                     "mean_wall_time": float(np.nanmean(execution)) if len(execution) else float("nan"),
+                     "transfer_time": float(np.nansum(transfers)),
+                     "execution_time": float(np.nansum(execution))})
+    return runs
+
+
+def run_names(logs, names=None):
+    # names of the runs: given, or the names of the logs, with their parent
+    # directory if the names of the logs are not unique.
+    if names:
+        return names
+    names = [Path(log).name for log in logs]
+    if len(set(names)) < len(names):
+        names = [str(Path(Path(log).parent.name) / Path(log).name) for log in logs]
+    return names
+
+
+def parse_runs(logs, names, origin_spec, cache=True, jobs=None):
+    # returns a list of (name, summary), one per manager of each log.
+    runs = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(summarize, log, origin_spec, cache) for log in logs]
+        for (name, future) in zip(names, futures):
+            summaries = future.result()
+            for s in summaries:
+                runs.append((name if len(summaries) == 1 else f"{name}[{s['pid']}]", s))
+    return runs
+
+
+def makespan(run):
+    return run["done"][-1] if len(run["done"]) else float("nan")
+
+
+def comparison_table(runs, baseline):
+    # rows of (name, tasks, makespan, mean wall time, transfer share, speedup)
+    base = makespan(dict(runs)[baseline])
+    rows = []
+    for (name, run) in runs:
+        total = run["transfer_time"] + run["execution_time"]
+        rows.append((name, run["tasks"], makespan(run), run["mean_wall_time"],
+                     run["transfer_time"] / total if total > 0 else float("nan"),
+                     base / makespan(run)))
+    return rows
+
+
+def print_table(rows, baseline):
+    width = max(len("run"), max(len(row[0]) for row in rows))
+    print(f"{'run':<{width}} {'tasks':>8} {'makespan(s)':>12} {'mean wall(s)':>12} {'transfers':>10} {'speedup':>8}")
+    for (name, tasks, span, wall, share, speedup) in rows:
+        mark = " (baseline)" if name == baseline else ""
+        print(f"{name:<{width}} {tasks:>8} {span:>12.1f} {wall:>12.2f} {share:>10.1%} {speedup:>8.2f}{mark}")
+
+
+def plot_runs(runs, origin_spec, resolution=DEFAULT_RESOLUTION, bucket=None, title=None, output=None):
+    use_backend(display=output is None)
+    fig = plt.figure(constrained_layout=True, figsize=(12, 4.5))
+    (cumulative, throughput) = fig.subplots(nrows=1, ncols=2, sharex=True)
+
+    end = max(makespan(run) for (_, run) in runs)
+    bucket = bucket if bucket else max(end / 50, 1e-3)
+    edges = np.arange(0, end + bucket, bucket)
+
+    for (name, run) in runs:
+        (xs, ys) = cumulative_curve(run["done"], resolution)
+        cumulative.plot(xs, ys, label=name)
+
+        (counts, _) = np.histogram(run["done"], bins=edges)
+        throughput.stairs(counts / bucket, edges, label=name)
+
+    cumulative.set_ylabel("fraction of tasks done")
+    cumulative.set_yticks([0, 0.5, 1])
+    cumulative.set_yticklabels(["0", "50%", "100%"])
+    throughput.set_ylabel(f"tasks done per second ({bucket:.3g}s buckets)")
+    for s in (cumulative, throughput):
+        s.set_xlabel(f"time from {origin_spec} (s)")
+    cumulative.legend(fontsize="small")
+    if title:
+        fig.suptitle(title)
+
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the makespan and throughput of several transaction logs.')
+    parser.add_argument('logs', nargs='+', help='transaction logs')
+    parser.add_argument('-o', '--output', default=None, help='output file of the plot. If not given, the plot is displayed.')
+    parser.add_argument('--names', help='comma separated names of the runs, in the order of the logs. Default is the names of the logs.', default=None)
+    parser.add_argument('--baseline', help='name of the run to compute speedups against. Default is the first run.', default=None)
+    parser.add_argument('--origin', choices=origins, help='time zero of each run.', default="dispatched-first-task")
+    parser.add_argument('--bucket', type=float, help='seconds per bucket of the throughput curves. Default is 1/50 of the longest makespan.', default=None)
+    parser.add_argument('--resolution', type=int, help='number of time buckets of the cumulative curves. 0 plots every task.', default=DEFAULT_RESOLUTION)
+    parser.add_argument('--title', help='title of the plot', default=None)
+    parser.add_argument('--table-only', action='store_true', help='print the table without plotting')
+    parser.add_argument('--jobs', type=int, help='number of logs parsed at the same time. Default is the number of cpus.', default=os.cpu_count())
+    parser.add_argument('--no-cache', action='store_true', help='always parse the logs, without reading or writing their cache')
+    args = parser.parse_intermixed_args()
+
+    logs = args.logs
+
+    names = run_names(logs, args.names.split(",") if args.names else None)
+    if len(names) != len(logs):
+        parser.error("--names needs one name per log")
+
+    runs = parse_runs(logs, names, args.origin, cache=not args.no_cache, jobs=args.jobs)
+
+    baseline = args.baseline if args.baseline else runs[0][0]
+    if baseline not in dict(runs):
+        parser.error(f"no run named {baseline}")
+
+    print_table(comparison_table(runs, baseline), baseline)
+
+    if not args.table_only:
+        plot_runs(runs, args.origin, args.resolution, args.bucket, title=args.title, output=args.output)
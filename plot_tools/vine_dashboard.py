@@ -0,0 +1,275 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Local dashboard to pan and zoom the timeline of the workers of a log in a
+# browser, answering each view from the index of vine_pyramid.py instead of
+# sending every task to the browser.
+#
+# Each view asks for a time window and a range of rows (workers) at the size of
+# the canvas in pixels. Zoomed out, the server answers with the buckets of the
+# coarsest level with at least one bucket per pixel, as float32 values with
+# rows merged when there are more rows than pixels. Zoomed in below the finest
+# level, it answers with the task attempts and transfers of the window, drawn
+# in the slots of their workers.
+#
+# The server only listens on localhost by default. Drag to pan, wheel to zoom
+# in time, and shift+wheel to zoom the rows.
+#
+# Running the program:
+#   python vine_dashboard.py <log> [--port 8050] [--cells N]
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import time
+
+from vine_pyramid import DEFAULT_CELLS, metrics, read_pyramid
+
+
+def view(pyramid, query):
+    # (content type, body, headers) of the view of query, a dict of the
+    # parameters of the request
+    get = lambda name, default: float(query.get(name, [default])[0])
+    metric = query.get("metric", ["busy"])[0]
+    if metric not in metrics:
+        raise ValueError(f"unknown metric {metric}")
+    (t0, t1) = (get("t0", 0), get("t1", pyramid.duration))
+    (r0, r1) = (max(0, int(get("r0", 0))), min(pyramid.rows, int(get("r1", pyramid.rows))))
+    (width, height) = (max(1, int(get("width", 1000))), max(1, int(get("height", 600))))
+    if t1 <= t0 or r1 <= r0:
+        raise ValueError("empty view")
+
+    level = pyramid.level_for(t0, t1, width)
+    if level is None:
+        found = pyramid.raw(t0, t1, r0, r1)
+        if found is not None:
+            (tasks, transfers) = found
+            body = {"kind": "raw", "r0": r0, "r1": r1,
+                    "tasks": {k: v.tolist() for (k, v) in tasks.items()},
+                    "transfers": {k: v.tolist() for (k, v) in transfers.items() if k != "filename"}}
+            body["tasks"]["category"] = [pyramid.categories[c] for c in tasks["category"]]
+            body["transfers"]["filename"] = [pyramid.filenames[f] for f in transfers["filename"]]
+            return ("application/json", json.dumps(body).encode(), {})
+        level = len(pyramid.levels) - 1
+
+    (values, b0, bucket_width, group) = pyramid.aggregate(metric, level, t0, t1, r0, r1, height)
+    header = {"kind": "aggregate", "metric": metric, "level": level, "b0": b0, "bucket_width": bucket_width,
+              "buckets": values.shape[1], "groups": values.shape[0], "rows_per_group": group,
+              "r0": r0, "r1": r1, "max": float(values.max(initial=0))}
+    return ("application/octet-stream", values.tobytes(), {"X-View": json.dumps(header)})
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    pyramid = None
+
+    def send(self, status, content_type, body, headers={}):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for (k, v) in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/":
+                self.send(200, "text/html; charset=utf-8", PAGE.encode())
+            elif url.path == "/info":
+                self.send(200, "application/json", json.dumps(self.pyramid.info()).encode())
+            elif url.path == "/view":
+                t = time.perf_counter()
+                (content_type, body, headers) = view(self.pyramid, parse_qs(url.query))
+                headers["X-Time-Ms"] = f"{1000 * (time.perf_counter() - t):.2f}"
+                self.send(200, content_type, body, headers)
+            else:
+                self.send(404, "text/plain", b"not found")
+        except ValueError as e:
+            self.send(400, "text/plain", str(e).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>taskvine workers</title>
+<style>
+body { margin: 0; font: 12px sans-serif; }
+#bar { padding: 4px 8px; display: flex; gap: 12px; align-items: center; }
+#status { color: #555; }
+canvas { display: block; cursor: grab; }
+</style></head>
+<body>
+<div id="bar">
+  <select id="metric"></select>
+  <button id="reset">reset</button>
+  <span id="status"></span>
+</div>
+<canvas id="canvas"></canvas>
+<script>
+const canvas = document.getElementById("canvas"), ctx = canvas.getContext("2d");
+const status = document.getElementById("status"), metric = document.getElementById("metric");
+const LEFT = 120, TOP = 20;
+let info = null, v = null, data = null, pending = 0;
+
+function plotWidth() { return canvas.width - LEFT; }
+function plotHeight() { return canvas.height - TOP; }
+function xOf(t) { return LEFT + (t - v.t0) / (v.t1 - v.t0) * plotWidth(); }
+function yOf(r) { return TOP + (r - v.r0) / (v.r1 - v.r0) * plotHeight(); }
+
+function resize() {
+  canvas.width = window.innerWidth;
+  canvas.height = window.innerHeight - document.getElementById("bar").offsetHeight;
+  request();
+}
+
+async function request() {
+  if (!info) return;
+  const id = ++pending;
+  const q = new URLSearchParams({metric: metric.value, t0: v.t0, t1: v.t1, r0: Math.floor(v.r0), r1: Math.ceil(v.r1),
+                                 width: plotWidth(), height: plotHeight()});
+  const response = await fetch("/view?" + q);
+  if (id != pending || !response.ok) return;
+  const ms = response.headers.get("X-Time-Ms");
+  if (response.headers.get("Content-Type") == "application/json") {
+    data = await response.json();
+  } else {
+    data = JSON.parse(response.headers.get("X-View"));
+    data.values = new Float32Array(await response.arrayBuffer());
+  }
+  status.textContent = (data.kind == "raw" ? `${data.tasks.start.length} attempts, ${data.transfers.start.length} transfers`
+                        : `level ${data.level}, ${data.bucket_width.toPrecision(3)}s buckets`) + `, ${ms} ms`;
+  draw();
+}
+
+function draw() {
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  if (!data) return;
+  if (data.kind == "raw") drawRaw(); else drawAggregate();
+  drawAxes();
+}
+
+function drawAggregate() {
+  const image = new ImageData(data.buckets, data.groups);
+  for (let i = 0; i < data.values.length; i++) {
+    const level = data.max > 0 ? Math.sqrt(data.values[i] / data.max) : 0;
+    image.data[4*i] = 255 - 200*level; image.data[4*i+1] = 255 - 120*level; image.data[4*i+2] = 255 - 40*level;
+    image.data[4*i+3] = 255;
+  }
+  const off = new OffscreenCanvas(data.buckets, data.groups);
+  off.getContext("2d").putImageData(image, 0, 0);
+  ctx.imageSmoothingEnabled = false;
+  const t0 = data.b0 * data.bucket_width, t1 = t0 + data.buckets * data.bucket_width;
+  const r1 = data.r0 + data.groups * data.rows_per_group;
+  ctx.drawImage(off, xOf(t0), yOf(data.r0), xOf(t1) - xOf(t0), yOf(r1) - yOf(data.r0));
+}
+
+function drawRaw() {
+  const rh = plotHeight() / (v.r1 - v.r0);
+  const t = data.tasks, x = data.transfers;
+  for (let i = 0; i < t.start.length; i++) {
+    const slots = info.slots[t.row[i]], h = rh / slots;
+    const y = yOf(t.row[i]) + (t.slot[i] - 1) * h;
+    ctx.fillStyle = t.failed[i] ? "#d33" : `hsl(${(t.category[i].length * 47) % 360}, 50%, 55%)`;
+    ctx.fillRect(xOf(t.start[i]), y, Math.max(1, xOf(t.end[i]) - xOf(t.start[i])), Math.max(1, h - 1));
+  }
+  ctx.fillStyle = "rgba(0, 0, 0, 0.35)";
+  for (let i = 0; i < x.start.length; i++) {
+    ctx.fillRect(xOf(x.start[i]), yOf(x.row[i] + 1) - Math.max(1, rh/8), Math.max(1, xOf(x.end[i]) - xOf(x.start[i])), Math.max(1, rh/8));
+  }
+}
+
+function drawAxes() {
+  ctx.fillStyle = "#fff"; ctx.fillRect(0, 0, LEFT, canvas.height); ctx.fillRect(0, 0, canvas.width, TOP);
+  ctx.fillStyle = "#000"; ctx.textBaseline = "top";
+  const step = Math.pow(10, Math.floor(Math.log10((v.t1 - v.t0) / 5)));
+  for (let t = Math.ceil(v.t0 / step) * step; t < v.t1; t += step) {
+    ctx.fillText(Number(t.toPrecision(6)) + "s", xOf(t) + 2, 4); ctx.fillRect(xOf(t), 0, 1, TOP);
+  }
+  const rh = plotHeight() / (v.r1 - v.r0);
+  ctx.textBaseline = "middle";
+  const every = Math.max(1, Math.ceil(12 / rh));
+  for (let r = Math.ceil(v.r0 / every) * every; r < v.r1; r += every) {
+    ctx.fillText(info.workers[r] || "", 4, yOf(r + 0.5));
+  }
+}
+
+function hover(e) {
+  if (!data || data.kind != "raw") return;
+  const t = v.t0 + (e.offsetX - LEFT) / plotWidth() * (v.t1 - v.t0);
+  const r = v.r0 + (e.offsetY - TOP) / plotHeight() * (v.r1 - v.r0);
+  const row = Math.floor(r), slot = Math.floor((r - row) * (info.slots[row] || 1)) + 1;
+  const d = data.tasks;
+  for (let i = 0; i < d.start.length; i++) {
+    if (d.row[i] == row && d.slot[i] == slot && d.start[i] <= t && t <= d.end[i]) {
+      status.textContent = `task ${d.task_id[i]} (${d.category[i]}) on ${info.workers[row]} ${info.hostports[row]}: `
+                           + `${d.start[i].toFixed(3)}s to ${d.end[i].toFixed(3)}s` + (d.failed[i] ? ", failed" : "");
+      return;
+    }
+  }
+}
+
+let drag = null;
+canvas.addEventListener("mousedown", e => { drag = {x: e.offsetX, y: e.offsetY, v: {...v}}; });
+window.addEventListener("mouseup", () => { drag = null; });
+canvas.addEventListener("mousemove", e => {
+  if (!drag) { hover(e); return; }
+  const dt = (e.offsetX - drag.x) / plotWidth() * (drag.v.t1 - drag.v.t0);
+  const dr = (e.offsetY - drag.y) / plotHeight() * (drag.v.r1 - drag.v.r0);
+  v = {t0: drag.v.t0 - dt, t1: drag.v.t1 - dt, r0: drag.v.r0 - dr, r1: drag.v.r1 - dr};
+  clamp(); draw(); request();
+});
+canvas.addEventListener("wheel", e => {
+  e.preventDefault();
+  const f = Math.exp(e.deltaY / 500);
+  if (e.shiftKey) {
+    const r = v.r0 + (e.offsetY - TOP) / plotHeight() * (v.r1 - v.r0);
+    v.r0 = r - (r - v.r0) * f; v.r1 = r + (v.r1 - r) * f;
+  } else {
+    const t = v.t0 + (e.offsetX - LEFT) / plotWidth() * (v.t1 - v.t0);
+    v.t0 = t - (t - v.t0) * f; v.t1 = t + (v.t1 - t) * f;
+  }
+  clamp(); request();
+}, {passive: false});
+
+function clamp() {
+  const span = Math.min(v.t1 - v.t0, info.duration), rows = Math.max(1, Math.min(v.r1 - v.r0, info.workers.length));
+  v.t0 = Math.max(0, Math.min(v.t0, info.duration - span)); v.t1 = v.t0 + span;
+  v.r0 = Math.max(0, Math.min(v.r0, info.workers.length - rows)); v.r1 = v.r0 + rows;
+}
+
+function reset() { v = {t0: 0, t1: info.duration, r0: 0, r1: Math.max(1, info.workers.length)}; request(); }
+
+fetch("/info").then(r => r.json()).then(i => {
+  info = i;
+  for (const m of info.metrics) metric.add(new Option(m, m));
+  metric.onchange = request;
+  document.getElementById("reset").onclick = reset;
+  reset(); resize();
+});
+window.addEventListener("resize", resize);
+</script>
+</body></html>
+"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve a dashboard to pan and zoom the timeline of the workers of a log.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('--port', type=int, default=8050, help='port of the dashboard')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--cells', type=int, default=DEFAULT_CELLS, help='rows times buckets of the finest level of the index (see vine_pyramid.py)')
+    parser.add_argument('--jobs', type=int, default=1, help='number of processes to parse the log')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the log and build the index, without reading or writing their caches')
+    args = parser.parse_args()
+
+    DashboardHandler.pyramid = read_pyramid(args.log, args.cells, cache=not args.no_cache, jobs=args.jobs)
+    server = ThreadingHTTPServer((args.host, args.port), DashboardHandler)
+    print(f"dashboard of {args.log} at http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,103 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Indexes to attribute events of a worker to the tasks running on it.
+#
+# IntervalIndex answers which intervals (e.g. tasks on a worker) contain a
+# time, and EventIndex which events (e.g. cache updates of a worker) fall
+# inside a time window. Both are built once, and answer each query in
+# logarithmic time plus the number of results, instead of scanning all the
+# tasks or events of the worker.
+#
+# Intervals and windows are open: an interval (start, stop) contains t if
+# start < t < stop.
+
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+
+class IntervalIndex:
+    # Intervals sorted by start, arranged as an implicit balanced tree: the
+    # interval in the middle of a range of the sorted intervals is the root of
+    # that range, and max_stop keeps the largest stop of each range so that
+    # ranges that end before the query time are skipped.
+    def __init__(self, starts, stops, keys=None):
+        starts = np.asarray(starts, dtype=float)
+        stops = np.asarray(stops, dtype=float)
+        keys = list(range(len(starts))) if keys is None else list(keys)
+
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order].tolist()
+        self.stops = stops[order].tolist()
+        self.keys = [keys[i] for i in order]
+
+        self.max_stop = [-np.inf] * len(self.starts)
+        self._build(0, len(self.starts))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return -np.inf
+        mid = (lo + hi) // 2
+        m = max(self.stops[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        self.max_stop[mid] = m
+        return m
+
+    def at(self, t):
+        # keys of the intervals that contain t, in order of start
+        found = []
+        ranges = [(0, len(self.starts))]
+        while ranges:
+            (lo, hi) = ranges.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_stop[mid] <= t:
+                # all the intervals of the range end before t
+                continue
+            ranges.append((lo, mid))
+            if self.starts[mid] < t:
+                # otherwise, mid and the rest of the range start after t
+                if self.stops[mid] > t:
+                    found.append(mid)
+                ranges.append((mid + 1, hi))
+        return [self.keys[i] for i in sorted(found)]
+
+
+class EventIndex:
+    # Events sorted by time. Events at the same time keep the order in which they were given.
+    def __init__(self, times, keys=None):
+        times = np.asarray(times, dtype=float)
+        keys = list(range(len(times))) if keys is None else list(keys)
+
+        order = np.argsort(times, kind="stable")
+        self.times = times[order].tolist()
+        self.keys = [keys[i] for i in order]
+
+    def __len__(self):
+        return len(self.times)
+
+    def within(self, start, stop):
+        # (time, key) of the events with start < time < stop, in order of time
+        lo = bisect_right(self.times, start)
+        hi = bisect_left(self.times, stop)
+        return list(zip(self.times[lo:hi], self.keys[lo:hi]))
+
+
+def index_by_worker(df, start, stop, worker="worker_id"):
+    # {worker: IntervalIndex} of the rows of a table from ParseTxn (e.g. the
+    # tasks table with start="time_worker_start", stop="time_worker_end"),
+    # with the row labels as keys. Rows without both times are left out.
+    df = df[~(df[start].isna() | df[stop].isna() | df[worker].isna())]
+    return {w: IntervalIndex(g[start].to_numpy(dtype=float), g[stop].to_numpy(dtype=float), g.index)
+            for (w, g) in df.groupby(worker, sort=False)}
+
+
+def events_by_worker(df, time, worker="worker_id"):
+    # {worker: EventIndex} of the rows of a table from ParseTxn (e.g. the
+    # transfers table with time="time"), with the row labels as keys.
+    df = df[~(df[time].isna() | df[worker].isna())]
+    return {w: EventIndex(g[time].to_numpy(dtype=float), g.index) for (w, g) in df.groupby(worker, sort=False)}
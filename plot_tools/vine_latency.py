@@ -0,0 +1,157 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Decomposition of the latency of each task attempt into phases:
+#
+#   queued      WAITING           -> time_commit_start  waiting at the manager to be dispatched
+#   commit      time_commit_start -> time_commit_end    manager sending the task and its inputs
+#   staging     time_commit_end   -> time_worker_start  worker getting the inputs ready
+#   executing   time_worker_start -> time_worker_end    task running at the worker
+#   retrieval   time_worker_end   -> RETRIEVED          waiting for the manager to get the results
+#   lost        time_commit_end   -> DISCONNECTION      at a worker that disconnected before the results were retrieved
+#
+# Every attempt dispatched to a worker is included, also those lost when
+# their worker disconnected. The worker never reports when these started and
+# ended executing, so instead of staging, executing, and retrieval they have
+# a lost phase.
+#
+# For each phase, the report has the p50, p90, p99, and max duration, the total
+# seconds, and the total core-seconds (duration times the cores allocated to
+# the attempt), for all the attempts and by category or by worker. Statistics
+# are computed for all the groups at once with numpy, without a python loop
+# over attempts or groups.
+#
+# Running the program:
+#   python vine_latency.py <log> [--by all,category,worker] [--json]
+
+import argparse
+import json
+import sys
+import numpy as np
+import pandas as pd
+
+from vine_txn import ParseTxn
+
+# (name, start column, end column)
+phases = [("queued", "WAITING", "time_commit_start"),
+          ("commit", "time_commit_start", "time_commit_end"),
+          ("staging", "time_commit_end", "time_worker_start"),
+          ("executing", "time_worker_start", "time_worker_end"),
+          ("retrieval", "time_worker_end", "RETRIEVED"),
+          ("lost", "time_commit_end", "DISCONNECTION")]
+
+percentiles = [50, 90, 99]
+
+groupings = {"all": None, "category": "category", "worker": "worker_id"}
+
+
+def phase_durations(tasks):
+    # {phase: durations in seconds of each attempt}, NaN where the attempt did not go through the phase
+    return {name: (tasks[end] - tasks[start]).to_numpy(dtype=float, na_value=np.nan) for (name, start, end) in phases}
+
+
+def attempt_cores(tasks):
+    # cores allocated to each attempt, or requested if not allocated, or 1
+    cores = tasks["allocated_cores"].fillna(tasks["requested_cores"]).to_numpy(dtype=float, na_value=np.nan)
+    return np.where(np.isnan(cores) | (cores <= 0), 1, cores)
+
+
+def group_statistics(values, weights, codes, n_groups):
+    # statistics of values by group. codes: group of each value, in [0, n_groups).
+    # Returns a dict of arrays with one entry per group.
+    valid = ~np.isnan(values) & (codes >= 0)
+    (values, weights, codes) = (values[valid], weights[valid], codes[valid])
+
+    # values sorted within each group, groups one after the other
+    order = np.lexsort((values, codes))
+    (values, weights, codes) = (values[order], weights[order], codes[order])
+    counts = np.bincount(codes, minlength=n_groups)
+    firsts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    stats = {"count": counts,
+             "total_seconds": np.bincount(codes, weights=values, minlength=n_groups),
+             "core_seconds": np.bincount(codes, weights=values * weights, minlength=n_groups)}
+
+    if len(values) == 0:
+        for name in [f"p{p}" for p in percentiles] + ["max"]:
+            stats[name] = np.full(n_groups, np.nan)
+        return stats
+
+    # linear interpolation between the closest ranks, as numpy.percentile.
+    # Groups without values get NaN.
+    has_values = counts > 0
+    at = lambda ranks: values[np.clip(firsts + ranks, 0, len(values) - 1)]
+    for p in percentiles:
+        rank = (counts - 1).clip(0) * p / 100
+        (lo, hi) = (np.floor(rank).astype(np.int64), np.ceil(rank).astype(np.int64))
+        stats[f"p{p}"] = np.where(has_values, at(lo) + (at(hi) - at(lo)) * (rank - lo), np.nan)
+    stats["max"] = np.where(has_values, at(counts - 1), np.nan)
+    return stats
+
+
+def latency_report(tasks, by=("all", "category")):
+    # {grouping: [row, ...]}, with rows as dicts of the group, phase, and statistics
+    durations = phase_durations(tasks)
+    cores = attempt_cores(tasks)
+
+    report = {}
+    for grouping in by:
+        column = groupings[grouping]
+        if column is None:
+            (codes, groups) = (np.zeros(len(tasks), dtype=np.int64), np.array(["all"], dtype=object))
+        else:
+            (codes, groups) = pd.factorize(tasks[column])
+
+        rows = []
+        for (phase, _, _) in phases:
+            stats = group_statistics(durations[phase], cores, np.asarray(codes), len(groups))
+            for (i, group) in enumerate(groups):
+                if stats["count"][i] > 0:
+                    row = {"group": str(group), "phase": phase}
+                    row.update({k: v[i].item() for (k, v) in stats.items()})
+                    rows.append(row)
+        rows.sort(key=lambda row: row["group"])
+        report[grouping] = rows
+    return report
+
+
+def print_report(report):
+    fields = ["count"] + [f"p{p}" for p in percentiles] + ["max", "total_seconds", "core_seconds"]
+    for (grouping, rows) in report.items():
+        if not rows:
+            continue
+        width = max(len(grouping), max(len(row["group"]) for row in rows))
+        print(f"{grouping:<{width}} {'phase':<10} " + " ".join(f"{f:>13}" for f in fields))
+        for row in rows:
+            values = [f"{row['count']:>13}"] + [f"{row[f]:>13.3f}" for f in fields[1:]]
+            print(f"{row['group']:<{width}} {row['phase']:<10} " + " ".join(values))
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the time task attempts spend in each phase, from a transaction log.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('--by', help=f"comma separated groupings of the attempts, from: {', '.join(groupings)}", default="all,category")
+    parser.add_argument('--json', action='store_true', help='write the report as json instead of a table')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the log, without reading or writing the cache of its tables')
+    args = parser.parse_args()
+
+    by = args.by.split(",")
+    for grouping in by:
+        if grouping not in groupings:
+            parser.error(f"unknown grouping {grouping}")
+
+    # with expand_waiting, the tables have every attempt dispatched to a
+    # worker, not only those retrieved
+    p = ParseTxn(args.log, expand_waiting=True, cache=not args.no_cache)
+    reports = {m.pid: latency_report(m.tasks, by) for m in p.managers.values()}
+
+    if args.json:
+        json.dump(reports, sys.stdout, indent=1)
+        print()
+    else:
+        for (pid, report) in reports.items():
+            if len(reports) > 1:
+                print(f"manager {pid}")
+            print_report(report)
@@ -0,0 +1,50 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# matplotlib, imported on first use.
+#
+# The plot scripts and tools refer to matplotlib through the modules of this
+# file instead of importing it, so that parsing, csv, and stats modes never
+# import matplotlib and start in a fraction of the time. use_backend selects
+# the Agg backend before the first figure when the figure is only written to
+# a file, so that no display is needed.
+#
+#   from vine_lazy import mpl, plt, use_backend
+#   ...
+#   use_backend(display=args.output is None)
+#   plt.figure()
+
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__["_module"] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return f"<lazy module {self._name}{'' if self._module is None else ' (loaded)'}>"
+
+
+mpl = LazyModule("matplotlib")
+plt = LazyModule("matplotlib.pyplot")
+ticker = LazyModule("matplotlib.ticker")
+
+
+def use_backend(display):
+    # without display, draw with Agg, which does not need a display and is
+    # the fastest to start. Otherwise, keep the default interactive backend.
+    if not display:
+        mpl.use("Agg")
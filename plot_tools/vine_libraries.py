@@ -0,0 +1,396 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Start-up cost and use of the libraries of serverless (FunctionCall) workflows.
+#
+# The LIBRARY SENT, STARTED, and FAILURE records of a transaction log are read
+# into one row per library installed on a worker, and the TASK records of the
+# other tasks into one row per attempt dispatched to a worker (the function
+# calls). Each call is assigned to the last library sent to its worker before
+# the call was dispatched. Calls are dispatched as soon as the library is
+# sent, and wait at the worker until the library starts. From them:
+#
+#   - the install latency of each library (SENT -> STARTED), by worker,
+#   - the seconds the calls waited for their library to start, and the time
+#     from the start of each library to its first call, if it had none waiting,
+#   - the calls dispatched and completed per second, over time,
+#   - the calls running in each library, maximum and mean, against its slots
+#     (the calls the cores of its worker hold, with the cores allocated to
+#     the calls, or --slots),
+#   - the failures, the libraries lost with their worker before starting,
+#     and the reinstalls (libraries sent more than once to the same worker or
+#     host),
+#   - whether the start-up is amortized: the seconds spent installing
+#     libraries, against the seconds the calls ran in them.
+#
+# A library ends with its worker, on FAILURE, or at the end of the manager.
+# The log does not say which tasks are function calls, so every task that is
+# not a library is taken as one, unless --category is given.
+#
+# Running the program:
+#   python vine_libraries.py <log> [output] [--stats] [--json] [--csv prefix] [--bin seconds] [--slots N] [--category ...]
+
+import argparse
+import json
+import math
+import sys
+import numpy as np
+import pandas as pd
+
+from vine_lazy import plt, use_backend
+from vine_occupancy import sweep
+from vine_txn import read_events, value_decoder
+
+percentiles = [50, 90, 99]
+
+library_columns = ["library_id", "worker_id", "hostport", "worker_cores", "SENT", "STARTED", "FAILURE", "end"]
+call_columns = ["task_id", "attempt_number", "category", "worker_id", "cores", "RUNNING", "end", "reason"]
+
+
+def read_libraries(log):
+    # {manager_pid: (libraries, calls)}, DataFrames with the columns above,
+    # and times in seconds from the start of the manager.
+    managers = {}
+    for (time, manager_pid, subject, target, event, arg) in read_events(log):
+        if subject == "MANAGER":
+            if event == "START":
+                managers[manager_pid] = {"origin": time, "termination": 0, "libraries": [], "installs": {},
+                                         "attempts": {}, "running": {}, "hostports": {}, "cores": {}, "disconnections": {}}
+            continue
+        m = managers.get(manager_pid, None)
+        if m is None:
+            continue
+        time -= m["origin"]
+        m["termination"] = time
+
+        if subject == "TASK":
+            if event == "WAITING":
+                (category, _, attempt_number, _) = arg.split(maxsplit=3)
+                m["attempts"].setdefault(target, []).append(
+                    {"task_id": int(target), "attempt_number": int(attempt_number), "category": category,
+                     "worker_id": None, "cores": math.nan, "RUNNING": math.nan, "end": math.nan, "reason": None})
+                continue
+            attempt = m["attempts"].get(target, [None])[-1]
+            if attempt is None:
+                continue
+            if event == "RUNNING":
+                (worker_id, _, resources) = arg.split(maxsplit=2)
+                cores = value_decoder.decode(resources)["cores"]
+                attempt.update({"worker_id": worker_id, "cores": cores, "RUNNING": time})
+                m["running"].setdefault(worker_id, []).append(attempt)
+            elif event in ("WAITING_RETRIEVAL", "RETRIEVED", "DONE"):
+                if math.isnan(attempt["end"]) and not math.isnan(attempt["RUNNING"]):
+                    attempt["end"] = time
+                if event != "WAITING_RETRIEVAL" and attempt["reason"] is None:
+                    attempt["reason"] = arg.split(maxsplit=1)[0] if arg else None
+
+        elif subject == "LIBRARY":
+            install = m["installs"].get(target, None)
+            if event in ("WAITING", "SENT") and (install is None or not math.isnan(install["SENT"])):
+                # the first record of the library, or a new install of it
+                install = {"library_id": int(target), "worker_id": None, "SENT": math.nan,
+                           "STARTED": math.nan, "FAILURE": math.nan}
+                m["installs"][target] = install
+                m["libraries"].append(install)
+            if install is None:
+                continue
+            if arg:
+                install["worker_id"] = arg.split(maxsplit=1)[0]
+            if event in ("SENT", "STARTED", "FAILURE") and math.isnan(install[event]):
+                install[event] = time
+
+        elif subject == "WORKER":
+            if event == "CONNECTION":
+                m["hostports"][target] = arg
+            elif event == "RESOURCES":
+                m["cores"][target] = value_decoder.decode(arg)["cores"]
+            elif event == "DISCONNECTION":
+                m["disconnections"][target] = time
+                for attempt in m["running"].pop(target, []):
+                    if math.isnan(attempt["end"]):
+                        (attempt["end"], attempt["reason"]) = (time, "DISCONNECTION")
+
+    return {pid: make_tables(m) for (pid, m) in managers.items()}
+
+
+def make_tables(m):
+    library_ids = {str(install["library_id"]) for install in m["libraries"]}
+
+    rows = []
+    for install in m["libraries"]:
+        worker_id = install["worker_id"]
+        end = m["disconnections"].get(worker_id, m["termination"])
+        if not math.isnan(install["FAILURE"]):
+            end = min(end, install["FAILURE"])
+        rows.append({**install, "hostport": m["hostports"].get(worker_id, None),
+                     "worker_cores": m["cores"].get(worker_id, math.nan), "end": end})
+    libraries = pd.DataFrame(rows, columns=library_columns)
+
+    calls = pd.DataFrame([a for (task_id, attempts) in m["attempts"].items() if task_id not in library_ids
+                          for a in attempts if a["worker_id"] is not None], columns=call_columns)
+    # calls still running at the end of the log
+    calls["end"] = calls["end"].fillna(m["termination"])
+    return (libraries, calls)
+
+
+def assign_calls(libraries, calls):
+    # copy of the calls, in order of dispatch, with the row of their library
+    # in libraries (-1 for calls dispatched to a worker without a library),
+    # and the seconds they waited for the library to start.
+    sent = libraries.loc[~libraries["SENT"].isna(), ["worker_id", "SENT", "STARTED", "end"]]
+    sent = sent.rename_axis("library").reset_index().sort_values("SENT", kind="stable")
+    calls = calls.sort_values("RUNNING", kind="stable")
+    calls = pd.merge_asof(calls, sent, left_on="RUNNING", right_on="SENT", by="worker_id",
+                          suffixes=("", "_library"), direction="backward")
+    inside = calls["RUNNING"] <= calls["end_library"]
+    calls["library"] = calls["library"].where(inside, -1).fillna(-1).astype(np.int64)
+    calls["library_wait"] = (calls["STARTED"] - calls["RUNNING"]).where(inside).clip(lower=0)
+    return calls.drop(columns=["SENT", "STARTED", "end_library"])
+
+
+def running_calls(calls, libraries):
+    # (maximum, call-seconds) of the calls running at once in each library,
+    # from the start of the library or the dispatch of the call
+    calls = calls[calls["library"] >= 0]
+    codes = calls["library"].to_numpy()
+    starts = np.fmax(calls["RUNNING"].to_numpy(), libraries["STARTED"].to_numpy()[codes])
+    ends = calls["end"].to_numpy()
+    running = ~np.isnan(starts) & (starts < ends)
+    (codes, starts, ends) = (codes[running], starts[running], ends[running])
+
+    # all the starts and ends, by library and time, ends first at equal
+    # times. The changes of each library add up to zero, so the running sum
+    # over all of them is the number running in the library of each change.
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts)), -np.ones(len(ends))])
+    rows = np.concatenate([codes, codes])
+    order = np.lexsort((deltas, times, rows))
+    levels = np.cumsum(deltas[order])
+
+    maximum = np.zeros(len(libraries))
+    np.maximum.at(maximum, rows[order], levels)
+    seconds = np.bincount(codes, weights=ends - starts, minlength=len(libraries))
+    return (maximum, seconds)
+
+
+def library_slots(libraries, calls):
+    # calls that the cores of the worker of each library hold at once, with
+    # the most cores allocated to a call of the library. The cores allocated
+    # to the library itself are not taken from them: e.g., the libraries of
+    # serverless_logs/paper have 1 core, and run 2 calls of 1 core on workers
+    # of 2 cores. NaN for libraries without calls, or without the cores of
+    # their worker.
+    cores = calls[calls["library"] >= 0].groupby("library")["cores"].max().reindex(libraries.index)
+    cores = cores.where(cores > 0)
+    with np.errstate(invalid="ignore"):
+        return np.floor(libraries["worker_cores"] / cores)
+
+
+def library_stats(libraries, calls, slots=None):
+    # copy of the libraries with their install latency, time to the first
+    # call, calls, and calls running at once against their slots (slots, if
+    # given, or from library_slots). The first call is at 0 if calls were
+    # waiting for the library to start.
+    ls = libraries.copy()
+    ls["slots"] = library_slots(ls, calls) if slots is None else slots
+    ls["install"] = ls["STARTED"] - ls["SENT"]
+    ls["uptime"] = (ls["end"] - ls["STARTED"]).clip(lower=0)
+
+    assigned = calls[calls["library"] >= 0]
+    by_library = assigned.groupby("library")
+    ls["calls"] = by_library.size().reindex(ls.index, fill_value=0)
+    ls["first_call"] = (by_library["RUNNING"].min().reindex(ls.index) - ls["STARTED"]).clip(lower=0)
+    ls["waiting_calls"] = by_library["library_wait"].apply(lambda w: (w > 0).sum()).reindex(ls.index, fill_value=0)
+
+    (maximum, seconds) = running_calls(calls, ls)
+    ls["max_running"] = maximum
+    ls["call_seconds"] = seconds
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ls["mean_running"] = np.where(ls["uptime"] > 0, ls["call_seconds"] / ls["uptime"], np.nan)
+        ls["slot_utilization"] = ls["mean_running"] / ls["slots"]
+    return ls
+
+
+def throughput(calls, libraries, bin_seconds):
+    # calls dispatched and completed per second, and libraries installing and
+    # running at the start of each bin
+    end = max(calls["end"].max() if len(calls) else 0, libraries["end"].max() if len(libraries) else 0)
+    edges = np.arange(0, end + bin_seconds, bin_seconds)
+    if len(edges) < 2:
+        edges = np.array([0, bin_seconds])
+    dispatched = np.histogram(calls["RUNNING"], bins=edges)[0]
+    completed = np.histogram(calls.loc[calls["reason"] != "DISCONNECTION", "end"], bins=edges)[0]
+
+    (times, levels) = sweep([(libraries["SENT"], libraries["STARTED"].fillna(libraries["end"]), 1),
+                             (libraries["STARTED"], libraries["end"], 1)])
+    at = np.searchsorted(times, edges[:-1], side="right") - 1
+    levels = np.where((at >= 0)[:, None], levels[np.clip(at, 0, None)] if len(times) else 0, 0)
+
+    return pd.DataFrame({"time": edges[:-1],
+                         "dispatched_per_s": dispatched / bin_seconds,
+                         "completed_per_s": completed / bin_seconds,
+                         "libraries_installing": levels[:, 0],
+                         "libraries_running": levels[:, 1]})
+
+
+def quantiles(values, name):
+    values = values.dropna()
+    qs = values.quantile([p / 100 for p in percentiles]) if len(values) else [math.nan] * len(percentiles)
+    return {**{f"{name}_p{p}": q for (p, q) in zip(percentiles, qs)},
+            f"{name}_max": values.max() if len(values) else math.nan}
+
+
+def reinstalls(ls, column):
+    # installs beyond the first on the same worker (or host)
+    sent = ls.loc[~ls["SENT"].isna(), column].dropna()
+    return int((sent.value_counts() - 1).sum())
+
+
+def summary(ls, calls):
+    started = ls[~ls["STARTED"].isna()]
+    lost = ls["STARTED"].isna() & ls["FAILURE"].isna() & ~ls["SENT"].isna()
+    install_seconds = started["install"].sum()
+    call_seconds = started["call_seconds"].sum()
+    in_library = calls["library"] >= 0
+    return {"libraries_sent": int((~ls["SENT"].isna()).sum()),
+            "libraries_started": len(started),
+            "failures": int((~ls["FAILURE"].isna()).sum()),
+            "lost_before_start": int(lost.sum()),
+            "worker_reinstalls": reinstalls(ls, "worker_id"),
+            "host_reinstalls": reinstalls(ls, "hostport"),
+            **quantiles(started["install"], "install"),
+            **quantiles(started["first_call"], "first_call"),
+            "calls": int(len(calls)),
+            "calls_outside_libraries": int((~in_library).sum()),
+            "calls_waiting_library": int((calls["library_wait"] > 0).sum()),
+            "library_wait_seconds": calls["library_wait"].sum(),
+            "calls_per_library_p50": started["calls"].median() if len(started) else math.nan,
+            "slots_p50": started["slots"].median() if len(started) else math.nan,
+            "max_running_p50": started["max_running"].median() if len(started) else math.nan,
+            "slot_utilization_mean": np.average(started["slot_utilization"].fillna(0), weights=started["uptime"])
+            if started["uptime"].sum() > 0 else math.nan,
+            "install_seconds": install_seconds,
+            "call_seconds": call_seconds,
+            "install_seconds_per_call": install_seconds / in_library.sum() if in_library.any() else math.nan,
+            "install_to_call_seconds": install_seconds / call_seconds if call_seconds > 0 else math.nan}
+
+
+def json_summary(stats):
+    # summary with python numbers, and NaN as null
+    stats = {k: v.item() if isinstance(v, np.generic) else v for (k, v) in stats.items()}
+    return {k: None if isinstance(v, float) and math.isnan(v) else v for (k, v) in stats.items()}
+
+
+def print_stats(ls, calls, ts):
+    stats = summary(ls, calls)
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+        print("libraries and calls (seconds)")
+        for (k, v) in stats.items():
+            print(f"  {k:<26} {v:.3f}" if isinstance(v, float) else f"  {k:<26} {v}")
+        print()
+        workers = ls[~ls["STARTED"].isna()].groupby("worker_id").agg(
+            hostport=("hostport", "first"), installs=("SENT", "count"), install=("install", "mean"),
+            first_call=("first_call", "mean"), calls=("calls", "sum"), max_running=("max_running", "max"),
+            slot_utilization=("slot_utilization", "mean"))
+        print(f"workers with the slowest installs (of {len(workers)})")
+        print(workers.sort_values("install", ascending=False).head(10).to_string())
+        print()
+        busy = ts[ts["dispatched_per_s"] > 0]
+        if len(busy):
+            print(f"calls dispatched per second, over {len(busy)} bins with dispatches: "
+                  + ", ".join(f"{k} {v:.3f}" for (k, v) in quantiles(busy["dispatched_per_s"], "rate").items()))
+            print()
+
+
+def plot_libraries(ls, calls, ts, title=None, output=None):
+    use_backend(display=output is None)
+    fig = plt.figure(constrained_layout=True, figsize=(12, 8))
+    ((installs, rate), (first, running)) = fig.subplots(nrows=2, ncols=2)
+
+    started = ls[~ls["STARTED"].isna()]
+    installs.scatter(started["SENT"], started["install"], s=6)
+    failed = ls[~ls["FAILURE"].isna()]
+    if len(failed):
+        installs.scatter(failed["SENT"], failed["FAILURE"] - failed["SENT"], s=12, marker="x", color="C3", label="FAILURE")
+        installs.legend(fontsize="small")
+    installs.set_xlabel("library sent, time from manager start (s)")
+    installs.set_ylabel("install latency, SENT to STARTED (s)")
+
+    rate.step(ts["time"], ts["dispatched_per_s"], where="post", label="calls dispatched")
+    rate.step(ts["time"], ts["completed_per_s"], where="post", label="calls completed")
+    rate.set_xlabel("time from manager start (s)")
+    rate.set_ylabel("calls per second")
+    rate.legend(loc="upper left", fontsize="small")
+    libraries = rate.twinx()
+    libraries.step(ts["time"], ts["libraries_running"], where="post", color="C2", alpha=0.5)
+    libraries.set_ylabel("libraries running", color="C2")
+    rate.sharex(installs)
+
+    first.hist(started["first_call"].dropna(), bins=50)
+    first.set_xlabel("library start to first call (s)")
+    first.set_ylabel("libraries")
+
+    running.scatter(started["slots"], started["max_running"], s=12, alpha=0.3, label="maximum")
+    running.scatter(started["slots"], started["mean_running"], s=12, alpha=0.3, label="mean")
+    top = max(1, np.nanmax(np.r_[started["slots"], started["max_running"], 1]))
+    running.plot([0, top], [0, top], color="gray", linewidth=0.5)
+    running.set_xlabel("slots of the library")
+    running.set_ylabel("calls running in the library")
+    running.legend(fontsize="small")
+
+    if title:
+        fig.suptitle(title)
+
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the install latency, use, and failures of the libraries of FunctionCall workflows, from a transaction log.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('output', nargs='?', default=None, help='output file of the plot. If not given, the plot is displayed.')
+    parser.add_argument('--stats', action='store_true', help='print the statistics without plotting')
+    parser.add_argument('--json', action='store_true', help='write the summary of each manager as json, and do not plot')
+    parser.add_argument('--csv', default=None, help='write the libraries, calls, and throughput tables to <prefix>.<table>.csv, and do not plot')
+    parser.add_argument('--bin', type=float, default=10, help='seconds of each bin of the calls dispatched and completed over time')
+    parser.add_argument('--slots', type=float, default=None, help='function slots of each library. Default is the calls of the library that the cores of its worker hold.')
+    parser.add_argument('--category', default=None, help='comma separated categories of the function calls. Default is every task that is not a library.')
+    parser.add_argument('--title', default=None, help='title of the plot')
+    args = parser.parse_args()
+
+    if args.bin <= 0:
+        parser.error("--bin must be positive")
+
+    managers = read_libraries(args.log)
+    summaries = {}
+    for (pid, (libraries, calls)) in managers.items():
+        if libraries.empty:
+            print(f"manager {pid}: no libraries", file=sys.stderr)
+            continue
+        if args.category:
+            calls = calls[calls["category"].isin(args.category.split(","))]
+        calls = assign_calls(libraries, calls)
+        ls = library_stats(libraries, calls, args.slots)
+        ts = throughput(calls, libraries, args.bin)
+
+        if args.json:
+            summaries[pid] = json_summary(summary(ls, calls))
+            continue
+
+        print(f"manager {pid}: {len(ls)} libraries, {len(calls)} calls")
+        print_stats(ls, calls, ts)
+
+        if args.csv:
+            prefix = args.csv if len(managers) == 1 else f"{args.csv}.{pid}"
+            ls.to_csv(f"{prefix}.libraries.csv", index=False)
+            calls.to_csv(f"{prefix}.calls.csv", index=False)
+            ts.to_csv(f"{prefix}.throughput.csv", index=False)
+        if not args.stats and not args.csv:
+            plot_libraries(ls, calls, ts, title=args.title, output=args.output)
+
+    if args.json:
+        json.dump(summaries, sys.stdout, indent=1)
+        print()
@@ -0,0 +1,159 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Occupancy of the cores of the workers over time.
+#
+# From the tables of ParseTxn, each worker adds its cores from its CONNECTION
+# to its DISCONNECTION (total), and each task attempt adds its allocated cores
+# from RUNNING to RETRIEVED (committed, ending at the disconnection of its
+# worker if lost there, or at the end of the manager if still running) and
+# from time_worker_start to time_worker_end (executing, only known for the
+# attempts retrieved). All these changes are sorted once by time and
+# accumulated, giving a step function with one point per distinct time.
+#
+# The log is parsed with expand_waiting, so that the tables have every
+# attempt dispatched to a worker, and not only those retrieved.
+#
+# Running the program:
+#   python vine_occupancy.py <log> [output] [--csv file]
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+
+from vine_latency import attempt_cores
+from vine_lazy import plt, use_backend
+from vine_txn import ParseTxn
+
+series = ["total", "committed", "executing"]
+
+
+def intervals(manager):
+    # {series: (starts, ends, cores)}
+    ws = manager.workers
+    ts = manager.tasks
+    cores = attempt_cores(ts)
+
+    committed_end = ts["RETRIEVED"].fillna(ts["DISCONNECTION"]).fillna(manager.termination)
+    as_array = lambda column: column.to_numpy(dtype=float, na_value=np.nan)
+
+    # with expand_waiting, the worker end of the attempts not retrieved is
+    # their last state, and they have no worker start
+    executing_end = ts["time_worker_end"].where(ts["RETRIEVED"].notna())
+
+    return {"total": (as_array(ws["CONNECTION"]), as_array(ws["DISCONNECTION"]), as_array(ws["cores"])),
+            "committed": (as_array(ts["RUNNING"]), as_array(committed_end), cores),
+            "executing": (as_array(ts["time_worker_start"]), as_array(executing_end), cores)}
+
+
+def sweep(intervals):
+    # intervals: list of (starts, ends, weights), one per series. Returns
+    # (times, levels), with levels[k, i] the sum of the weights of the
+    # intervals of series i that contain [times[k], times[k + 1]).
+    # Intervals with NaN starts, ends, or weights are left out.
+    times = []
+    deltas = []
+    for (i, (starts, ends, weights)) in enumerate(intervals):
+        (starts, ends) = (np.asarray(starts, dtype=float), np.asarray(ends, dtype=float))
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), starts.shape)
+        valid = ~(np.isnan(starts) | np.isnan(ends) | np.isnan(weights))
+        (starts, ends, weights) = (starts[valid], np.maximum(ends[valid], starts[valid]), weights[valid])
+
+        delta = np.zeros((2 * len(starts), len(intervals)))
+        delta[:len(starts), i] = weights
+        delta[len(starts):, i] = -weights
+        times.append(np.concatenate([starts, ends]))
+        deltas.append(delta)
+
+    times = np.concatenate(times)
+    deltas = np.concatenate(deltas)
+
+    # the single sorted pass: accumulate all the changes in order of time,
+    # and keep the value after the last change at each distinct time.
+    order = np.argsort(times, kind="stable")
+    (times, levels) = (times[order], np.cumsum(deltas[order], axis=0))
+    last = np.r_[times[1:] != times[:-1], True] if len(times) else np.zeros(0, dtype=bool)
+    return (times[last], levels[last])
+
+
+def occupancy(manager):
+    # DataFrame with the time of each change, and the total, committed, and
+    # executing cores from that time until the next row.
+    by_series = intervals(manager)
+    (times, levels) = sweep([by_series[name] for name in series])
+
+    df = pd.DataFrame(levels, columns=series)
+    df.insert(0, "time", times)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["utilization"] = np.where(df["total"] > 0, df["executing"] / df["total"], np.nan)
+    return df
+
+
+def integrate(df, column):
+    # integral over time of a step function column, e.g. core-seconds
+    return float((df[column].to_numpy()[:-1] * np.diff(df["time"].to_numpy())).sum())
+
+
+def summary(df):
+    total = integrate(df, "total")
+    executing = integrate(df, "executing")
+    committed = integrate(df, "committed")
+    return {"core_seconds": total,
+            "committed_core_seconds": committed,
+            "executing_core_seconds": executing,
+            "idle_core_seconds": total - executing,
+            "uncommitted_core_seconds": total - committed,
+            "utilization": executing / total if total > 0 else float("nan")}
+
+
+def plot_occupancy(dfs, title=None, output=None):
+    use_backend(display=output is None)
+    fig = plt.figure(constrained_layout=True, figsize=(12, 6))
+    subs = fig.subplots(nrows=2, ncols=len(dfs), sharex="col", squeeze=False, height_ratios=[3, 1])
+
+    for (i, (pid, df)) in enumerate(dfs.items()):
+        (cores, utilization) = subs[:, i]
+        for name in series:
+            cores.step(df["time"], df[name], where="post", label=name)
+        utilization.step(df["time"], df["utilization"], where="post", color="C3")
+
+        cores.set_ylabel("cores")
+        cores.legend(fontsize="small")
+        utilization.set_ylabel("executing / total")
+        utilization.set_ylim(0, 1.05)
+        utilization.set_xlabel("time from manager start (s)")
+        if len(dfs) > 1:
+            cores.set_title(f"manager {pid}")
+    if title:
+        fig.suptitle(title)
+
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Plot the total, committed, and executing cores over time, from a transaction log.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('output', nargs='?', default=None, help='output file of the plot. If not given, the plot is displayed.')
+    parser.add_argument('--csv', default=None, help='write the time series to this csv file (one file per manager if there are several), and do not plot')
+    parser.add_argument('--title', default=None, help='title of the plot')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the log, without reading or writing the cache of its tables')
+    args = parser.parse_args()
+
+    p = ParseTxn(args.log, expand_waiting=True, cache=not args.no_cache)
+    dfs = {m.pid: occupancy(m) for m in p.managers.values()}
+
+    for (pid, df) in dfs.items():
+        s = summary(df)
+        print(f"manager {pid}: " + ", ".join(f"{k} {v:.3f}" for (k, v) in s.items()), file=sys.stderr)
+
+    if args.csv:
+        for (i, df) in enumerate(dfs.values()):
+            filename = args.csv if len(dfs) == 1 else f"{args.csv}.{i}"
+            df.to_csv(filename, index=False)
+    else:
+        plot_occupancy(dfs, title=args.title, output=args.output)
@@ -0,0 +1,291 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Performance logs of the manager (*_perf.log).
+#
+# A performance log has a header line with the names of its columns, and then
+# one sample per line:
+# timestamp workers_connected workers_init ... tasks_dispatched ... time_send time_receive ... bytes_sent ... min_disk
+#
+# Timestamps are in microseconds, in the same clock as the transaction log of
+# the run (the *_tr.log with the same prefix). Most columns are counters that
+# only grow (tasks_*, time_*, bytes_*), and the rest are the state of the
+# manager at the sample (workers_*, capacity_*, committed_*, ...).
+#
+# The log is loaded into a numpy structured array, with integer or float
+# columns as written in the log. The array is saved next to the log as
+# .<log name>.<hash>.perfcache.npy, and memory-mapped on later loads while the
+# log does not change.
+#
+# Running this file plots columns of one or more logs over time:
+#   python vine_perf.py <perf_log>... [--columns c1,c2,...] [--origin first-sample|manager-start] [--stats] [-o output]
+
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+
+import vine_txn_cache
+from vine_lazy import plt, use_backend
+from vine_txn import read_events
+
+PERF_VERSION = 1
+
+# fields of the manager loop that add up to the time the manager is busy. The
+# rest of the time is spent polling for messages, or in the application.
+busy_times = ["time_send", "time_receive", "time_status_msgs", "time_internal"]
+
+
+def cache_path(log):
+    log = Path(log)
+    key = vine_txn_cache.cache_key(log, {"version": PERF_VERSION})
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+    return log.with_name(f".{log.name}.{digest}.perfcache.npy")
+
+
+def parse_perf(log):
+    with open(log) as f:
+        names = f.readline().lstrip("#").split()
+        lines = [line for line in f if line.strip() and not line.startswith("#")]
+
+    # the last line may be incomplete if the manager did not finish
+    lines = [line for line in lines if len(line.split()) == len(names)]
+
+    # floats are written with a decimal point in every sample
+    first = lines[0].split() if lines else ["0"] * len(names)
+    dtype = np.dtype([(name, np.float64 if "." in value else np.int64) for (name, value) in zip(names, first)])
+
+    values = np.loadtxt(lines, dtype=np.float64, ndmin=2).reshape(len(lines), len(names))
+    perf = np.empty(len(lines), dtype=dtype)
+    for (i, name) in enumerate(names):
+        perf[name] = values[:, i]
+    return perf
+
+
+def read_perf(log, cache=True):
+    # returns the samples of log as a structured array, memory-mapped from the
+    # cache when there is one.
+    if not cache:
+        return parse_perf(log)
+
+    path = cache_path(log)
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        pass
+
+    perf = parse_perf(log)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            np.save(f, perf)
+        os.replace(tmp, path)
+        # caches of older versions of the log
+        for old in path.parent.glob(f".{Path(log).name}.*.perfcache.npy"):
+            if old != path:
+                old.unlink()
+    except OSError as e:
+        print(f"Could not write cache {path}: {e}", file=sys.stderr)
+    return perf
+
+
+def seconds(perf, origin=None):
+    # times of the samples in seconds since origin (in microseconds), by default the first sample.
+    timestamps = perf["timestamp"].astype(np.float64)
+    if origin is None:
+        origin = timestamps[0] if len(timestamps) else 0
+    return (timestamps - origin) / 1e6
+
+
+def rate(perf, counter, scale=1):
+    # change of counter per second of wall time between consecutive samples.
+    # NaN for the first sample, and for samples at the same time.
+    dt = np.diff(perf["timestamp"].astype(np.float64)) / 1e6
+    dc = np.diff(np.asarray(counter, dtype=np.float64)) * scale
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.concatenate([[np.nan], np.where(dt > 0, dc / dt, np.nan)])
+
+
+def busy_time(perf):
+    return sum(perf[name].astype(np.float64) for name in busy_times)
+
+
+def loop_time(perf):
+    # all the time accounted by the manager loop, close to the wall time
+    return busy_time(perf) + perf["time_polling"] + perf["time_application"]
+
+
+def fraction(perf, counter):
+    # change of counter over the change of the time accounted by the manager
+    # loop between consecutive samples. The time counters are not updated at
+    # the same moment as the timestamp, so the wall time between close
+    # samples is not a good denominator.
+    dt = np.diff(loop_time(perf))
+    dc = np.diff(np.asarray(counter, dtype=np.float64))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.concatenate([[np.nan], np.where(dt > 0, dc / dt, np.nan)])
+
+
+# columns computed from the columns of the log, as name -> (function of the samples, description)
+derived_columns = {
+        "dispatch_rate": (lambda perf: rate(perf, perf["tasks_dispatched"]), "tasks dispatched per second"),
+        "done_rate": (lambda perf: rate(perf, perf["tasks_done"]), "tasks done per second"),
+        "send_rate": (lambda perf: rate(perf, perf["bytes_sent"], 1/1e6), "MB sent per second"),
+        "receive_rate": (lambda perf: rate(perf, perf["bytes_received"], 1/1e6), "MB received per second"),
+        "manager_busy": (lambda perf: fraction(perf, busy_time(perf)), "fraction of time sending, receiving, and in the manager"),
+        "polling_fraction": (lambda perf: fraction(perf, perf["time_polling"]), "fraction of time waiting for messages"),
+        "application_fraction": (lambda perf: fraction(perf, perf["time_application"]), "fraction of time in the application"),
+        }
+
+
+def column(perf, name):
+    if name in perf.dtype.names:
+        return perf[name]
+    try:
+        return derived_columns[name][0](perf)
+    except KeyError:
+        raise KeyError(f"{name} is not a column of the performance log, nor one of {', '.join(derived_columns)}")
+
+
+def txn_log_for(perf_log):
+    # the transaction log of the same run, or None
+    perf_log = Path(perf_log)
+    if not perf_log.name.endswith("_perf.log"):
+        return None
+    txn = perf_log.with_name(perf_log.name[:-len("_perf.log")] + "_tr.log")
+    return txn if txn.exists() else None
+
+
+def txn_origin(txn_log):
+    # time in microseconds of the first manager start in the transaction log
+    for event in read_events(txn_log):
+        if event.subject == "MANAGER" and event.event == "START":
+            return event.time * 1e6
+    return None
+
+
+def txn_counts(txn_log, perf):
+    # for each sample, the number of tasks done and of transfers recorded in
+    # the transaction log up to the time of the sample. Useful to check the
+    # alignment of both logs, and to plot them together.
+    done = []
+    transfers = []
+    for event in read_events(txn_log):
+        if event.subject == "TASK" and event.event == "DONE":
+            done.append(event.time)
+        elif event.subject == "WORKER" and event.event in ("TRANSFER", "CACHE_UPDATE"):
+            transfers.append(event.time)
+
+    times = perf["timestamp"] / 1e6
+    return {"txn_tasks_done": np.searchsorted(np.sort(done), times, side="right"),
+            "txn_transfers": np.searchsorted(np.sort(transfers), times, side="right")}
+
+
+def run_names(logs):
+    # names of the logs without the suffix they share, e.g. the name of the
+    # manager variant of each run.
+    names = [Path(log).name for log in logs]
+    if len(names) < 2:
+        return [name.removesuffix("_perf.log") for name in names]
+    suffix = os.path.commonprefix([name[::-1] for name in names])[::-1]
+    # do not cut names in the middle of a word
+    suffix = suffix[suffix.find("_"):] if "_" in suffix else ""
+    return [name[:-len(suffix)] if suffix and len(suffix) < len(name) else name for name in names]
+
+
+def stats(perf):
+    # summary of a run, from its first to its last sample
+    change = lambda values: float(values[-1] - values[0]) if len(perf) > 1 else 0.0
+    duration = change(perf["timestamp"]) / 1e6
+    loop = max(change(loop_time(perf)), 1e-9)
+    return {"samples": len(perf),
+            "duration": duration,
+            "tasks_done": change(perf["tasks_done"]),
+            "dispatch_rate": change(perf["tasks_dispatched"]) / max(duration, 1e-9),
+            "manager_busy": change(busy_time(perf)) / loop,
+            "polling": change(perf["time_polling"]) / loop,
+            "application": change(perf["time_application"]) / loop,
+            "MB_sent": change(perf["bytes_sent"]) / 1e6}
+
+
+def print_stats(names, perfs):
+    fields = ["samples", "duration", "tasks_done", "dispatch_rate", "manager_busy", "polling", "application", "MB_sent"]
+    width = max(len(name) for name in names)
+    print(f"{'run':<{width}} " + " ".join(f"{field:>13}" for field in fields))
+    for (name, perf) in zip(names, perfs):
+        s = stats(perf)
+        print(f"{name:<{width}} " + " ".join(f"{s[field]:>13.3f}" if isinstance(s[field], float) else f"{s[field]:>13}" for field in fields))
+
+
+def plot_perf(names, perfs, columns, origins, txn=None, title=None, output=None):
+    use_backend(display=output is None)
+    fig = plt.figure(constrained_layout=True, figsize=(10, 2.5 * len(columns)))
+    subs = fig.subplots(nrows=len(columns), ncols=1, sharex=True, squeeze=False)[:, 0]
+
+    for (name, perf, origin, counts) in zip(names, perfs, origins, txn or [None] * len(perfs)):
+        xs = seconds(perf, origin)
+        for (s, c) in zip(subs, columns):
+            ys = counts[c] if counts and c in counts else column(perf, c)
+            s.plot(xs, ys, label=name, drawstyle="steps-post")
+
+    for (s, c) in zip(subs, columns):
+        s.set_ylabel(c)
+        if c in derived_columns:
+            s.set_title(derived_columns[c][1], fontsize="small")
+    subs[0].legend(fontsize="small")
+    subs[-1].set_xlabel("time (s)")
+    if title:
+        fig.suptitle(title)
+
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Plot columns of manager performance logs over time.')
+    parser.add_argument('logs', nargs='+', help='performance logs (*_perf.log)')
+    parser.add_argument('-o', '--output', default=None, help='output file of the plot. If not given, the plot is displayed.')
+    parser.add_argument('--columns', help=f"comma separated columns to plot. Besides the columns of the log: {', '.join(derived_columns)}, and with --txn: txn_tasks_done, txn_transfers", default="tasks_done,dispatch_rate,manager_busy,send_rate")
+    parser.add_argument('--origin', choices=['first-sample', 'manager-start'], help='zero of the time axis. manager-start uses the matching *_tr.log of each run.', default='first-sample')
+    parser.add_argument('--txn', action='store_true', help='also count tasks done and transfers from the matching *_tr.log at each sample')
+    parser.add_argument('--title', default=None, help='title of the plot')
+    parser.add_argument('--stats', action='store_true', help='print a summary of each run instead of plotting')
+    parser.add_argument('--list', action='store_true', help='list the columns of the first log and exit')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the logs, without reading or writing their cache')
+    args = parser.parse_intermixed_args()
+
+    logs = args.logs
+
+    perfs = [read_perf(log, cache=not args.no_cache) for log in logs]
+    names = run_names(logs)
+
+    if args.list:
+        for name in perfs[0].dtype.names:
+            print(name, perfs[0].dtype[name])
+        for (name, (_, description)) in derived_columns.items():
+            print(name, description)
+        sys.exit(0)
+
+    if args.stats:
+        print_stats(names, perfs)
+        sys.exit(0)
+
+    txn_logs = [txn_log_for(log) for log in logs]
+    if (args.origin == 'manager-start' or args.txn) and None in txn_logs:
+        parser.error(f"no matching _tr.log for {logs[txn_logs.index(None)]}")
+
+    origins = [None] * len(logs)
+    if args.origin == 'manager-start':
+        origins = [txn_origin(txn) for txn in txn_logs]
+
+    counts = None
+    if args.txn:
+        counts = [txn_counts(txn, perf) for (txn, perf) in zip(txn_logs, perfs)]
+
+    plot_perf(names, perfs, args.columns.split(","), origins, txn=counts, title=args.title, output=args.output)
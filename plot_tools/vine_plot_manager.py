@@ -1,9 +1,12 @@
 from collections import Counter
-import matplotlib.pyplot as plt
 import time
 import sys
 import argparse
 
+from vine_txn import read_events
+from vine_buckets import DEFAULT_RESOLUTION, cumulative_curve
+from vine_lazy import plt, use_backend
+
 manager_info = {"Start":-1,
                 "Connections":[],
                 "Disconnections":[],
@@ -15,54 +18,44 @@ manager_info = {"Start":-1,
                 "Input Transfers":[],
                 "Output Transfers":[],}
 
+# (subject, event) -> category of manager_info
+event_categories = {("WORKER", "CONNECTION"): "Connections",
+                    ("WORKER", "DISCONNECTION"): "Disconnections",
+                    ("WORKER", "RESOURCES"): "Resource Updates",
+                    ("WORKER", "CACHE_UPDATE"): "Cache Updates",
+                    ("WORKER", "CACHE-UPDATE"): "Cache Updates",
+                    ("TASK", "RUNNING"): "Tasks Sent",
+                    ("TASK", "WAITING_RETRIEVAL"): "Notified Results",
+                    ("TASK", "DONE"): "Marked Done",}
+
+transfer_categories = {"INPUT": "Input Transfers",
+                       "OUTPUT": "Output Transfers",}
+
 def read_log(log, print_stats=False):
-    filename = log 
-    lines = open(log, 'r').read().splitlines()
-    for line in lines:
-        if "MANAGER START" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000
-            manager_info["Start"] = time
-        if "WORKER" in line and "CONNECTION" in line and "#" not in line and "DISCONNECTION" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Connections"].append(time)
-        elif "WORKER" in line and "DISCONNECTION" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Disconnections"].append(time)
-        elif "WORKER" in line and "RESOURCES" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Resource Updates"].append(time)
-        elif "CACHE-UPDATE" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Cache Updates"].append(time)
-        elif "TASK" in line and "RUNNING" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Tasks Sent"].append(time)
-        elif "TASK" in line and "WAITING_RETRIEVAL" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Notified Results"].append(time)
-        elif "TASK" in line and "DONE SUCCESS" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Marked Done"].append(time)
-        elif "TRANSFER" in line and "INPUT" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Input Transfers"].append(time)
-        elif "TRANSFER" in line and "OUTPUT" in line and "#" not in line:
-            sp = line.split()
-            time = int(sp[0])/1000000 - manager_info["Start"]
-            manager_info["Output Transfers"].append(time)
+    for (time, managerpid, subject, target, event, arg) in read_events(log):
+        if subject == "MANAGER":
+            if event == "START":
+                manager_info["Start"] = time
+            continue
+
+        if subject == "TRANSFER":
+            # older logs, with the direction as target
+            category = transfer_categories.get(target)
+        elif subject == "WORKER" and event == "TRANSFER":
+            category = transfer_categories.get(arg.split(maxsplit=1)[0])
+        elif subject == "TASK" and event == "DONE" and not arg.startswith("SUCCESS"):
+            continue
+        else:
+            category = event_categories.get((subject, event))
+
+        if category:
+            manager_info[category].append(time - manager_info["Start"])
 
 def plot_manager(title='Manager Info', all_info=False, save=None, connections=False, disconnections=False,
-                resources=False, cache=False, sent=False, results=False, done=False, IT=False, OT=False):
-    
+                resources=False, cache=False, sent=False, results=False, done=False, IT=False, OT=False,
+                resolution=DEFAULT_RESOLUTION):
+    use_backend(display=save is None)
+
     for category in manager_info:
         if category == "Start":
             continue
@@ -84,14 +77,7 @@ def plot_manager(title='Manager Info', all_info=False, save=None, connections=Fa
             continue
         if not OT and not all_info and category == "Output Transfers":
             continue
-        count = 1
-        total = len(manager_info[category])
-        xs = []
-        ys = []
-        for data in manager_info[category]:
-            xs.append(data)
-            ys.append(count/total)
-            count += 1
+        (xs, ys) = cumulative_curve(manager_info[category], resolution)
         plt.plot(xs, ys, label=category)
 
     plt.title(title)    
@@ -117,6 +103,7 @@ if __name__ == "__main__":
     parser.add_argument('-m', action='store_true', help='display marked done')
     parser.add_argument('-i', action='store_true', help='display input transfers')
     parser.add_argument('-o', action='store_true', help='display output transfes')
+    parser.add_argument('--resolution', type=int, default=DEFAULT_RESOLUTION, help='number of time buckets of each curve. 0 plots every event')
     args = parser.parse_args()
     read_log(args.log)
     plot_manager(title=args.title, 
@@ -130,4 +117,5 @@ if __name__ == "__main__":
                  results=args.w,
                  done=args.m,
                  IT=args.i,
-                 OT=args.o) 
+                 OT=args.o,
+                resolution=args.resolution)
@@ -1,9 +1,11 @@
 from collections import Counter
-import matplotlib.pyplot as plt
 import time
 import sys
 import argparse
-import json
+
+from vine_txn import read_events
+from vine_intervals import EventIndex, IntervalIndex
+from vine_lazy import plt, use_backend
 
 worker_info = {}
 worker_of_task = {}
@@ -12,19 +14,7 @@ manager_start = -1
 
 def read_log(log, print_stats=False):
     fail_count = 0
-    filename = log
-    lines = open(log, 'r').read().splitlines()
-    for line in lines:
-        if line.startswith("#"):
-            continue
-
-        try:
-            (time, managerpid, subject, target, event, arg) = line.split(maxsplit=5)
-        except ValueError:
-            continue
-
-        time = int(time)/1000000
-
+    for (time, managerpid, subject, target, event, arg) in read_events(log):
         if subject == "MANAGER":
             managerpid = target
             if event == "START":
@@ -40,7 +30,7 @@ def read_log(log, print_stats=False):
             if event == "CONNECTION":
                 worker_address = arg.strip()
                 if worker_id not in worker_info:
-                    worker_info[worker_id] = {"host":worker_address, "connect time":time, "tasks":{}, "cache_updates":[], "first_task":float('inf'), "resources":[]}
+                    worker_info[worker_id] = {"host":worker_address, "connect time":time, "tasks":{}, "cache_updates":[], "input_transfers":[], "first_task":float('inf'), "resources":[]}
             elif event == "DISCONNECTION":
                 reason = arg.strip()
                 if reason == "FAILURE":
@@ -50,18 +40,21 @@ def read_log(log, print_stats=False):
             elif event == "RESOURCES":
                 worker_info[worker_id]["resources"].append(time)
             elif event == "CACHE_UPDATE":
-                (filename, sizeinmb, walltime) = arg.split()
+                # newer logs also have the start time of the update
+                (filename, sizeinmb, walltime, *start) = arg.split()
                 worker_info[worker_id]["cache_updates"].append([time, float(walltime)/1000000, filename])
             elif event == "TRANSFER":
-                (direction, filename, sizeinmb, walltime) = arg.split()
-                worker_info[worker_id]["tasks"][task_num]["I_transfer"].append([time, walltime])
+                (direction, filename, sizeinmb, walltime, *start) = arg.split()
+                if direction == "INPUT":
+                    # attributed to a task once all the tasks of the worker are known
+                    worker_info[worker_id]["input_transfers"].append([time, float(walltime)/1000000])
             continue
 
         if subject == "TASK":
             taskid = target
             if event == "RUNNING":
+                # the allocated resources are not plotted
                 (worker_id, step, resources) = arg.split(maxsplit=2)
-                resources = json.loads(resources)
                 worker_info[worker_id]["tasks"][taskid] = {"start":time, "stop":-1, "I_transfer":[]}
                 worker_of_task[taskid] = worker_id
                 if time < worker_info[worker_id]["first_task"]:
@@ -70,14 +63,15 @@ def read_log(log, print_stats=False):
                 worker_id = arg.strip()
                 worker_info[worker_id]["tasks"][taskid]["stop"] = time
             elif event == "DONE":
-                (reason, exit_code, limits, measured) = arg.split(maxsplit=3)
-                limits = json.loads(limits)
-                measured = json.loads(measured)
+                # the limits and measured resources, if any, are not plotted
+                (reason, exit_code, *reports) = arg.split(maxsplit=3)
                 if reason == "SUCCESS":
                     worker_id = worker_of_task[taskid]
                     worker_info[worker_id]["tasks"][taskid]["done"] = time
             continue
 
+    attribute_input_transfers()
+
     if print_stats:
         ####### WORKER STATS ############
         task_count = []
@@ -108,6 +102,21 @@ def read_log(log, print_stats=False):
                 "average_time_between_tasks", sum(time_between_tasks)/len(time_between_tasks))
         ###############################
 
+def task_index(worker):
+    # IntervalIndex of the tasks of the worker that have a start and stop time
+    tasks = {task: info for (task, info) in worker_info[worker]["tasks"].items() if info["stop"] != -1}
+    return IntervalIndex([info["start"] for info in tasks.values()], [info["stop"] for info in tasks.values()], tasks.keys())
+
+def attribute_input_transfers():
+    # an input transfer goes to the task that started last among the tasks
+    # running on the worker when the transfer ended.
+    for worker in worker_info:
+        index = task_index(worker)
+        for (time, walltime) in worker_info[worker]["input_transfers"]:
+            running = index.at(time)
+            if running:
+                worker_info[worker]["tasks"][running[-1]]["I_transfer"].append([time, walltime])
+
 def plot_resource_updates(manager_ref):
     xs = []
     ys = []
@@ -139,43 +148,34 @@ def plot_cache_updates(manager_ref):
     y = 0
     for worker in worker_info:
         y += 1
-        for cache_update in worker_info[worker]["cache_updates"]:
-            #  GETTING THE URL
-            if cache_update[2].startswith("url"):
-                for task in worker_info[worker]["tasks"]:
-                    task_info = worker_info[worker]["tasks"][task]
-                    update_time = cache_update[0]
-                    if task_info["start"] < update_time and task_info["stop"] > update_time:
-                        width = update_time - task_info["start"]
-                        if manager_ref:
-                            left =  task_info["start"] - manager_start
-                        else:
-                            left =  task_info["start"] - worker_info[worker]["first_task"]
-                        worker_info[worker]["tasks"][task]["start"] = update_time
-                        fetch_lefts.append(left)
-                        fetch_ys.append(y)
-                        fetch_widths.append(width)
+        if manager_ref:
+            reference = manager_start
+        else:
+            reference = worker_info[worker]["first_task"]
 
-            # DOING THE MINITASK
-            elif cache_update[2].startswith("task"):
-                for task in worker_info[worker]["tasks"]:
-                    task_info = worker_info[worker]["tasks"][task]
-                    update_time = cache_update[0]
-                    if task_info["start"] < update_time and task_info["stop"] > update_time:
-                        width = update_time - task_info["start"]
-                        if manager_ref:
-                            left =  task_info["start"] - manager_start
-                        else:
-                            left =  task_info["start"] - worker_info[worker]["first_task"]
-                        worker_info[worker]["tasks"][task]["start"] = update_time
-                        minitask_lefts.append(left)
-                        minitask_ys.append(y)
-                        minitask_widths.append(width)
-            else:
-                if manager_ref:
-                    x = cache_update[0] - manager_start
+        # urls fetched and minitasks run for the tasks of the worker
+        fetches = [u for u in worker_info[worker]["cache_updates"] if u[2].startswith(("url", "task"))]
+        fetch_index = EventIndex([u[0] for u in fetches], [u[2].startswith("url") for u in fetches])
+
+        for task_info in worker_info[worker]["tasks"].values():
+            # each fetch or minitask in the window of the task is drawn from the
+            # end of the previous one (or the start of the task), and the task
+            # is then drawn from the end of the last one.
+            for (update_time, is_url) in fetch_index.within(task_info["start"], task_info["stop"]):
+                if update_time <= task_info["start"]:
+                    continue
+                if is_url:
+                    (lefts, bar_ys, widths) = (fetch_lefts, fetch_ys, fetch_widths)
                 else:
-                    x = cache_update[0] - worker_info[worker]["first_task"]
+                    (lefts, bar_ys, widths) = (minitask_lefts, minitask_ys, minitask_widths)
+                lefts.append(task_info["start"] - reference)
+                bar_ys.append(y)
+                widths.append(update_time - task_info["start"])
+                task_info["start"] = update_time
+
+        for cache_update in worker_info[worker]["cache_updates"]:
+            if not cache_update[2].startswith(("url", "task")):
+                x = cache_update[0] - reference
                 if x > 0:
                     xs.append(x)
                     ys.append(y)
@@ -185,6 +185,7 @@ def plot_cache_updates(manager_ref):
     plt.barh(fetch_ys, fetch_widths, left=fetch_lefts, color="mistyrose", label='Curl URL')
 
 def plot_workers(title='Worker Info', all_info=False, save=None, c_updates=False, flip=False, resources=False, done=False, IT=False, OT=False, xticks=None, yticks=None, manager_ref=False):
+    use_backend(display=save is None)
     count = 0
     done_xs = []
     IT_lefts = []
@@ -310,12 +311,14 @@ if __name__ == "__main__":
     parser.add_argument('-d', action='store_true', help='display done markers')
     parser.add_argument('-i', action='store_true', help='display input transfers')
     parser.add_argument('-o', action='store_true', help='display output transfers')
-    parser.add_argument('-s', action='store_true', help='print stats')
+    parser.add_argument('-s', action='store_true', help='print stats, without plotting')
     parser.add_argument('-x', nargs=3, help='change scale for x ticks -x <start> <step_size> <steps>')
     parser.add_argument('-y', nargs=3, help='change scale for y ticks -y <start> <step_size> <steps>')
     parser.add_argument('-m', action='store_true', help='use manager start time as plot reference point Default: workers first task')
     args = parser.parse_args()
     read_log(args.log, args.s)
+    if args.s:
+        sys.exit(0)
     plot_workers(title=args.title,
                  all_info=args.a,
                  save=args.save,
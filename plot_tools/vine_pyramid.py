@@ -0,0 +1,329 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Multi-resolution index of the timeline of the workers, for views that pan and
+# zoom (vine_dashboard.py) without going through every task of the log.
+#
+# Each worker is a row. At each level of the index, the run is divided in time
+# buckets, twice as many as in the level above, and each (row, bucket) holds:
+#
+#   busy        mean task attempts running in the bucket (RUNNING to RETRIEVED,
+#               or to the disconnection of the worker for attempts lost there)
+#   connected   fraction of the bucket the worker was connected
+#   failures    attempts ending in the bucket without success, or lost
+#   transfers   transfers of the worker starting in the bucket
+#   transfer_mb MB of those transfers
+#
+# The finest level has as many buckets as fit in --cells cells over all the
+# rows, and the coarser levels are made by merging pairs of buckets. Below the
+# finest level, views use the task attempts and transfers themselves, sorted by
+# start, with the slot of each attempt in its worker (vine_slots.py).
+#
+# The index is written next to the log as .<log name>.<hash>.pyramid.npz, and
+# made again when the log changes.
+#
+# Running the program builds the index and times random views:
+#   python vine_pyramid.py <log> [--cells N] [--queries N]
+
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import vine_txn_cache
+from vine_slots import assign_slots
+from vine_txn import ParseTxn
+
+PYRAMID_VERSION = 2
+
+metrics = ["busy", "connected", "failures", "transfers", "transfer_mb"]
+
+# metrics that are means over the bucket, the rest are sums
+mean_metrics = ["busy", "connected"]
+
+DEFAULT_CELLS = 1 << 21
+COARSEST_BUCKETS = 64
+
+# most attempts and transfers sent for a view below the finest level
+RAW_LIMIT = 20000
+
+
+def cache_path(log, cells):
+    log = Path(log)
+    key = vine_txn_cache.cache_key(log, {"version": PYRAMID_VERSION, "cells": cells})
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+    return log.with_name(f".{log.name}.{digest}.pyramid.npz")
+
+
+def time_in_buckets(rows, starts, ends, n_rows, n_buckets, width):
+    # (n_rows, n_buckets) seconds covered by the intervals of each row in each
+    # bucket. An interval adds its partial first and last buckets directly, and
+    # the buckets in between through differences accumulated along the row.
+    starts = np.clip(starts, 0, n_buckets * width)
+    ends = np.clip(np.maximum(ends, starts), 0, n_buckets * width)
+    first = np.minimum((starts / width).astype(np.int64), n_buckets - 1)
+    last = np.minimum((ends / width).astype(np.int64), n_buckets - 1)
+    base = rows * (n_buckets + 1)
+
+    seconds = np.zeros(n_rows * (n_buckets + 1))
+    full = np.zeros(n_rows * (n_buckets + 1))
+    same = first == last
+    np.add.at(seconds, base[same] + first[same], ends[same] - starts[same])
+
+    (r, f, l, s, e) = (base[~same], first[~same], last[~same], starts[~same], ends[~same])
+    np.add.at(seconds, r + f, (f + 1) * width - s)
+    np.add.at(seconds, r + l, e - l * width)
+    np.add.at(full, r + f + 1, width)
+    np.add.at(full, r + l, -width)
+
+    seconds = seconds.reshape(n_rows, n_buckets + 1)
+    seconds += np.cumsum(full.reshape(n_rows, n_buckets + 1), axis=1)
+    return seconds[:, :-1]
+
+
+def count_in_buckets(rows, times, weights, n_rows, n_buckets, width):
+    # (n_rows, n_buckets) sum of the weights of the events of each row in each bucket
+    buckets = np.clip((times / width).astype(np.int64), 0, n_buckets - 1)
+    counts = np.bincount(rows * n_buckets + buckets, weights=weights, minlength=n_rows * n_buckets)
+    return counts.reshape(n_rows, n_buckets)
+
+
+class Pyramid:
+    # levels[k][metric]: (rows, buckets) float32 array of level k, level 0
+    # with COARSEST_BUCKETS buckets and each next level with twice as many.
+    # tasks and transfers: the raw records as dicts of arrays sorted by start.
+    def __init__(self, arrays):
+        self.duration = float(arrays["duration"])
+        self.workers = arrays["workers"].tolist()
+        self.hostports = arrays["hostports"].tolist()
+        self.slots = arrays["slots"]
+        self.categories = arrays["categories"].tolist()
+        self.filenames = arrays["filenames"].tolist()
+        self.levels = []
+        while f"busy.{len(self.levels)}" in arrays:
+            k = len(self.levels)
+            self.levels.append({m: arrays[f"{m}.{k}"] for m in metrics})
+        self.tasks = {k[len("task."):]: arrays[k] for k in arrays if k.startswith("task.")}
+        self.transfers = {k[len("transfer."):]: arrays[k] for k in arrays if k.startswith("transfer.")}
+        self.longest_task = float(np.max(self.tasks["end"] - self.tasks["start"], initial=0))
+        self.longest_transfer = float(np.max(self.transfers["end"] - self.transfers["start"], initial=0))
+
+    @property
+    def rows(self):
+        return len(self.workers)
+
+    def bucket_width(self, level):
+        return self.duration / self.levels[level]["busy"].shape[1]
+
+    def info(self):
+        return {"duration": self.duration, "workers": self.workers, "hostports": self.hostports,
+                "slots": self.slots.tolist(), "metrics": metrics,
+                "levels": [{"buckets": int(lv["busy"].shape[1]), "bucket_width": self.bucket_width(k)}
+                           for (k, lv) in enumerate(self.levels)],
+                "tasks": len(self.tasks["start"]), "transfers": len(self.transfers["start"])}
+
+    def level_for(self, t0, t1, width):
+        # the coarsest level with at least width buckets between t0 and t1, or
+        # None if even the finest level has fewer
+        for (k, lv) in enumerate(self.levels):
+            if (t1 - t0) / self.bucket_width(k) >= width:
+                return k
+        return None
+
+    def aggregate(self, metric, level, t0, t1, r0, r1, height):
+        # (values, b0, bucket_width, rows_per_value): the buckets of level that
+        # overlap [t0, t1) for rows [r0, r1), with rows merged in groups so
+        # that there are at most height of them.
+        values = self.levels[level][metric]
+        w = self.bucket_width(level)
+        b0 = max(0, int(t0 / w))
+        b1 = min(values.shape[1], int(np.ceil(t1 / w)))
+        values = values[r0:r1, b0:max(b0, b1)]
+
+        group = max(1, -(-values.shape[0] // max(1, height)))
+        if group > 1:
+            pad = -values.shape[0] % group
+            values = np.pad(values, ((0, pad), (0, 0))).reshape(-1, group, values.shape[1])
+            values = values.mean(axis=1) if metric in mean_metrics else values.sum(axis=1)
+        return (np.ascontiguousarray(values, dtype=np.float32), b0, w, group)
+
+    def raw(self, t0, t1, r0, r1, limit=RAW_LIMIT):
+        # (tasks, transfers): the records overlapping [t0, t1) in rows
+        # [r0, r1), as dicts of arrays, or None if there are more than limit
+        found = []
+        for (records, longest) in [(self.tasks, self.longest_task), (self.transfers, self.longest_transfer)]:
+            lo = np.searchsorted(records["start"], t0 - longest, side="left")
+            hi = np.searchsorted(records["start"], t1, side="left")
+            rows = records["row"][lo:hi]
+            keep = lo + np.flatnonzero((records["end"][lo:hi] >= t0) & (rows >= r0) & (rows < r1))
+            if len(keep) > limit:
+                return None
+            found.append({k: v[keep] for (k, v) in records.items()})
+        return tuple(found)
+
+
+def build(manager, cells=DEFAULT_CELLS):
+    # arrays of the index of the tables of a manager of ParseTxn
+    ws = manager.workers
+    ts = manager.tasks
+    xs = manager.transfers
+    duration = max(float(manager.termination), 1e-6)
+    as_array = lambda column: column.to_numpy(dtype=float, na_value=np.nan)
+
+    # a row per connection of a worker, in order of connection
+    ws = ws.sort_values("CONNECTION", kind="stable").reset_index(drop=True)
+    n_rows = max(1, len(ws))
+    row_of = {w: r for (r, w) in enumerate(ws["worker_id"])}
+    task_rows = ts["worker_id"].map(row_of).to_numpy(dtype=float, na_value=np.nan)
+    transfer_rows = xs["worker_id"].map(row_of).to_numpy(dtype=float, na_value=np.nan)
+
+    # attempts from RUNNING until retrieved, or the disconnection of their
+    # worker, or the end of the manager if still running
+    starts = as_array(ts["RUNNING"])
+    ends = as_array(ts["RETRIEVED"].fillna(ts["DISCONNECTION"]).fillna(manager.termination))
+    valid = ~(np.isnan(task_rows) | np.isnan(starts) | np.isnan(ends))
+    ends = np.maximum(ends, starts)
+    # retrieved without success, or lost with their worker
+    reasons = ts["reason"].fillna("SUCCESS").to_numpy(dtype=str)
+    failed = (reasons != "SUCCESS") | ~ts["DISCONNECTION"].isna().to_numpy()
+    (categories, category_names) = pd.factorize(ts["category"].fillna("default"))
+    (task_rows, starts, ends, failed) = (task_rows[valid].astype(np.int64), starts[valid], ends[valid], failed[valid])
+    slots = assign_slots(task_rows, starts, ends)
+
+    x_starts = as_array(xs["start_time"])
+    x_ends = x_starts + as_array(xs["wall_time"]).clip(min=0)
+    sizes = np.nan_to_num(as_array(xs["size"]))
+    x_valid = ~(np.isnan(transfer_rows) | np.isnan(x_starts) | np.isnan(x_ends))
+    (filenames, filename_names) = pd.factorize(xs["filename"].fillna(""))
+    (directions, direction_names) = pd.factorize(xs["direction"].fillna(""))
+    (transfer_rows, x_starts, x_ends, sizes) = (transfer_rows[x_valid].astype(np.int64), x_starts[x_valid], x_ends[x_valid], sizes[x_valid])
+
+    connected_starts = as_array(ws["CONNECTION"])
+    connected_ends = as_array(ws["DISCONNECTION"].fillna(duration))
+
+    # finest level, with a power of two times the coarsest buckets
+    n_buckets = COARSEST_BUCKETS
+    while 2 * n_buckets * n_rows <= cells:
+        n_buckets *= 2
+    width = duration / n_buckets
+
+    finest = {
+        "busy": time_in_buckets(task_rows, starts, ends, n_rows, n_buckets, width) / width,
+        "connected": time_in_buckets(np.arange(len(ws)), connected_starts, connected_ends, n_rows, n_buckets, width) / width,
+        "failures": count_in_buckets(task_rows[failed], ends[failed], None, n_rows, n_buckets, width),
+        "transfers": count_in_buckets(transfer_rows, x_starts, None, n_rows, n_buckets, width),
+        "transfer_mb": count_in_buckets(transfer_rows, x_starts, sizes, n_rows, n_buckets, width),
+    }
+
+    levels = [{m: v.astype(np.float32) for (m, v) in finest.items()}]
+    while levels[0]["busy"].shape[1] > COARSEST_BUCKETS:
+        pairs = {m: v.reshape(n_rows, -1, 2) for (m, v) in levels[0].items()}
+        levels.insert(0, {m: v.mean(axis=2) if m in mean_metrics else v.sum(axis=2) for (m, v) in pairs.items()})
+
+    task_order = np.argsort(starts, kind="stable")
+    transfer_order = np.argsort(x_starts, kind="stable")
+    row_slots = np.zeros(n_rows, dtype=np.int64)
+    np.maximum.at(row_slots, task_rows, slots)
+
+    arrays = {"duration": np.float64(duration),
+              "workers": np.array(ws["worker_id"].fillna(""), dtype=str),
+              "hostports": np.array(ws["hostport"].fillna(""), dtype=str),
+              "slots": np.maximum(row_slots, 1),
+              "categories": np.array(category_names, dtype=str),
+              "filenames": np.array(filename_names, dtype=str),
+              "directions": np.array(direction_names, dtype=str),
+              "task.row": task_rows[task_order],
+              "task.slot": slots[task_order],
+              "task.start": starts[task_order],
+              "task.end": ends[task_order],
+              "task.task_id": ts["task_id"].to_numpy(dtype=np.int64)[valid][task_order],
+              "task.category": categories[valid][task_order],
+              "task.failed": failed[task_order],
+              "transfer.row": transfer_rows[transfer_order],
+              "transfer.start": x_starts[transfer_order],
+              "transfer.end": x_ends[transfer_order],
+              "transfer.size": sizes[transfer_order],
+              "transfer.filename": filenames[x_valid][transfer_order],
+              "transfer.direction": directions[x_valid][transfer_order]}
+    for (k, lv) in enumerate(levels):
+        for (m, v) in lv.items():
+            arrays[f"{m}.{k}"] = v
+    return arrays
+
+
+def read_pyramid(log, cells=DEFAULT_CELLS, cache=True, jobs=1):
+    # Pyramid of the manager of the log with the most tasks, from the cache
+    # next to the log when there is one.
+    path = cache_path(log, cells)
+    if cache:
+        try:
+            with np.load(path) as arrays:
+                return Pyramid(dict(arrays))
+        except (OSError, ValueError):
+            pass
+
+    # with expand_waiting, the tables have every attempt dispatched to a
+    # worker, also those lost when their worker disconnected
+    p = ParseTxn(log, expand_waiting=True, cache=cache, jobs=jobs)
+    managers = [m for m in p.managers.values() if len(m.workers)]
+    if not managers:
+        raise ValueError(f"no workers found in {log}")
+    m = max(managers, key=lambda m: len(m.tasks))
+    arrays = build(m, cells)
+
+    if cache:
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+            # indexes of older versions of the log
+            for old in path.parent.glob(f".{Path(log).name}.*.pyramid.npz"):
+                if old != path:
+                    old.unlink()
+        except OSError as e:
+            print(f"Could not write index {path}: {e}", file=sys.stderr)
+    return Pyramid(arrays)
+
+
+def benchmark(pyramid, queries, width=1500, height=800, seed=0):
+    # times random views, as a dashboard of width x height pixels would ask for them
+    rng = np.random.default_rng(seed)
+    times = {"aggregate": [], "raw": []}
+    for _ in range(queries):
+        span = pyramid.duration * 10 ** rng.uniform(-4, 0)
+        t0 = rng.uniform(0, pyramid.duration - span)
+        t = time.perf_counter()
+        level = pyramid.level_for(t0, t0 + span, width)
+        found = pyramid.raw(t0, t0 + span, 0, pyramid.rows) if level is None else None
+        if found is None:
+            pyramid.aggregate("busy", level if level is not None else len(pyramid.levels) - 1, t0, t0 + span, 0, pyramid.rows, height)
+            times["aggregate"].append(time.perf_counter() - t)
+        else:
+            times["raw"].append(time.perf_counter() - t)
+    for (kind, ts) in times.items():
+        if ts:
+            print(f"{kind:>9} views: {len(ts):>5}  median {1000 * np.median(ts):7.2f} ms  max {1000 * np.max(ts):7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the multi-resolution index of the timeline of the workers of a log, and time views of it.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('--cells', type=int, default=DEFAULT_CELLS, help='rows times buckets of the finest level of the index')
+    parser.add_argument('--queries', type=int, default=200, help='number of random views to time')
+    parser.add_argument('--jobs', type=int, default=1, help='number of processes to parse the log')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the log and build the index, without reading or writing their caches')
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    pyramid = read_pyramid(args.log, args.cells, cache=not args.no_cache, jobs=args.jobs)
+    print(f"index of {pyramid.rows} workers, {len(pyramid.tasks['start'])} attempts, and {len(pyramid.transfers['start'])} transfers in {time.perf_counter() - t:.2f}s")
+    for (k, lv) in enumerate(pyramid.info()["levels"]):
+        print(f"level {k:>2}: {lv['buckets']:>7} buckets of {lv['bucket_width']:10.4f}s")
+    benchmark(pyramid, args.queries)
@@ -0,0 +1,361 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Replication of the files cached at the workers, and the fetches that could
+# have been avoided.
+#
+# The transfers table of ParseTxn is read once in order of start, keeping a
+# dictionary from each file name to the workers with a copy of it. Cache names
+# are derived from the content (url-md5-..., task-md5-...), so a file name
+# stands for its content. For each fetch (a CACHE_UPDATE or TRANSFER INPUT
+# with a wall time) the pass finds:
+#
+#   - its source, from the direction and the type prefix of the name: the
+#     manager (TRANSFER INPUT), a url (url-), a minitask run at the worker
+#     (task-), or another worker (temp-). The log does not record the worker a
+#     peer transfer came from,
+#   - whether the worker had fetched the file already (a repeat),
+#   - the copies of the file at other workers, complete and still connected
+#     when the fetch started. Fetches after the first copy whose file was
+#     already at a worker, and repeats, are redundant.
+#
+# Older logs write TRANSFER records with the name of the file at the task
+# (e.g. query.file) instead of its cache name. Such a name fetched again by the
+# same worker is taken as a different file for each task, and its fetches are
+# not redundant.
+#
+# CACHE_UPDATE records without a wall time (e.g. the outputs of tasks, or the
+# first record of a minitask) add a copy, but do not move data.
+#
+# From the same index: the bytes moved and redundant for each file, the copies
+# of each file at the workers over time (a copy lasts until its worker
+# disconnects), and the seconds each task attempt waited for url and minitask
+# fetches on its worker, between RUNNING and the start of its execution.
+#
+# Running the program:
+#   python vine_replicas.py <log> [output] [--stats] [--csv prefix] [--files N] [--filetype ...]
+
+from bisect import bisect_right, insort
+import argparse
+import re
+import sys
+import numpy as np
+import pandas as pd
+
+from vine_intervals import index_by_worker
+from vine_lazy import plt, use_backend
+from vine_occupancy import sweep
+from vine_transfers import quantiles
+from vine_txn import ParseTxn
+
+cache_names = re.compile(r"^[a-z]+-(.*-)?(md5|rnd)-")
+
+sources = ["manager", "url", "minitask", "worker", "cache"]
+
+# sources that cost the task waiting for them
+fetch_costs = {"url": "url_seconds", "minitask": "minitask_seconds"}
+
+
+def is_cache_name(filename):
+    # names of the cache of the workers, e.g. url-md5-et-..., task-rnd-...,
+    # and of older logs, e.g. url-0-ET-md5-.... Other names are those of the
+    # files at the task, and the same name may be a different file for each task.
+    return cache_names.match(filename) is not None
+
+
+def source_of(direction, filetype):
+    if direction == "INPUT":
+        return "manager"
+    return {"url": "url", "task": "minitask", "temp": "worker"}.get(filetype, "cache")
+
+
+class FileCopies:
+    # the workers with a copy of a file, in the index of replicate()
+    def __init__(self):
+        self.ready = {}          # worker -> time its first copy was complete
+        self.fetched = set()     # workers that fetched the file
+        self.ready_times = []    # sorted times of the first copy of each worker
+        self.gone_times = []     # sorted times those workers disconnected
+
+    def available(self, worker, start):
+        # copies complete at other workers still connected at start
+        n = bisect_right(self.ready_times, start) - bisect_right(self.gone_times, start)
+        ready = self.ready.get(worker, None)
+        if ready is not None and ready <= start:
+            n -= 1
+        return n
+
+    def add(self, worker, end, gone):
+        if worker in self.ready:
+            return False
+        self.ready[worker] = end
+        insort(self.ready_times, end)
+        insort(self.gone_times, gone)
+        return True
+
+
+def replicate(transfers, workers, termination):
+    # (fetches, copies): the transfers sent to the workers, in order of start,
+    # with their source, end_time, and whether they moved data, repeated a
+    # fetch of the worker, or were redundant, and the copies available when
+    # they started. copies has a row per file and worker with a copy, with the
+    # time it was ready and the time its worker disconnected.
+    df = transfers[transfers["direction"] != "OUTPUT"].sort_values("start_time", kind="stable").reset_index(drop=True)
+    gone = dict(zip(workers["worker_id"], workers["DISCONNECTION"].fillna(termination)))
+
+    files = {}
+    n = len(df)
+    (available, repeat, redundant, added) = (np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool),
+                                             np.zeros(n, dtype=bool), np.zeros(n, dtype=bool))
+    moved = (df["wall_time"] > 0).to_numpy()
+    ends = (df["start_time"] + df["wall_time"]).to_numpy(dtype=float)
+
+    for (i, (filename, worker, start, end)) in enumerate(zip(df["filename"].tolist(), df["worker_id"].tolist(),
+                                                              df["start_time"].tolist(), ends.tolist())):
+        f = files.get(filename, None)
+        if f is None:
+            f = files[filename] = FileCopies()
+        if moved[i]:
+            available[i] = f.available(worker, start)
+            repeat[i] = worker in f.fetched
+            redundant[i] = repeat[i] or available[i] > 0
+            f.fetched.add(worker)
+        added[i] = f.add(worker, end, gone.get(worker, termination))
+
+    # files at the task fetched again by the same worker are a different file
+    # for each task, and not redundant
+    per_task = df.loc[repeat, "filename"].unique()
+    per_task = [name for name in per_task if not is_cache_name(name)]
+    if per_task:
+        other = df["filename"].isin(per_task).to_numpy()
+        repeat[other] = False
+        redundant[other] = False
+
+    df["source"] = [source_of(d, t) for (d, t) in zip(df["direction"].tolist(), df["filetype"].tolist())]
+    df["end_time"] = ends
+    df["moved"] = moved
+    df["copies_available"] = available
+    df["repeat"] = repeat
+    df["redundant"] = redundant
+
+    copies = df.loc[added, ["filename", "filetype", "source", "worker_id", "end_time"]].rename(columns={"end_time": "ready"})
+    copies["gone"] = copies["worker_id"].map(gone).fillna(termination).to_numpy(dtype=float)
+    return (df, copies.reset_index(drop=True))
+
+
+def file_stats(fetches, copies):
+    # for each file: size, fetches, workers with a copy, repeats, redundant
+    # fetches, MB moved and redundant, time of the first and last copy, and the
+    # most copies at once
+    moved = fetches[fetches["moved"]]
+    fs = fetches.groupby("filename").agg(filetype=("filetype", "first"), source=("source", "first"), size=("size", "max"))
+    g = moved.groupby("filename")
+    fs["fetches"] = g.size()
+    fs["workers"] = copies.groupby("filename").size()
+    fs["repeats"] = g["repeat"].sum()
+    fs["redundant"] = g["redundant"].sum()
+    fs["MB_moved"] = g["size"].sum()
+    fs["MB_redundant"] = moved["size"].where(moved["redundant"], 0).groupby(moved["filename"]).sum()
+    fs["first"] = copies.groupby("filename")["ready"].min()
+    fs["last"] = copies.groupby("filename")["ready"].max()
+    fs["max_copies"] = max_copies(copies)
+    fs = fs.fillna({"fetches": 0, "repeats": 0, "redundant": 0, "MB_moved": 0, "MB_redundant": 0})
+    counts = ["fetches", "workers", "repeats", "redundant", "max_copies"]
+    fs[counts] = fs[counts].fillna(0).astype(np.int64)
+    return fs.sort_values(["MB_moved", "workers"], ascending=False).reset_index()
+
+
+def max_copies(copies):
+    # most copies of each file at once, from the copies of all the files
+    # sorted by (file, time), with a copy lost before one is added at the same time
+    (codes, names) = pd.factorize(copies["filename"])
+    times = np.concatenate([copies["ready"].to_numpy(dtype=float), np.maximum(copies["gone"], copies["ready"]).to_numpy(dtype=float)])
+    deltas = np.concatenate([np.ones(len(codes)), -np.ones(len(codes))])
+    codes = np.concatenate([codes, codes])
+    order = np.lexsort((deltas, times, codes))
+    (codes, deltas) = (codes[order], deltas[order])
+    levels = np.cumsum(deltas)
+    # the count of each file starts from the total of the files before it
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    levels -= np.repeat(np.r_[0, levels[starts[1:] - 1]], np.diff(np.r_[starts, len(codes)]))
+    most = np.zeros(len(names))
+    np.maximum.at(most, codes, levels)
+    return pd.Series(most, index=names)
+
+
+def copies_over_time(copies, by="source"):
+    # DataFrame with the time of each change and the copies at the workers of
+    # the files of each value of by from that time until the next row
+    groups = list(copies.groupby(by, sort=True))
+    (times, levels) = sweep([(g["ready"], g["gone"], 1) for (_, g) in groups])
+    cs = pd.DataFrame(np.rint(levels), columns=[k for (k, _) in groups])
+    cs.insert(0, "time", times)
+    return cs
+
+
+def task_costs(tasks, fetches):
+    # for each task attempt with a worker: the seconds between RUNNING and the
+    # start of its execution (or its retrieval), and the seconds of that time
+    # with url and minitask fetches of its worker in progress
+    ts = tasks[~tasks["worker_id"].isna() & ~tasks["RUNNING"].isna()].copy()
+    ts["ready"] = ts["time_worker_start"].fillna(ts["RETRIEVED"])
+    ts = ts[~ts["ready"].isna()]
+    ts["staging_seconds"] = (ts["ready"] - ts["RUNNING"]).clip(lower=0)
+
+    ts = ts.reset_index(drop=True)
+    (running, ready) = (ts["RUNNING"].to_numpy(dtype=float), ts["ready"].to_numpy(dtype=float))
+    index = index_by_worker(ts, "RUNNING", "ready")
+    waits = {}    # row -> [(start, end, source)] of the fetches it waited for
+    waiting = fetches[fetches["moved"] & fetches["source"].isin(list(fetch_costs))]
+    for (worker, source, start, end) in zip(waiting["worker_id"].tolist(), waiting["source"].tolist(),
+                                            waiting["start_time"].tolist(), waiting["end_time"].tolist()):
+        tasks_index = index.get(worker, None)
+        if tasks_index is None:
+            continue
+        # the attempts waiting when the fetch ended
+        for row in tasks_index.at(end):
+            (lo, hi) = (max(start, running[row]), min(end, ready[row]))
+            if hi > lo:
+                waits.setdefault(row, []).append((lo, hi, source))
+
+    # fetches of a task may be in progress at the same time, so its
+    # fetch_seconds are those with at least one of them in progress
+    seconds = {column: np.zeros(len(ts)) for column in list(fetch_costs.values()) + ["fetch_seconds"]}
+    for (row, intervals) in waits.items():
+        covered_until = -np.inf
+        for (lo, hi, source) in sorted(intervals):
+            seconds[fetch_costs[source]][row] += hi - lo
+            seconds["fetch_seconds"][row] += max(0, hi - max(lo, covered_until))
+            covered_until = max(covered_until, hi)
+    for (column, values) in seconds.items():
+        ts[column] = values
+    return ts[["task_id", "attempt_number", "category", "worker_id", "RUNNING", "staging_seconds"]
+              + list(fetch_costs.values()) + ["fetch_seconds"]].reset_index(drop=True)
+
+
+def cost_stats(costs):
+    # by category: attempts, attempts waiting for fetches, and the seconds waited
+    rows = []
+    for (category, g) in costs.groupby(costs["category"].fillna("default")):
+        waited = g[g["fetch_seconds"] > 0]
+        rows.append({"category": category, "attempts": len(g), "waited": len(waited),
+                     "staging_seconds": g["staging_seconds"].sum(),
+                     **{c: g[c].sum() for c in fetch_costs.values()},
+                     **quantiles(waited["fetch_seconds"], "fetch_seconds")})
+    return pd.DataFrame(rows)
+
+
+def source_stats(fetches):
+    moved = fetches[fetches["moved"]]
+    rows = []
+    for (source, g) in moved.groupby("source"):
+        rows.append({"source": source, "fetches": len(g), "files": g["filename"].nunique(),
+                     "MB": g["size"].sum(), "seconds": g["wall_time"].sum(),
+                     "repeats": int(g["repeat"].sum()), "redundant": int(g["redundant"].sum()),
+                     "MB_redundant": g.loc[g["redundant"], "size"].sum()})
+    return pd.DataFrame(rows)
+
+
+def print_stats(fetches, fs, costs, files=10):
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+        print("fetches by source")
+        print(source_stats(fetches).to_string(index=False))
+        print()
+        print(f"files with the most MB moved (of {len(fs)})")
+        print(fs.head(files).to_string(index=False))
+        print()
+        print("seconds task attempts waited for url and minitask fetches")
+        print(cost_stats(costs).to_string(index=False))
+        print()
+
+
+def plot_replicas(fetches, copies, fs, costs, files=10, title=None, output=None):
+    use_backend(display=output is None)
+    fig = plt.figure(constrained_layout=True, figsize=(12, 8))
+    ((replicas, moved), (fetched, waited)) = fig.subplots(nrows=2, ncols=2)
+
+    # copies of the files fetched at least once, and not only created at the workers
+    copies = copies[copies["filename"].isin(fetches.loc[fetches["moved"], "filename"].unique())]
+    cs = copies_over_time(copies)
+    for source in cs.columns[1:]:
+        replicas.step(cs["time"], cs[source], where="post", label=source)
+    for filename in fs["filename"].head(files):
+        c = copies_over_time(copies[copies["filename"] == filename], by="filename")
+        replicas.step(c["time"], c[filename], where="post", linewidth=0.8, linestyle="--")
+    replicas.set_xlabel("time from manager start (s)")
+    replicas.set_ylabel("copies at the workers")
+    replicas.legend(fontsize="small")
+
+    top = fs.head(files).iloc[::-1]
+    moved.barh(top["filename"], top["MB_moved"] - top["MB_redundant"], label="first copies")
+    moved.barh(top["filename"], top["MB_redundant"], left=top["MB_moved"] - top["MB_redundant"], label="redundant")
+    moved.set_xlabel("MB moved")
+    moved.tick_params(axis="y", labelsize="x-small")
+    moved.legend(fontsize="small")
+
+    done = fetches[fetches["moved"]].sort_values("end_time", kind="stable")
+    for (i, (source, g)) in enumerate(done.groupby("source")):
+        fetched.step(g["end_time"], np.arange(1, len(g) + 1), where="post", color=f"C{i}", label=source)
+        fetched.step(g["end_time"], g["redundant"].cumsum(), where="post", color=f"C{i}", linestyle=":", label=f"{source}, redundant")
+    fetched.set_xlabel("time from manager start (s)")
+    fetched.set_ylabel("fetches done")
+    fetched.sharex(replicas)
+    fetched.legend(fontsize="x-small")
+
+    for column in fetch_costs.values():
+        values = np.sort(costs.loc[costs[column] > 0, column].to_numpy())
+        if len(values):
+            waited.step(values, np.arange(1, len(values) + 1) / len(costs), where="post", label=column)
+    waited.set_xscale("log")
+    waited.set_xlabel("seconds waited for fetches")
+    waited.set_ylabel("fraction of task attempts")
+    if waited.lines:
+        waited.legend(fontsize="small")
+
+    if title:
+        fig.suptitle(title)
+
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the replication of the files cached at the workers, and the fetches that could have been avoided.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('output', nargs='?', default=None, help='output file of the plot. If not given, the plot is displayed.')
+    parser.add_argument('--stats', action='store_true', help='print the statistics without plotting')
+    parser.add_argument('--csv', default=None, help='write the fetches, files, copies, and tasks tables to <prefix>.<table>.csv')
+    parser.add_argument('--filetype', default=None, help='comma separated filetypes to keep (e.g. url,task,temp,file)')
+    parser.add_argument('--files', type=int, default=10, help='number of files with the most MB moved to print and plot')
+    parser.add_argument('--title', default=None, help='title of the plot')
+    parser.add_argument('--jobs', type=int, default=1, help='number of processes to parse the log')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the log, without reading or writing the cache of its tables')
+    args = parser.parse_args()
+
+    p = ParseTxn(args.log, cache=not args.no_cache, jobs=args.jobs)
+    managers = [m for m in p.managers.values() if len(m.transfers)]
+    for m in managers:
+        xs = m.transfers
+        if args.filetype:
+            xs = xs[xs["filetype"].isin(args.filetype.split(","))]
+        (fetches, copies) = replicate(xs, m.workers, m.termination)
+        if fetches.empty:
+            print(f"manager {m.pid}: no files sent to the workers", file=sys.stderr)
+            continue
+        fs = file_stats(fetches, copies)
+        costs = task_costs(m.tasks, fetches)
+
+        print(f"manager {m.pid}: {int(fetches['moved'].sum())} fetches of {len(fs)} files, {len(copies)} copies")
+        print_stats(fetches, fs, costs, files=args.files)
+
+        if args.csv:
+            prefix = args.csv if len(managers) == 1 else f"{args.csv}.{m.pid}"
+            fetches.to_csv(f"{prefix}.fetches.csv", index=False)
+            fs.to_csv(f"{prefix}.files.csv", index=False)
+            copies.to_csv(f"{prefix}.copies.csv", index=False)
+            costs.to_csv(f"{prefix}.tasks.csv", index=False)
+        if not args.stats and not args.csv:
+            plot_replicas(fetches, copies, fs, costs, files=args.files, title=args.title, output=args.output)
@@ -0,0 +1,24 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Loading of the plot scripts of taskvine_paper as modules, e.g. to use their
+# TxnPlot classes and argument parsers from other tools. The scripts have no
+# .py extension, so they cannot be imported by name.
+
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from pathlib import Path
+
+# resolved path -> module, so that each script is loaded once per process
+scripts = {}
+
+
+def load_script(path):
+    path = str(Path(path).resolve())
+    if path not in scripts:
+        loader = SourceFileLoader(Path(path).name, path)
+        module = module_from_spec(spec_from_loader(loader.name, loader))
+        loader.exec_module(module)
+        scripts[path] = module
+    return scripts[path]
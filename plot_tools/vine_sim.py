@@ -0,0 +1,591 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# What-if replay of the tasks of a transaction log on a different pool of
+# workers.
+#
+# The workload is read from the tables of ParseTxn: for each task, the time it
+# was submitted, its cores, the seconds it executed at the worker, the seconds
+# the manager took to send it and its inputs, and the size of its output. The
+# files cached at the workers (CACHE_UPDATE) are attributed to the next task
+# that started on the worker after the file arrived: files that more than one
+# worker fetched are shared by the categories of the tasks that needed them,
+# and files fetched only once are inputs of their task. Files cached without a
+# wall time are outputs of tasks, and are not fetched. The times of the log
+# are taken from its first dispatch, as the replay starts with all its workers
+# connected.
+#
+# The replay is a discrete event simulation of the manager: tasks are
+# dispatched in order of submission to the next worker with enough free
+# cores, and events (a task finishing at the worker, its output retrieved, a
+# worker failing or connecting) are kept in a heap by time. The manager sends
+# tasks, inputs, and outputs one at a time over its link. A worker gets the
+# shared files of a task once, one after the other in the order the log first
+# cached them, as a file may be made from the previous ones. Each file comes
+# from its source: urls (url-*) from outside, with the bandwidth of a worker,
+# the outputs of minitasks (task-*) from running the minitask at the worker,
+# for the seconds it took in the log, and other files from the manager. With
+# --transfers peer, a file comes instead from any worker that has a copy if
+# that finishes first, with each worker sending one file at a time. Inputs of
+# a single task from a url or a minitask add to the time of the task at the
+# worker. With --churn, workers fail after an exponentially distributed
+# lifetime, their tasks are dispatched again, and they are replaced by new
+# workers without any cached file. Libraries are not replayed: the function
+# calls of a log with libraries (e.g., taskvine_paper/gmo) run as tasks on the
+# cores of the workers.
+#
+# The result is the predicted makespan, and optionally a synthetic log of the
+# replay, in the format of vine_txn_gen.py, that the plot scripts can render.
+# Several numbers of workers may be given to sweep them, e.g., --workers
+# 50,200,700, and --tasks resamples the workload to any number of tasks.
+#
+# Running the program:
+#   python vine_sim.py <log> [--workers N,...] [--cores N] [--transfers manager|peer] [--churn seconds] [--tasks N] [--output log]
+#
+# Replaying a log on its own number of workers should give about the makespan
+# of the log, see tests/test_vine_sim.py.
+
+import argparse
+import heapq
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from vine_occupancy import sweep
+from vine_txn import ParseTxn
+from vine_txn_gen import header, resources_json
+
+transfer_models = ["manager", "peer"]
+
+# MB/s used when the log has no transfers to estimate a bandwidth from
+DEFAULT_BANDWIDTH = 100.0
+
+# events of the simulation
+(FINISH, RETRIEVED, FAILURE, CONNECT) = range(4)
+
+
+class Workload:
+    # the tasks to replay, in order of submission, as lists indexed by task.
+    # files: names of the shared files, sizes: their MB, sources: where they
+    # come from ("url", "task", or "manager"), seconds: the seconds a minitask
+    # takes to make them, and category_files: for each category, the (file,
+    # MB) needed by its tasks.
+    def __init__(self, submit, cores, duration, commit, input_mb, output_mb, category,
+                 categories, files, sizes, sources, seconds, category_files):
+        self.submit = submit
+        self.cores = cores
+        self.duration = duration
+        self.commit = commit
+        self.input_mb = input_mb
+        self.output_mb = output_mb
+        self.category = category
+        self.categories = categories
+        self.files = files
+        self.sizes = sizes
+        self.sources = sources
+        self.seconds = seconds
+        self.category_files = category_files
+
+        # defaults of the pool and the transfers, from the log
+        self.workers = 1
+        self.worker_cores = max(cores) if cores else 1
+        self.manager_bandwidth = DEFAULT_BANDWIDTH
+        self.peer_bandwidth = DEFAULT_BANDWIDTH
+        self.url_bandwidth = DEFAULT_BANDWIDTH
+        self.makespan = math.nan
+
+    def __len__(self):
+        return len(self.submit)
+
+    def resample(self, n, seed=0):
+        # n tasks drawn with replacement, with the submission times of the draw
+        rng = np.random.default_rng(seed)
+        picks = rng.integers(0, len(self), n)
+        picks = picks[np.argsort(np.asarray(self.submit)[picks], kind="stable")]
+        take = lambda values: [values[i] for i in picks.tolist()]
+        w = Workload(take(self.submit), take(self.cores), take(self.duration), take(self.commit),
+                     take(self.input_mb), take(self.output_mb), take(self.category),
+                     self.categories, self.files, self.sizes, self.sources, self.seconds, self.category_files)
+        (w.workers, w.worker_cores) = (self.workers, self.worker_cores)
+        (w.manager_bandwidth, w.peer_bandwidth, w.url_bandwidth) = (self.manager_bandwidth, self.peer_bandwidth, self.url_bandwidth)
+        w.makespan = self.makespan
+        return w
+
+
+def bandwidth(transfers, direction):
+    # median MB/s of the transfers of at least 1 MB, or of any size if none is
+    moved = transfers[(transfers["direction"] == direction) & (transfers["wall_time"] > 0) & (transfers["size"] > 0)]
+    large = moved[moved["size"] >= 1]
+    moved = large if len(large) else moved
+    return float((moved["size"] / moved["wall_time"]).median()) if len(moved) else math.nan
+
+
+def read_workload(log, cache=True):
+    # Workload of the manager of the log with the most tasks
+    p = ParseTxn(log, cache=cache)
+    managers = [m for m in p.managers.values() if len(m.tasks)]
+    if not managers:
+        raise ValueError(f"no tasks found in {log}")
+    m = max(managers, key=lambda m: len(m.tasks))
+
+    attempts = m.tasks[m.tasks["library"].isna()]
+    # e.g., the manager may wait for its workers to connect before dispatching
+    origin = float(attempts["RUNNING"].min())
+    submit = attempts.groupby("task_id", sort=False)["WAITING"].min() - origin
+    ts = attempts.drop_duplicates("task_id", keep="last").set_index("task_id")
+    ts["submit"] = submit
+    ts = ts.sort_values("submit", kind="stable")
+    as_array = lambda column: ts[column].to_numpy(dtype=float, na_value=np.nan)
+
+    duration = as_array("time_worker_end") - as_array("time_worker_start")
+    duration = np.where(np.isnan(duration), as_array("RETRIEVED") - as_array("RUNNING"), duration)
+    commit = as_array("time_commit_end") - as_array("time_commit_start")
+    cores = ts["allocated_cores"].fillna(ts["requested_cores"]).to_numpy(dtype=float, na_value=np.nan)
+    cores = np.where(np.isnan(cores) | (cores <= 0), 1, cores)
+    (category, categories) = pd.factorize(ts["category"].fillna("default"))
+
+    # files fetched by the workers, and the task that started next on the worker
+    xs = m.transfers
+    cached = xs[(xs["direction"] == "CACHE_UPDATE") & (xs["size"] > 0) & (xs["wall_time"] > 0)]
+    cached = cached.dropna(subset=["worker_id"]).sort_values("time")
+    # seconds a minitask made its output at the worker, from the previous file
+    # fetched by the worker, e.g., the url that the minitask unpacks
+    previous = cached.groupby("worker_id")["time"].shift()
+    cached = cached.assign(made=cached["time"] - np.fmax(cached["start_time"], previous))
+    cached = cached[["worker_id", "time", "filename", "filetype", "size", "wall_time", "made"]]
+    starts = pd.DataFrame({"worker_id": ts["worker_id"].to_numpy(), "start": as_array("time_worker_start"),
+                           "task": np.arange(len(ts))}).dropna(subset=["worker_id", "start"])
+    cached = pd.merge_asof(cached, starts.sort_values("start"),
+                           left_on="time", right_on="start", by="worker_id", direction="forward").dropna(subset=["task"])
+    cached["task"] = cached["task"].astype(np.int64)
+
+    input_mb = np.zeros(len(ts))
+    (files, sizes, sources, seconds, needed) = ([], [], [], [], [set() for _ in categories])
+    for (filename, g) in cached.groupby("filename", sort=False):
+        size = float(g["size"].max())
+        filetype = g["filetype"].iloc[0]
+        source = filetype if filetype in ("url", "task") else "manager"
+        if g["worker_id"].nunique() == 1 and len(g) == 1:
+            task = g["task"].iloc[0]
+            if source == "manager":
+                input_mb[task] += size
+            else:
+                duration[task] += g["wall_time"].iloc[0] if source == "url" else g["made"].iloc[0]
+            continue
+        for c in set(category[g["task"].to_numpy()].tolist()):
+            needed[c].add(len(files))
+        files.append(filename)
+        sizes.append(size)
+        sources.append(source)
+        seconds.append(float(g["made"].median()) if source == "task" else 0.0)
+
+    w = Workload(np.nan_to_num(as_array("submit")).clip(0).tolist(), cores.tolist(),
+                 np.nan_to_num(duration).clip(0).tolist(), np.nan_to_num(commit).clip(0).tolist(),
+                 input_mb.tolist(), ts["size_output_mgr"].fillna(0).to_numpy(dtype=float).tolist(),
+                 category.tolist(), [str(c) for c in categories], files, sizes, sources, seconds,
+                 [tuple((f, sizes[f]) for f in sorted(fs)) for fs in needed])
+
+    ws = m.workers
+    (_, connected) = sweep([(ws["CONNECTION"], ws["DISCONNECTION"], 1)])
+    w.workers = max(1, int(connected.max())) if len(connected) else 1
+    worker_cores = ws["cores"].dropna()
+    w.worker_cores = float(worker_cores.median()) if len(worker_cores) else max(w.cores)
+    w.manager_bandwidth = bandwidth(xs, "INPUT")
+    w.peer_bandwidth = bandwidth(xs[~xs["filetype"].isin(["url", "task"])], "CACHE_UPDATE")
+    w.url_bandwidth = bandwidth(xs[xs["filetype"] == "url"], "CACHE_UPDATE")
+    if math.isnan(w.manager_bandwidth):
+        w.manager_bandwidth = DEFAULT_BANDWIDTH if math.isnan(w.peer_bandwidth) else w.peer_bandwidth
+    if math.isnan(w.peer_bandwidth):
+        w.peer_bandwidth = w.manager_bandwidth
+    if math.isnan(w.url_bandwidth):
+        w.url_bandwidth = w.peer_bandwidth
+    w.makespan = float(ts["RETRIEVED"].max()) - origin
+    return w
+
+
+class LogWriter:
+    # lines of a synthetic log, in order of time. Lines of events that end
+    # later than the current time of the simulation (e.g., a transfer) wait
+    # in a heap until the simulation reaches their time.
+    def __init__(self, out, seed=0):
+        self.out = out
+        self.pid = 1000 + random.Random(seed).randrange(1000000)
+        self.origin = 1680000000.0
+        self.lines = []
+        self.pending = []
+        self.sequence = itertools.count()
+        self.out.write(header)
+        self.write(0, "MANAGER", self.pid, "START 0")
+
+    def write(self, t, subject, target, rest):
+        pending = self.pending
+        while pending and pending[0][0] <= t:
+            (when, _, line) = heapq.heappop(pending)
+            self.lines.append(f"{round((self.origin + when) * 1e6)} {self.pid} {line}\n")
+        self.lines.append(f"{round((self.origin + t) * 1e6)} {self.pid} {subject} {target} {rest}\n")
+        if len(self.lines) >= 10000:
+            self.flush()
+
+    def later(self, t, subject, target, rest):
+        heapq.heappush(self.pending, (t, next(self.sequence), f"{subject} {target} {rest}"))
+
+    def flush(self):
+        self.out.write("".join(self.lines))
+        self.lines = []
+
+    def close(self, t):
+        # writes the lines still pending, and returns the time of the last one
+        while self.pending:
+            (when, _, line) = heapq.heappop(self.pending)
+            t = max(t, when)
+            self.lines.append(f"{round((self.origin + when) * 1e6)} {self.pid} {line}\n")
+        self.flush()
+        return t
+
+
+class Simulator:
+    def __init__(self, workload, workers, cores, transfers="manager", manager_bandwidth=None, peer_bandwidth=None,
+                 url_bandwidth=None, churn=None, replace_delay=5.0, submit="log", seed=0, out=None):
+        if transfers not in transfer_models:
+            raise ValueError(f"transfers must be one of {', '.join(transfer_models)}")
+        self.w = workload
+        self.workers = workers
+        self.cores = int(cores) if float(cores).is_integer() else cores
+        self.transfers = transfers
+        self.manager_bandwidth = manager_bandwidth or workload.manager_bandwidth
+        self.peer_bandwidth = peer_bandwidth or workload.peer_bandwidth
+        self.url_bandwidth = url_bandwidth or workload.url_bandwidth
+        self.churn = churn
+        self.replace_delay = replace_delay
+        self.submit = submit
+        self.rng = random.Random(seed)
+        self.log = LogWriter(out, seed) if out else None
+
+        too_large = [c for c in workload.cores if c > cores]
+        if too_large:
+            raise ValueError(f"{len(too_large)} tasks need more than the {cores} cores of a worker")
+
+    def run(self):
+        # returns the statistics of the replay
+        w = self.w
+        log = self.log
+        n = len(w)
+        submit = w.submit if self.submit == "log" else [0.0] * n
+        (cores, duration, commit, input_mb, output_mb, category) = (w.cores, w.duration, w.commit, w.input_mb, w.output_mb, w.category)
+        (category_files, sources, seconds) = (w.category_files, w.sources, w.seconds)
+        (mbw, pbw, ubw) = (self.manager_bandwidth, self.peer_bandwidth, self.url_bandwidth)
+        peer = self.transfers == "peer"
+
+        events = []
+        (push, pop, replace) = (heapq.heappush, heapq.heappop, heapq.heapreplace)
+        sequence = itertools.count()
+
+        queue = deque()           # tasks waiting to be dispatched
+        attempt = [0] * n         # current attempt of each task
+        worker_of = [-1] * n
+
+        # state of each worker, by index
+        free = []                 # free cores
+        alive = []
+        listed = []               # in available
+        running = []              # tasks running
+        caches = []               # file -> time it is ready at the worker
+        serving = []              # time the worker is done sending files to peers
+        names = []
+        connected = []            # time of connection
+        available = deque()       # workers that may have free cores
+        holders = {}              # file -> heap of (time, worker) of the workers with a copy
+
+        stats = {"attempts": 0, "lost_attempts": 0, "workers_connected": 0, "worker_seconds": 0.0,
+                 "busy_core_seconds": 0.0, "manager_busy_seconds": 0.0, "manager_MB": 0.0,
+                 "peer_MB": 0.0, "url_MB": 0.0, "shared_fetches": 0, "peer_fetches": 0}
+        manager_free = 0.0
+
+        def connect(now):
+            i = len(free)
+            free.append(self.cores)
+            alive.append(True)
+            listed.append(True)
+            running.append(set())
+            caches.append({})
+            serving.append(now)
+            names.append(f"worker-{self.rng.getrandbits(128):032x}")
+            connected.append(now)
+            available.append(i)
+            stats["workers_connected"] += 1
+            if self.churn:
+                push(events, (now + self.rng.expovariate(1 / self.churn), next(sequence), FAILURE, i, -1, 0))
+            if log:
+                log.write(now, "WORKER", names[i], f"CONNECTION 10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}:{9000 + i % 1000}")
+                log.write(now, "WORKER", names[i], "RESOURCES " + resources_json(self.cores, 4000 * self.cores, 10000 * self.cores))
+
+        def waiting(now, task):
+            attempt[task] += 1
+            if log:
+                a = attempt[task]
+                log.write(now, "TASK", task + 1, f"WAITING {w.categories[category[task]]} {'FIRST_RESOURCES' if a == 1 else 'MAX_RESOURCES'} {a} "
+                          + resources_json(cores[task], 0, 0))
+
+        def fetch(now, f, size, i):
+            # time the file is ready at worker i
+            nonlocal manager_free
+            stats["shared_fetches"] += 1
+            if sources[f] == "url":
+                (start, end) = (now, now + size / ubw)
+            elif sources[f] == "task":
+                (start, end) = (now, now + seconds[f])
+            else:
+                start = manager_free if manager_free > now else now
+                end = start + size / mbw
+            source = None
+            h = holders.get(f, None) if peer else None
+            while h:
+                (t, s) = h[0]
+                if not alive[s]:
+                    pop(h)
+                elif serving[s] > t:
+                    replace(h, (serving[s], s))
+                else:
+                    break
+            if h:
+                (t, s) = h[0]
+                peer_start = t if t > now else now
+                if peer_start + size / pbw <= end:
+                    (start, end, source) = (peer_start, peer_start + size / pbw, s)
+                    serving[s] = end
+                    replace(h, (end, s))
+                    stats["peer_fetches"] += 1
+                    stats["peer_MB"] += size
+            if source is None and sources[f] == "url":
+                stats["url_MB"] += size
+            elif source is None and sources[f] == "manager":
+                stats["manager_busy_seconds"] += end - start
+                stats["manager_MB"] += size
+                manager_free = end
+            if peer:
+                push(holders.setdefault(f, []), (end, i))
+            if log:
+                log.later(end, "WORKER", names[i], f"CACHE_UPDATE {w.files[f]} {round(size * 1e6)} {round((end - start) * 1e6)} {round((log.origin + start) * 1e6)}")
+            return end
+
+        def start(now, task, i):
+            # the manager sends the task and its inputs, then the worker gets
+            # the shared files it does not have, and runs the task
+            nonlocal manager_free
+            stats["attempts"] += 1
+            worker_of[task] = i
+            running[i].add(task)
+
+            commit_start = manager_free if manager_free > now else now
+            commit_end = commit_start + commit[task] + input_mb[task] / mbw
+            stats["manager_busy_seconds"] += commit_end - commit_start
+            stats["manager_MB"] += input_mb[task]
+            manager_free = commit_end
+
+            ready = commit_end
+            after = now
+            cache = caches[i]
+            for (f, size) in category_files[category[task]]:
+                r = cache.get(f, None)
+                if r is None:
+                    r = fetch(after, f, size, i)
+                    cache[f] = r
+                if r > after:
+                    after = r
+            if after > ready:
+                ready = after
+            end = ready + duration[task]
+            push(events, (end, next(sequence), FINISH, i, task, attempt[task]))
+
+            if log:
+                a = attempt[task]
+                log.write(now, "TASK", task + 1, f"RUNNING {names[i]}  {'FIRST_RESOURCES' if a == 1 else 'MAX_RESOURCES'} "
+                          + report({"time_commit_start": commit_start, "time_commit_end": commit_end}, log.origin,
+                                   f',"size_input_mgr":[{input_mb[task]:.6f},"MB"],"time_input_mgr":[{commit_end - commit_start:.6f},"s"]'
+                                   + f',"cores":[{cores[task]:g},"cores"]'))
+                if commit_end > commit_start:
+                    log.later(commit_end, "WORKER", names[i], f"TRANSFER INPUT input-{task + 1} {round(input_mb[task] * 1e6)} "
+                              f"{round((commit_end - commit_start) * 1e6)} {round((log.origin + commit_start) * 1e6)}")
+                worker_times[task] = (commit_start, commit_end, ready, end)
+
+        def dispatch(now):
+            blocked = []
+            while queue and available:
+                i = available.popleft()
+                if not alive[i] or free[i] <= 0:
+                    listed[i] = False
+                    continue
+                task = queue[0]
+                if free[i] < cores[task]:
+                    blocked.append(i)
+                    continue
+                queue.popleft()
+                free[i] -= cores[task]
+                if free[i] > 0:
+                    available.append(i)
+                else:
+                    listed[i] = False
+                start(now, task, i)
+            available.extend(blocked)
+
+        def fail(now, i):
+            alive[i] = False
+            stats["worker_seconds"] += now - connected[i]
+            if log:
+                log.write(now, "WORKER", names[i], "DISCONNECTION FAILURE")
+            # the tasks of the worker go back to the queue, first in line
+            for task in sorted(running[i], reverse=True):
+                stats["lost_attempts"] += 1
+                waiting(now, task)
+                queue.appendleft(task)
+            running[i].clear()
+            push(events, (now + self.replace_delay, next(sequence), CONNECT, -1, -1, 0))
+
+        worker_times = {}
+        now = 0.0
+        for _ in range(self.workers):
+            connect(now)
+
+        (next_submit, done) = (0, 0)
+        while done < n:
+            if next_submit < n and (not events or submit[next_submit] <= events[0][0]):
+                now = max(now, submit[next_submit])
+                while next_submit < n and submit[next_submit] <= now:
+                    waiting(now, next_submit)
+                    queue.append(next_submit)
+                    next_submit += 1
+                dispatch(now)
+                continue
+            if not events:
+                raise ValueError("tasks left that no worker can run")
+
+            (now, _, kind, i, task, a) = pop(events)
+            if kind == FINISH:
+                if a != attempt[task] or not alive[i]:
+                    continue
+                # the worker is done, and the manager retrieves the output
+                retrieve_start = manager_free if manager_free > now else now
+                retrieved = retrieve_start + output_mb[task] / mbw
+                stats["manager_busy_seconds"] += retrieved - retrieve_start
+                stats["manager_MB"] += output_mb[task]
+                manager_free = retrieved
+                push(events, (retrieved, next(sequence), RETRIEVED, i, task, a))
+                if log:
+                    log.write(now, "TASK", task + 1, f"WAITING_RETRIEVAL {names[i]} ")
+            elif kind == RETRIEVED:
+                if a != attempt[task] or not alive[i]:
+                    continue
+                done += 1
+                running[i].discard(task)
+                free[i] += cores[task]
+                stats["busy_core_seconds"] += duration[task] * cores[task]
+                if not listed[i]:
+                    listed[i] = True
+                    available.append(i)
+                if log:
+                    (commit_start, commit_end, worker_start, worker_end) = worker_times.pop(task)
+                    log.write(now, "WORKER", names[i], f"TRANSFER OUTPUT output-{task + 1} {round(output_mb[task] * 1e6)} "
+                              f"{round((now - worker_end) * 1e6)} {round((log.origin + worker_end) * 1e6)}")
+                    measured = report({"time_commit_start": commit_start, "time_commit_end": commit_end,
+                                       "time_worker_start": worker_start, "time_worker_end": worker_end}, log.origin,
+                                      f',"size_input_mgr":[{input_mb[task]:.6f},"MB"],"time_input_mgr":[{commit_end - commit_start:.6f},"s"]'
+                                      f',"size_output_mgr":[{output_mb[task]:.6f},"MB"],"time_output_mgr":[{now - worker_end:.6f},"s"]')
+                    log.write(now, "TASK", task + 1, f"RETRIEVED SUCCESS  0  {{}} {measured}")
+                    log.write(now, "TASK", task + 1, "DONE SUCCESS  0 ")
+                dispatch(now)
+            elif kind == FAILURE:
+                if alive[i]:
+                    fail(now, i)
+                    dispatch(now)
+            elif kind == CONNECT:
+                connect(now)
+                dispatch(now)
+
+        makespan = now
+        for i in range(len(alive)):
+            if alive[i]:
+                stats["worker_seconds"] += makespan - connected[i]
+        if log:
+            end = log.close(makespan) + 0.1
+            for i in range(len(alive)):
+                if alive[i]:
+                    log.write(end, "WORKER", names[i], "DISCONNECTION EXPLICIT")
+            log.write(end, "MANAGER", log.pid, f"END {round(end * 1e6)}")
+            log.flush()
+
+        capacity = stats["worker_seconds"] * self.cores
+        return {"tasks": n, "workers": self.workers, "cores": self.cores, "transfers": self.transfers,
+                "makespan": makespan, **stats,
+                "core_utilization": stats["busy_core_seconds"] / capacity if capacity > 0 else math.nan,
+                "manager_utilization": stats["manager_busy_seconds"] / makespan if makespan > 0 else math.nan}
+
+
+def report(times, origin, extra=""):
+    # resources json of the task reports, with times in seconds since the epoch
+    return "{" + ",".join(f'"{k}":[{origin + v:.6f},"s"]' for (k, v) in times.items()) + extra + "}"
+
+
+def simulate(workload, output=None, **options):
+    # statistics of a replay of the workload. See Simulator for the options.
+    if output is None:
+        return Simulator(workload, **options).run()
+    with open(output, "w") as out:
+        return Simulator(workload, out=out, **options).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay the tasks of a transaction log on a different pool of workers, and predict the makespan.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('--workers', default=None, help='comma separated numbers of workers to simulate. Default is the most workers connected at once in the log.')
+    parser.add_argument('--cores', type=float, default=None, help='cores of each worker. Default is the median of the workers of the log.')
+    parser.add_argument('--transfers', choices=transfer_models, default="manager", help='source of the shared files: the manager, or the manager for the first copy and then the workers')
+    parser.add_argument('--manager-bandwidth', type=float, default=None, help='MB/s of the manager link. Default is the median of the input transfers of the log.')
+    parser.add_argument('--peer-bandwidth', type=float, default=None, help='MB/s of a transfer between workers. Default is the median of the cache updates of the log that are not urls or minitasks.')
+    parser.add_argument('--url-bandwidth', type=float, default=None, help='MB/s of a worker fetching a url. Default is the median of the url cache updates of the log.')
+    parser.add_argument('--churn', type=float, default=None, help='mean seconds a worker lives before failing. Default is no failures.')
+    parser.add_argument('--replace-delay', type=float, default=5.0, help='seconds until a failed worker is replaced')
+    parser.add_argument('--submit', choices=["log", "start"], default="log", help='submit the tasks at their times in the log, or all at the start')
+    parser.add_argument('--tasks', type=int, default=None, help='resample the tasks of the log to this number of tasks')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random choices')
+    parser.add_argument('--output', default=None, help='write a synthetic log of the replay. Only with a single number of workers.')
+    parser.add_argument('--json', action='store_true', help='write the statistics as json instead of a table')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the log, without reading or writing the cache of its tables')
+    args = parser.parse_args()
+
+    workload = read_workload(args.log, cache=not args.no_cache)
+    if args.tasks:
+        workload = workload.resample(args.tasks, args.seed)
+    pools = [int(n) for n in args.workers.split(",")] if args.workers else [workload.workers]
+    if args.output and len(pools) > 1:
+        parser.error("--output needs a single number of workers")
+
+    results = []
+    for workers in pools:
+        t = time.perf_counter()
+        r = simulate(workload, args.output, workers=workers, cores=args.cores or workload.worker_cores,
+                     transfers=args.transfers, manager_bandwidth=args.manager_bandwidth, peer_bandwidth=args.peer_bandwidth,
+                     url_bandwidth=args.url_bandwidth, churn=args.churn, replace_delay=args.replace_delay, submit=args.submit, seed=args.seed)
+        r["simulation_seconds"] = time.perf_counter() - t
+        results.append(r)
+
+    if args.json:
+        json.dump({"log_makespan": workload.makespan, "manager_bandwidth": args.manager_bandwidth or workload.manager_bandwidth,
+                   "peer_bandwidth": args.peer_bandwidth or workload.peer_bandwidth,
+                   "url_bandwidth": args.url_bandwidth or workload.url_bandwidth, "results": results}, sys.stdout, indent=1)
+        print()
+    else:
+        print(f"{len(workload)} tasks, {len(workload.files)} shared files, log makespan {workload.makespan:.3f}s from the first dispatch, "
+              f"manager {args.manager_bandwidth or workload.manager_bandwidth:.3f} MB/s, peer {args.peer_bandwidth or workload.peer_bandwidth:.3f} MB/s, "
+              f"url {args.url_bandwidth or workload.url_bandwidth:.3f} MB/s")
+        fields = ["workers", "cores", "makespan", "attempts", "lost_attempts", "core_utilization", "manager_utilization",
+                  "manager_MB", "peer_MB", "url_MB", "simulation_seconds"]
+        print(" ".join(f"{f:>19}" for f in fields))
+        for r in results:
+            print(" ".join(f"{r[f]:>19.3f}" if isinstance(r[f], float) else f"{r[f]:>19}" for f in fields))
@@ -0,0 +1,395 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Export of the timeline of a transaction log to the trace formats of Chrome
+# (trace event json, chrome://tracing) and Perfetto (protobuf, ui.perfetto.dev),
+# whose viewers zoom into millions of events.
+#
+# The trace is written while reading the log, and only the tasks, workers,
+# and transfers in progress are kept in memory, so that the memory does not
+# grow with the size of the log:
+#
+#   - each worker is a process, with a track for its lifetime, one track per
+#     slot of tasks, and one track per lane of concurrent transfers,
+#   - each task attempt is a slice from RUNNING to RETRIEVED (or the
+#     disconnection of its worker) on a slot of its worker, with a nested
+#     slice for the time it executed at the worker,
+#   - each transfer is a slice on a transfer lane of its worker. Inputs and
+#     outputs are also a slice on a lane of the manager, linked to the slice
+#     of the worker by a flow. The log does not record the source of cache
+#     updates, so they have no flow.
+#
+# Slots are assigned as in vine_slots.py, with a heap of the free slots of
+# each worker, but as the log is read: a slot is taken at RUNNING and given
+# back at the end of the attempt, which is the slot assignment of the plot
+# scripts with --expand-waiting. Lanes of transfers are the first lane free
+# at the start of the transfer.
+#
+# Outputs ending in .gz are compressed.
+#
+# Running the program:
+#   python vine_trace.py <log> <output.json|output.pftrace> [--format json|perfetto] [--filter ...]
+
+import argparse
+import gzip
+import heapq
+import json
+import struct
+
+from vine_txn import read_lines, tokenize_lines, value_decoder, xfer_values
+from vine_txn_filter import TxnFilter
+
+formats = ["json", "perfetto"]
+
+# tracks of a worker process: lifetime, slots from 1, and lanes of transfers from TRANSFER_LANES
+LIFETIME = 0
+TRANSFER_LANES = 5000
+
+
+class ChromeTrace:
+    # trace event json: an object with the list of events, written one event
+    # per line. Times are in microseconds.
+    def __init__(self, out):
+        self.out = out
+        self.lines = []
+        self.out.write('{"displayTimeUnit":"ms","traceEvents":[\n')
+        self.separator = ""
+
+    def write(self, event):
+        self.lines.append(self.separator + event)
+        self.separator = ",\n"
+        if len(self.lines) >= 10000:
+            self.flush()
+
+    def flush(self):
+        self.out.write("".join(self.lines))
+        self.lines = []
+
+    def process(self, pid, name, order):
+        self.write(f'{{"ph":"M","name":"process_name","pid":{pid},"args":{{"name":{json.dumps(name)}}}}}')
+        self.write(f'{{"ph":"M","name":"process_sort_index","pid":{pid},"args":{{"sort_index":{order}}}}}')
+
+    def thread(self, pid, tid, name):
+        self.write(f'{{"ph":"M","name":"thread_name","pid":{pid},"tid":{tid},"args":{{"name":"{name}"}}}}')
+        self.write(f'{{"ph":"M","name":"thread_sort_index","pid":{pid},"tid":{tid},"args":{{"sort_index":{tid}}}}}')
+
+    def slice(self, pid, tid, name, category, start, end, args=None, flow_out=None, flow_in=None):
+        self.write(f'{{"ph":"X","pid":{pid},"tid":{tid},"ts":{start:.3f},"dur":{max(end - start, 0):.3f},'
+                   f'"name":{json.dumps(name)},"cat":"{category}"' + (f',"args":{json.dumps(args)}}}' if args else "}"))
+        if flow_out is not None:
+            self.write(f'{{"ph":"s","id":{flow_out},"pid":{pid},"tid":{tid},"ts":{start:.3f},"name":"transfer","cat":"transfer"}}')
+        if flow_in is not None:
+            self.write(f'{{"ph":"f","bp":"e","id":{flow_in},"pid":{pid},"tid":{tid},"ts":{start:.3f},"name":"transfer","cat":"transfer"}}')
+
+    def close(self):
+        self.lines.append("\n]}\n")
+        self.flush()
+
+
+def varint(n):
+    out = bytearray()
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def field_varint(number, value):
+    return varint(number << 3) + varint(value)
+
+
+def field_bytes(number, value):
+    if isinstance(value, str):
+        value = value.encode()
+    return varint(number << 3 | 2) + varint(len(value)) + value
+
+
+class PerfettoTrace:
+    # Perfetto protobuf: a Trace message, written one TracePacket at a time.
+    # Processes and their tracks are TrackDescriptors, and slices are pairs
+    # of TrackEvents of type SLICE_BEGIN and SLICE_END. Times are converted
+    # from microseconds to nanoseconds. The field numbers are those of
+    # protos/perfetto/trace in the Perfetto sources.
+    SEQUENCE = field_varint(10, 1)     # trusted_packet_sequence_id
+
+    def __init__(self, out):
+        self.out = out
+        self.chunks = []
+        self.size = 0
+        # the first packet of the sequence clears its incremental state
+        self.packet(field_varint(13, 1))
+
+    def packet(self, body):
+        body += self.SEQUENCE
+        self.chunks.append(field_bytes(1, body))   # Trace.packet
+        self.size += 1
+        if self.size >= 10000:
+            self.flush()
+
+    def flush(self):
+        self.out.write(b"".join(self.chunks))
+        self.chunks = []
+        self.size = 0
+
+    @staticmethod
+    def uuid(pid, tid=None):
+        return pid << 20 if tid is None else (pid << 20) + tid + 1
+
+    def process(self, pid, name, order):
+        # TrackDescriptor{uuid, process{pid, process_name}}
+        process = field_varint(1, pid) + field_bytes(6, name)
+        self.packet(field_bytes(60, field_varint(1, self.uuid(pid)) + field_bytes(3, process)))
+
+    def thread(self, pid, tid, name):
+        # TrackDescriptor{uuid, name, parent_uuid}
+        self.packet(field_bytes(60, field_varint(1, self.uuid(pid, tid)) + field_bytes(2, name)
+                                + field_varint(5, self.uuid(pid))))
+
+    def slice(self, pid, tid, name, category, start, end, args=None, flow_out=None, flow_in=None):
+        track = field_varint(11, self.uuid(pid, tid))
+        # TrackEvent{type SLICE_BEGIN, track_uuid, categories, name, debug_annotations, flow_ids, terminating_flow_ids}
+        begin = field_varint(9, 1) + track + field_bytes(22, category) + field_bytes(23, name)
+        for (k, v) in (args or {}).items():
+            # DebugAnnotation{name, string_value|int_value|double_value}
+            if isinstance(v, str):
+                value = field_bytes(6, v)
+            elif isinstance(v, int):
+                value = field_varint(4, v)
+            elif v is None:
+                continue
+            else:
+                value = varint(5 << 3 | 1) + struct.pack("<d", v)
+            begin += field_bytes(4, field_bytes(10, k) + value)
+        if flow_out is not None:
+            begin += field_varint(47, flow_out)
+        if flow_in is not None:
+            begin += field_varint(48, flow_in)
+        self.packet(field_varint(8, round(start * 1000)) + field_bytes(11, begin))
+        self.packet(field_varint(8, round(max(end, start) * 1000)) + field_bytes(11, field_varint(9, 2) + track))
+
+    def close(self):
+        self.flush()
+
+
+class Lanes:
+    # lanes of intervals that do not overlap. Intervals may come in any
+    # order of their start, and go to the first lane where they start after
+    # the last interval of the lane ended.
+    def __init__(self):
+        self.ends = []
+
+    def take(self, start, end):
+        for (lane, last) in enumerate(self.ends):
+            if last <= start:
+                self.ends[lane] = end
+                return lane
+        self.ends.append(end)
+        return len(self.ends) - 1
+
+
+class Worker:
+    def __init__(self, pid, connected):
+        self.pid = pid
+        self.connected = connected
+        self.free_slots = []      # heap of free slots
+        self.slots = 0            # slots with a track
+        self.lanes = Lanes()
+        self.lane_tracks = 0
+        self.tasks = {}           # task_id -> attempt running
+
+
+class TraceExport:
+    # Writes the timeline of the events of a log to a trace (ChromeTrace or
+    # PerfettoTrace) as the events are read.
+    def __init__(self, trace):
+        self.trace = trace
+        self.base = None          # time of the first manager, time 0 of the trace
+        self.manager = None       # (pid in the log, pid in the trace, origin)
+        self.manager_lanes = None
+        self.manager_lane_tracks = 0
+        self.next_pid = 1
+        self.next_flow = 1
+        self.workers = {}         # worker_id -> Worker
+        self.attempts = {}        # task_id -> [category, attempt number, running attempt or None]
+        self.last_time = 0
+
+    def us(self, time):
+        return (time - self.base) * 1e6
+
+    def new_process(self, name):
+        pid = self.next_pid
+        self.next_pid += 1
+        self.trace.process(pid, name, pid)
+        return pid
+
+    def event(self, time, manager_pid, subject, target, event, arg):
+        if subject == "MANAGER":
+            if event == "START":
+                if self.manager:
+                    self.end_manager(self.last_time)
+                if self.base is None:
+                    self.base = time
+                pid = self.new_process(f"manager {manager_pid}")
+                self.manager = (manager_pid, pid, time)
+                self.manager_lanes = Lanes()
+                self.manager_lane_tracks = 0
+            elif event == "END" and self.manager and self.manager[0] == manager_pid:
+                self.end_manager(time)
+            return
+        if not self.manager or manager_pid != self.manager[0]:
+            return
+        self.last_time = time
+
+        if subject == "WORKER":
+            self.worker_event(time, target, event, arg)
+        elif subject in ("TASK", "LIBRARY"):
+            self.task_event(time, subject, target, event, arg)
+
+    def worker_event(self, time, worker_id, event, arg):
+        if event == "CONNECTION":
+            pid = self.new_process(f"{worker_id} {arg}")
+            self.trace.thread(pid, LIFETIME, "worker")
+            self.workers[worker_id] = Worker(pid, time)
+            return
+
+        w = self.workers.get(worker_id, None)
+        if w is None:
+            return
+        if event == "DISCONNECTION":
+            self.disconnect(time, worker_id, arg)
+        elif event in ("TRANSFER", "CACHE_UPDATE"):
+            direction = event
+            if event == "TRANSFER":
+                (direction, arg) = arg.split(maxsplit=1)
+            origin = self.manager[2]
+            (filename, size, wall_time, start) = xfer_values(time - origin, origin, arg)
+            (start, end) = (self.us(origin + start), self.us(origin + start + wall_time))
+            args = {"direction": direction, "size_MB": size}
+
+            flow = None
+            if direction in ("INPUT", "OUTPUT"):
+                flow = self.next_flow
+                self.next_flow += 1
+                lane = self.manager_lanes.take(start, end)
+                if lane >= self.manager_lane_tracks:
+                    self.trace.thread(self.manager[1], TRANSFER_LANES + lane, f"transfers {lane + 1}")
+                    self.manager_lane_tracks += 1
+                self.trace.slice(self.manager[1], TRANSFER_LANES + lane, filename, "transfer", start, end,
+                                 args, flow_out=flow if direction == "INPUT" else None, flow_in=flow if direction == "OUTPUT" else None)
+
+            lane = w.lanes.take(start, end)
+            if lane >= w.lane_tracks:
+                self.trace.thread(w.pid, TRANSFER_LANES + lane, f"transfers {lane + 1}")
+                w.lane_tracks += 1
+            self.trace.slice(w.pid, TRANSFER_LANES + lane, filename, "transfer", start, end,
+                             args, flow_out=flow if direction == "OUTPUT" else None, flow_in=flow if direction == "INPUT" else None)
+
+    def task_event(self, time, subject, task_id, event, arg):
+        if subject == "LIBRARY":
+            if event == "FAILURE":
+                self.end_attempt(time, task_id, "FAILURE")
+            return
+
+        if event == "WAITING":
+            (category, _, *attempt_number, _) = arg.split()
+            if attempt_number:
+                attempt_number = int(attempt_number[0])
+            else:
+                # old format, without the attempt number
+                previous = self.attempts.get(task_id, None)
+                attempt_number = 1 if previous is None else previous[1] + 1
+            self.attempts[task_id] = [category, attempt_number, None]
+            return
+        attempt = self.attempts.get(task_id, None)
+        if attempt is None:
+            return
+
+        if event == "RUNNING":
+            worker_id = arg.split(maxsplit=1)[0]
+            w = self.workers.get(worker_id, None)
+            if w is None:
+                return
+            if w.free_slots:
+                slot = heapq.heappop(w.free_slots)
+            else:
+                w.slots += 1
+                slot = w.slots
+                self.trace.thread(w.pid, slot, f"slot {slot}")
+            attempt[2] = (worker_id, slot, time)
+            w.tasks[task_id] = attempt
+        elif event == "RETRIEVED":
+            (reason, _, _, measured) = arg.split()
+            self.end_attempt(time, task_id, reason, value_decoder.decode(measured))
+        elif event == "DONE":
+            # e.g. libraries, that are done without being retrieved
+            self.end_attempt(time, task_id, arg.split(maxsplit=1)[0] if arg else None)
+            del self.attempts[task_id]
+
+    def end_attempt(self, time, task_id, reason, report=None):
+        attempt = self.attempts.get(task_id, None)
+        if attempt is None or attempt[2] is None:
+            return
+        (category, attempt_number, (worker_id, slot, running)) = attempt
+        attempt[2] = None
+        w = self.workers[worker_id]
+        del w.tasks[task_id]
+        heapq.heappush(w.free_slots, slot)
+
+        (start, end) = (self.us(running), self.us(time))
+        self.trace.slice(w.pid, slot, f"task {task_id}", "task", start, end,
+                         {"category": category, "attempt": attempt_number, "reason": reason})
+        if report:
+            (worker_start, worker_end) = (report["time_worker_start"], report["time_worker_end"])
+            if worker_start == worker_start and worker_end == worker_end:
+                # NaN if not reported
+                worker_start = min(max(self.us(worker_start), start), end)
+                self.trace.slice(w.pid, slot, "executing", "task", worker_start, min(max(self.us(worker_end), worker_start), end))
+
+    def disconnect(self, time, worker_id, reason):
+        w = self.workers.pop(worker_id)
+        self.workers[worker_id] = w     # until its tasks end
+        for task_id in list(w.tasks):
+            self.end_attempt(time, task_id, "DISCONNECTION")
+        del self.workers[worker_id]
+        self.trace.slice(w.pid, LIFETIME, "connected", "worker", self.us(w.connected), self.us(time), {"reason": reason})
+
+    def end_manager(self, time):
+        # workers still connected at the end of the manager
+        for worker_id in list(self.workers):
+            self.disconnect(time, worker_id, "END")
+        self.attempts = {}
+        self.manager = None
+
+    def close(self):
+        if self.manager:
+            self.end_manager(self.last_time)
+        self.trace.close()
+
+
+def export(log, output, trace_format=None, filter_spec=None):
+    # writes the trace of log to output, in trace_format (default from the
+    # name of output)
+    if trace_format is None:
+        trace_format = "perfetto" if output.removesuffix(".gz").endswith((".pftrace", ".perfetto-trace", ".pb")) else "json"
+    if trace_format not in formats:
+        raise ValueError(f"format must be one of {', '.join(formats)}")
+    binary = trace_format == "perfetto"
+    opener = gzip.open if output.endswith(".gz") else open
+    with opener(output, "wb" if binary else "wt") as out:
+        exporter = TraceExport(PerfettoTrace(out) if binary else ChromeTrace(out))
+        for event in tokenize_lines(TxnFilter(filter_spec).lines(read_lines(log))):
+            exporter.event(*event)
+        exporter.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export the timeline of a transaction log to a Chrome or Perfetto trace.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('output', help='trace to write. Compressed if its name ends in .gz.')
+    parser.add_argument('--format', choices=formats, default=None, help='trace format. Default is perfetto for .pftrace outputs, json otherwise.')
+    parser.add_argument('--filter', default=None, help='records to export, as the --filter of the plot scripts (see vine_txn_filter.py)')
+    args = parser.parse_args()
+
+    export(args.log, args.output, args.format, args.filter)
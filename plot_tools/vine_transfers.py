@@ -0,0 +1,295 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Bandwidth and concurrency of the file transfers to the workers.
+#
+# The CACHE_UPDATE and TRANSFER INPUT/OUTPUT records of a transaction log are
+# read into one table per manager. From it:
+#
+#   - the bandwidth achieved by each transfer (size / wall time) and by each
+#     worker (size / time with at least one transfer in progress),
+#   - the number of concurrent transfers and their aggregate throughput over
+#     time, from one sweep over the start and end of all the transfers,
+#   - the bandwidth of the transfers by the number of transfers in progress
+#     when they started. If the aggregate throughput stays flat while the
+#     concurrency grows, the transfers share a saturated network,
+#   - the replication of each file: how many workers got a copy, and the time
+#     from the first to the last copy.
+#
+# The log does not record the source of a transfer, so peer transfers are
+# seen as the fan-out of each file to the workers.
+#
+# The records are read with read_events of vine_txn.py, which also normalizes
+# the older format of the transfers, without parsing the tasks of the log.
+#
+# Running the program:
+#   python vine_transfers.py <log> [output] [--stats] [--csv prefix] [--direction ...] [--filetype ...]
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+
+from vine_lazy import plt, use_backend
+from vine_occupancy import sweep
+from vine_txn import read_events, transfer_columns, xfer_values
+
+directions = ["CACHE_UPDATE", "INPUT", "OUTPUT"]
+
+percentiles = [50, 90, 99]
+
+# upper limits of the number of concurrent transfers grouped together
+concurrency_bins = [1, 2, 4, 8, 16, 32, 64, 128, 256, np.inf]
+
+
+def read_transfers(log):
+    # {manager_pid: DataFrame with the columns of the transfers table of
+    # ParseTxn}, with times in seconds from the start of the manager.
+    rows = {}
+    origins = {}
+    hostports = {}
+    for (time, manager_pid, subject, target, event, arg) in read_events(log):
+        if subject == "MANAGER":
+            if event == "START":
+                origins[manager_pid] = time
+                rows[manager_pid] = []
+            continue
+        if subject != "WORKER" or manager_pid not in origins:
+            continue
+
+        if event == "CONNECTION":
+            hostports[target] = arg
+        elif event in ("CACHE_UPDATE", "TRANSFER"):
+            direction = event
+            if event == "TRANSFER":
+                (direction, arg) = arg.split(maxsplit=1)
+            origin = origins[manager_pid]
+            (filename, size, wall_time, start_time) = xfer_values(time - origin, origin, arg)
+            filetype = filename.split("-", maxsplit=1)[0] if "-" in filename else "file"
+            rows[manager_pid].append([target, hostports.get(target), time - origin, direction,
+                                      filetype, filename, size, wall_time, start_time])
+
+    names = [name for (name, _) in transfer_columns]
+    return {pid: pd.DataFrame(r, columns=names) for (pid, r) in rows.items()}
+
+
+def select(df, direction=None, filetype=None):
+    if direction:
+        df = df[df["direction"].isin(direction)]
+    if filetype:
+        df = df[df["filetype"].isin(filetype)]
+    return df
+
+
+def with_bandwidth(df):
+    # copy of the transfers with their end time and bandwidth in MB/s.
+    # Transfers without size or wall time have no bandwidth.
+    df = df.copy()
+    df["end_time"] = df["start_time"] + df["wall_time"]
+    moved = (df["wall_time"] > 0) & (df["size"] > 0)
+    df["bandwidth"] = (df["size"] / df["wall_time"]).where(moved)
+    return df
+
+
+def concurrency(df):
+    # DataFrame with the time of each change, the transfers in progress of
+    # each direction, in total, and their aggregate throughput in MB/s, from
+    # that time until the next row.
+    intervals = [(g["start_time"], g["end_time"], 1) for g in (df[df["direction"] == d] for d in directions)]
+    intervals.append((df["start_time"], df["end_time"], df["bandwidth"].fillna(0)))
+    (times, levels) = sweep(intervals)
+
+    levels = np.rint(levels * 1e6) / 1e6   # roundoff of adding and removing the bandwidths
+    cs = pd.DataFrame(levels, columns=directions + ["throughput"])
+    cs.insert(0, "time", times)
+    cs.insert(len(directions) + 1, "transfers", cs[directions].sum(axis=1))
+    return cs
+
+
+def in_progress_at_start(df, cs):
+    # transfers in progress when each transfer started, including itself
+    idx = np.searchsorted(cs["time"].to_numpy(), df["start_time"].to_numpy(dtype=float), side="right") - 1
+    return cs["transfers"].to_numpy()[np.clip(idx, 0, None)]
+
+
+def union_length(df, group, start="start_time", end="end_time"):
+    # {group: seconds with at least one interval of the group in progress}
+    df = df.sort_values([group, start], kind="stable")
+    ends = df.groupby(group, sort=False)[end].cummax()
+    covered_until = ends.groupby(df[group], sort=False).shift().fillna(-np.inf)
+    covered = (df[end] - np.maximum(df[start], covered_until)).clip(lower=0)
+    return covered.groupby(df[group]).sum()
+
+
+def quantiles(values, name):
+    qs = values.quantile([p / 100 for p in percentiles])
+    return {**{f"{name}_p{p}": q for (p, q) in zip(percentiles, qs)}, f"{name}_max": values.max()}
+
+
+def transfer_stats(df):
+    # bandwidth of the transfers, by direction and filetype
+    rows = []
+    for ((direction, filetype), g) in df.groupby(["direction", "filetype"]):
+        rows.append({"direction": direction, "filetype": filetype, "transfers": len(g),
+                     "MB": g["size"].sum(), "seconds": g["wall_time"].sum(),
+                     **quantiles(g["bandwidth"], "MBps")})
+    return pd.DataFrame(rows)
+
+
+def worker_stats(df):
+    # for each worker: transfers, MB, seconds with transfers in progress, and bandwidths
+    moved = df[~df["bandwidth"].isna()]
+    ws = moved.groupby("worker_id").agg(hostport=("hostport", "first"), transfers=("size", "size"),
+                                        MB=("size", "sum"), mean_MBps=("bandwidth", "mean"))
+    ws["busy_seconds"] = union_length(moved, "worker_id")
+    ws["achieved_MBps"] = ws["MB"] / ws["busy_seconds"]
+    return ws.reset_index()
+
+
+def bandwidth_by_concurrency(df, cs):
+    # bandwidth of the transfers by the number of transfers in progress when they started
+    moved = df[~df["bandwidth"].isna()]
+    at_start = in_progress_at_start(moved, cs)
+    bins = np.searchsorted(concurrency_bins, at_start, side="left")
+    rows = []
+    for (b, g) in moved.groupby(bins):
+        lo = 1 if b == 0 else concurrency_bins[b - 1] + 1
+        hi = concurrency_bins[b]
+        rows.append({"concurrent": f"{lo:.0f}" if lo == hi else f"{lo:.0f}+" if hi == np.inf else f"{lo:.0f}-{hi:.0f}",
+                     "transfers": len(g), "MBps_p50": g["bandwidth"].median(),
+                     "MBps_mean": g["bandwidth"].mean()})
+    return pd.DataFrame(rows)
+
+
+def replication(df):
+    # for each file sent to the workers: size, workers with a copy, transfers
+    # (more than copies if a worker got the file again), and times from the
+    # first to the last copy
+    sent = df[df["direction"] != "OUTPUT"]
+    fs = sent.groupby("filename").agg(filetype=("filetype", "first"), size=("size", "max"),
+                                      copies=("worker_id", "nunique"), transfers=("worker_id", "size"),
+                                      first=("end_time", "min"), last=("end_time", "max"))
+    fs["span"] = fs["last"] - fs["first"]
+    return fs.sort_values(["copies", "first"], ascending=[False, True]).reset_index()
+
+
+def throughput_stats(cs):
+    # statistics over the time with at least one transfer in progress
+    durations = np.diff(cs["time"].to_numpy())
+    active = (cs["transfers"].to_numpy()[:-1] > 0) & (durations > 0)
+    (durations, transfers, throughput) = (durations[active], cs["transfers"].to_numpy()[:-1][active], cs["throughput"].to_numpy()[:-1][active])
+    if not len(durations):
+        return {}
+
+    stats = {"active_seconds": durations.sum(),
+             "max_transfers": transfers.max(),
+             "mean_transfers": np.average(transfers, weights=durations),
+             "mean_MBps": np.average(throughput, weights=durations)}
+
+    # percentiles weighted by time
+    order = np.argsort(throughput, kind="stable")
+    cumulative = np.cumsum(durations[order]) / durations.sum()
+    for p in percentiles:
+        stats[f"MBps_p{p}"] = throughput[order][min(np.searchsorted(cumulative, p / 100), len(order) - 1)]
+    stats["MBps_max"] = throughput.max()
+    return stats
+
+
+def print_stats(df, cs):
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+        print("bandwidth of each transfer (MB/s)")
+        print(transfer_stats(df).to_string(index=False))
+        print()
+        print("transfers in progress and aggregate throughput (MB/s), while at least one transfer is in progress")
+        for (k, v) in throughput_stats(cs).items():
+            print(f"  {k:<15} {v:.3f}")
+        print()
+        print("bandwidth by transfers in progress at start (MB/s)")
+        print(bandwidth_by_concurrency(df, cs).to_string(index=False))
+        print()
+        ws = worker_stats(df)
+        print(f"workers ({len(ws)}), achieved MB/s while receiving: "
+              + ", ".join(f"{k} {v:.3f}" for (k, v) in quantiles(ws["achieved_MBps"], "MBps").items()))
+        print()
+        fs = replication(df)
+        print(f"most replicated files (of {len(fs)})")
+        print(fs.head(10).to_string(index=False))
+        print()
+
+
+def plot_transfers(df, cs, files=10, title=None, output=None):
+    use_backend(display=output is None)
+    fig = plt.figure(constrained_layout=True, figsize=(12, 8))
+    ((progress, scatter), (throughput, replicas)) = fig.subplots(nrows=2, ncols=2)
+
+    for d in directions:
+        if cs[d].any():
+            progress.step(cs["time"], cs[d], where="post", label=d)
+    progress.set_ylabel("transfers in progress")
+    progress.legend(fontsize="small")
+
+    throughput.step(cs["time"], cs["throughput"], where="post", color="C3")
+    throughput.set_ylabel("aggregate throughput (MB/s)")
+    for s in (progress, throughput):
+        s.set_xlabel("time from manager start (s)")
+    throughput.sharex(progress)
+
+    moved = df[~df["bandwidth"].isna()]
+    scatter.scatter(in_progress_at_start(moved, cs), moved["bandwidth"], s=4, alpha=0.5)
+    scatter.set_xlabel("transfers in progress at start")
+    scatter.set_ylabel("bandwidth of the transfer (MB/s)")
+
+    sent = df[df["direction"] != "OUTPUT"]
+    for filename in replication(df)["filename"].head(files):
+        times = np.sort(sent.loc[sent["filename"] == filename, "end_time"].to_numpy())
+        replicas.step(times, np.arange(1, len(times) + 1), where="post", label=filename)
+    replicas.set_xlabel("time from manager start (s)")
+    replicas.set_ylabel("copies of the file")
+    replicas.sharex(progress)
+    if files <= 10:
+        replicas.legend(fontsize="x-small")
+
+    if title:
+        fig.suptitle(title)
+
+    if output:
+        plt.savefig(output)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the bandwidth, concurrency, and replication of the file transfers of a transaction log.')
+    parser.add_argument('log', help='Path to transaction log file')
+    parser.add_argument('output', nargs='?', default=None, help='output file of the plot. If not given, the plot is displayed.')
+    parser.add_argument('--stats', action='store_true', help='print the statistics without plotting')
+    parser.add_argument('--csv', default=None, help='write the transfers, concurrency, workers, and files tables to <prefix>.<table>.csv')
+    parser.add_argument('--direction', default=None, help=f"comma separated directions to keep, from: {', '.join(directions)}")
+    parser.add_argument('--filetype', default=None, help='comma separated filetypes to keep (e.g. url,temp,file)')
+    parser.add_argument('--files', type=int, default=10, help='number of most replicated files to plot')
+    parser.add_argument('--title', default=None, help='title of the plot')
+    args = parser.parse_args()
+
+    direction = args.direction.split(",") if args.direction else None
+    filetype = args.filetype.split(",") if args.filetype else None
+
+    managers = read_transfers(args.log)
+    for (pid, df) in managers.items():
+        df = with_bandwidth(select(df, direction, filetype))
+        if df.empty:
+            print(f"manager {pid}: no transfers", file=sys.stderr)
+            continue
+        cs = concurrency(df)
+
+        print(f"manager {pid}: {len(df)} transfers")
+        print_stats(df, cs)
+
+        if args.csv:
+            prefix = args.csv if len(managers) == 1 else f"{args.csv}.{pid}"
+            df.to_csv(f"{prefix}.transfers.csv", index=False)
+            cs.to_csv(f"{prefix}.concurrency.csv", index=False)
+            worker_stats(df).to_csv(f"{prefix}.workers.csv", index=False)
+            replication(df).to_csv(f"{prefix}.files.csv", index=False)
+        if not args.stats and not args.csv:
+            plot_transfers(df, cs, files=args.files, title=args.title, output=args.output)
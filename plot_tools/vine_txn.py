@@ -0,0 +1,718 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Streaming parser for taskvine transaction logs, shared by the plot scripts
+# in this repository.
+#
+# transactions log format:
+# time manager_pid MANAGER manager_pid START|END
+# time manager_pid WORKER worker_id CONNECTION host:port
+# time manager_pid WORKER worker_id DISCONNECTION (UNKNOWN|IDLE_OUT|FAST_ABORT|FAILURE|STATUS_WORKER|EXPLICIT)
+# time manager_pid WORKER worker_id RESOURCES {resources}
+# time manager_pid WORKER worker_id CACHE_UPDATE filename size_in_mb wall_time_us start_time_us
+# time manager_pid WORKER worker_id TRANSFER (INPUT|OUTPUT) filename size_in_mb wall_time_us start_time_us
+# time manager_pid CATEGORY name MAX {resources_max_per_task}
+# time manager_pid CATEGORY name MIN {resources_min_per_task_per_worker}
+# time manager_pid CATEGORY name FIRST (FIXED|MAX|MIN_WASTE|MAX_THROUGHPUT) {resources_requested}
+# time manager_pid TASK task_id WAITING category_name (FIRST_RESOURCES|MAX_RESOURCES) attempt_number {resources_requested}
+# time manager_pid TASK task_id RUNNING worker_id (FIRST_RESOURCES|MAX_RESOURCES) {resources_allocated}
+# time manager_pid TASK task_id WAITING_RETRIEVAL worker_id
+# time manager_pid TASK task_id (RETRIEVED|DONE) (SUCCESS|SIGNAL|END_TIME|FORSAKEN|MAX_RETRIES|MAX_WALLTIME|UNKNOWN|RESOURCE_EXHAUSTION) exit_code {limits_exceeded} {resources_measured}
+# time manager_pid LIBRARY task_id (WAITING|SENT|STARTED|FAILURE) worker_id
+#
+# Older logs write the manager records as "time manager_pid MANAGER START|END",
+# the worker connections as "time manager_pid WORKER worker_id host:port
+# (CONNECTION|DISCONNECTION reason)", and the transfers as "... CACHE_UPDATE
+# filename size_in_MB wall_time_s" (and likewise for TRANSFER), without a start
+# time. These are normalized to the format above. Their tasks are WAITING
+# without an attempt number, which is then counted by the parser.
+
+from collections import defaultdict, namedtuple
+from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import sys
+
+from vine_slots import OnlineSlots, assign_slots
+import vine_txn_cache
+from vine_txn_input import open_log, skip
+from vine_txn_store import ColumnStore, LiveTable, StringTable, first_seen_order
+from vine_txn_values import ValueDecoder
+
+resources_names = "cores memory disk gpus".split()
+task_report_abs = "time_worker_start time_worker_end time_commit_start time_commit_end".split()
+task_report_all = "time_input_mgr time_output_mgr size_input_mgr size_output_mgr".split() + task_report_abs
+
+# decodes the resources, and task reports, of the records
+value_decoder = ValueDecoder(resources_names + task_report_all)
+
+# columns of the tasks, workers, and transfers tables, as (name, kind)
+task_columns = ([("WAITING", "float"), ("last_state", "str"), ("last_state_time", "float"),
+                 ("task_id", "int"), ("attempt_number", "int"), ("category", "str")]
+                + [(f"requested_{r}", "float") for r in resources_names]
+                + [("library", "float"), ("RUNNING", "float"), ("worker_id", "str")]
+                + [(f"allocated_{r}", "float") for r in resources_names]
+                + [(r, "float") for r in task_report_all]
+                + [("DISCONNECTION", "float"), ("WAITING_RETRIEVAL", "float"), ("RETRIEVED", "float"),
+                   ("reason", "str"), ("exit_code", "int")]
+                + [(f"measured_{r}", "float") for r in resources_names]
+                + [("DONE", "float")])
+
+worker_columns = ([("worker_id", "str"), ("hostport", "str"), ("CONNECTION", "float"), ("DISCONNECTION", "float")]
+                  + [(r, "float") for r in resources_names]
+                  + [("reason", "str")])
+
+transfer_columns = [("worker_id", "str"), ("hostport", "str"), ("time", "float"), ("direction", "str"),
+                    ("filetype", "str"), ("filename", "str"), ("size", "float"), ("wall_time", "float"),
+                    ("start_time", "float")]
+
+# increase when a change in parsing changes the tables, to invalidate the
+# tables cached by vine_txn_cache.
+PARSER_VERSION = 4
+
+# bytes read from the log at a time. Only one chunk (plus one partial line)
+# is kept in memory, independently of the size of the log.
+CHUNK_SIZE = 1 << 20
+
+# one tokenized line of the log. time is in seconds, arg is the rest of the
+# line after the event (or None), still unparsed.
+TxnEvent = namedtuple("TxnEvent", "time manager_pid subject target event arg")
+
+
+class LogReader:
+    # Reads the lines of a log in fixed-size chunks. offset is the position in
+    # bytes after the last line read, so that reading can continue from there
+    # when more lines are appended to the log. Compressed logs and members of
+    # tar archives are decompressed as they are read (see vine_txn_input.py),
+    # and offset is then a position in the decompressed log.
+    def __init__(self, log, chunk_size=CHUNK_SIZE, background=None):
+        self.log = log
+        self.chunk_size = chunk_size
+        self.background = background
+        self.offset = 0
+
+    def lines(self, partial_last_line=True):
+        # partial_last_line: also read a last line without a newline. Set it
+        # to False when the log is still being written.
+        with open_log(self.log, self.background, self.chunk_size) as f:
+            skip(f, self.offset)
+            partial = b""
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                (complete, newline, partial) = (partial + chunk).rpartition(b"\n")
+                if newline:
+                    self.offset += len(complete) + 1
+                    yield from complete.decode().split("\n")
+            if partial and partial_last_line:
+                self.offset += len(partial)
+                yield partial.decode()
+
+
+def read_lines(log, chunk_size=CHUNK_SIZE):
+    return LogReader(log, chunk_size).lines()
+
+
+def tokenize(line):
+    if line.startswith("#"):
+        return None
+
+    try:
+        (stamp, manager_pid, subject, target, *rest) = line.split(maxsplit=5)
+        time = float(stamp)/1000000
+    except ValueError:
+        return None
+
+    if not rest:
+        if subject != "MANAGER":
+            return None
+        # old format, without the manager pid as target
+        (target, rest) = (manager_pid, [target])
+
+    event = rest[0]
+    arg = rest[1].strip() if len(rest) > 1 else None
+
+    if subject == "WORKER" and arg and arg.startswith(("CONNECTION", "DISCONNECTION")):
+        # old format, with host:port before the event
+        (hostport, (event, *reason)) = (event, arg.split(maxsplit=1))
+        arg = reason[0] if event == "DISCONNECTION" and reason else hostport
+    elif subject == "WORKER" and event in ("CACHE_UPDATE", "TRANSFER") and arg:
+        arg = current_xfer_arg(stamp, event, arg)
+
+    return TxnEvent(time, manager_pid, subject, target, event, arg)
+
+
+def current_xfer_arg(stamp, event, arg):
+    # old format of the transfers, with the size in MB and the wall time in
+    # seconds: rewritten in bytes and microseconds, with the transfer ending
+    # at the time of the record.
+    fields = arg.split()
+    if len(fields) != (4 if event == "TRANSFER" else 3):
+        return arg
+    (*names, size, wall_time) = fields
+    (size, wall_time) = (round(float(size)*1e6), round(float(wall_time)*1e6))
+    return " ".join(names + [str(size), str(wall_time), str(int(stamp) - wall_time)])
+
+
+def xfer_values(time, origin, arg):
+    # (filename, size in MB, wall time in seconds, start time relative to
+    # origin) of the arg of a CACHE_UPDATE, or of a TRANSFER after its
+    # direction. time is also relative to origin.
+    (filename, size, wall_time, start_time) = arg.split()
+    size = float(size)/1e6
+    wall_time = float(wall_time)/1e6
+    start_time = float(start_time)/1e6
+
+    if start_time < origin:
+        # guard for cases when start time was unknown
+        start_time = time - wall_time
+    else:
+        start_time -= origin
+    return (filename, size, wall_time, start_time)
+
+
+def read_events(log, chunk_size=CHUNK_SIZE):
+    return tokenize_lines(read_lines(log, chunk_size))
+
+
+def tokenize_lines(lines):
+    for line in lines:
+        event = tokenize(line)
+        if event:
+            yield event
+
+
+class Manager:
+    def __init__(self, manager_pid, origin):
+        self.origin = origin
+        self.termination = 0  # yet unknown
+
+        self.pid = manager_pid
+
+        # strings shared by the tables
+        self.worker_ids = StringTable()
+        self.hostports = StringTable()
+        self.categories = StringTable()
+        shared = {"worker_id": self.worker_ids, "hostport": self.hostports, "category": self.categories}
+
+        # one row per task attempt
+        self.tasks_attempts = ColumnStore(task_columns, shared)
+
+        # [task_id] -> row of last attempt in tasks_attempts
+        self.task_last_attempt = {}
+
+        # one row per (worker_id,hostport)
+        self.worker_lifetime = ColumnStore(worker_columns, shared)
+
+        # [(worker_id,hostport)] -> row in worker_lifetime
+        self.worker_rows = {}
+
+        # one row per transfer
+        self.worker_transfers = ColumnStore(transfer_columns, shared)
+
+        # [worker_id][task_id] -> row in tasks_attempts
+        self.tasks_on_worker = defaultdict(lambda: {})
+
+        # [worker_id] -> hostport
+        self.last_host_port = {}
+
+        self.tasks = None
+        self.workers = None
+        self.transfers = None
+
+        # TxnFilter applied to the rows of the tables, if any
+        self.filter = None
+
+        # state of the tables updated while following a log, see update_tables
+        self.live = None
+
+    def write_tables(self, filename, order_in_log):
+        name = Path(filename).stem
+        tables = ["tasks", "workers", "transfers"]
+        for (table, df) in zip(tables, [self.tasks, self.workers, self.transfers]):
+            df.to_csv(f"{name}_{order_in_log}_{table}.csv", index=False)
+
+    def make_tables(self, expand_waiting):
+        self.tasks = self.make_table_tasks(expand_waiting)
+        self.workers = self.make_table_workers()
+        self.transfers = self.make_table_transfers()
+
+    def update_tables(self, expand_waiting):
+        # As make_tables, when following a log. Only the rows of the stores
+        # created or changed since the last update are converted, filtered,
+        # and placed in slots; the slots of the other attempts do not change.
+        # Rows are kept in the order they were created in the stores.
+        if self.live is None:
+            if not self.finished_tasks():
+                print(f"No tasks that finished were found in the log for manager pid {self.pid}")
+                sys.exit(1)
+            self.live = SimpleNamespace(tasks=LiveTable(), workers=LiveTable(), transfers=LiveTable(),
+                                        slots=OnlineSlots(), hook_rows=np.arange(0), open_workers=np.arange(0))
+            changed = []
+            for store in (self.tasks_attempts, self.worker_lifetime, self.worker_transfers):
+                changed.append(np.arange(len(store)))
+                store.track_changes()
+        else:
+            changed = [store.take_changed() for store in (self.tasks_attempts, self.worker_lifetime, self.worker_transfers)]
+
+        # the filters select tasks and transfers by their workers
+        workers_df = self.worker_lifetime.to_frame() if self.filter is not None else None
+
+        self.workers = self.update_table_workers(changed[1])
+        self.tasks = self.update_table_tasks(changed[0], expand_waiting, workers_df)
+        self.transfers = self.update_table_transfers(changed[2], workers_df)
+
+    def update_table_tasks(self, rows, expand_waiting, workers_df):
+        live = self.live
+
+        # rows that the complete_tasks hook filled in are completed again, as
+        # they may depend on the termination of the manager
+        rows = np.union1d(rows, live.hook_rows)
+        tasks_df = self.tasks_attempts.to_frame(rows)
+        tasks_df.index = rows
+
+        times = tasks_df.columns[tasks_df.dtypes == float]
+        before = tasks_df[times].to_numpy(copy=True)
+        self.complete_tasks(tasks_df)
+        after = tasks_df[times].to_numpy()
+        live.hook_rows = rows[~((before == after) | (np.isnan(before) & np.isnan(after))).all(axis=1)]
+
+        tasks_df["measured_wall_time"] = tasks_df["time_worker_end"] - tasks_df["time_worker_start"]
+        if self.filter is not None:
+            tasks_df = self.filter.select_tasks(tasks_df, workers_df)
+
+        if expand_waiting:
+            tasks_df = tasks_df[~tasks_df["RUNNING"].isna()].copy()
+            tasks_df["time_worker_end"] = tasks_df["time_worker_end"].fillna(tasks_df["last_state_time"])
+            starts = tasks_df["RUNNING"].to_numpy(dtype=float)
+            # attempts still running keep their slot until they end
+            closed = tasks_df[["RETRIEVED", "DISCONNECTION", "DONE"]].notna().any(axis=1).to_numpy()
+            ends = np.where(closed, tasks_df["time_worker_end"].to_numpy(dtype=float), np.inf)
+        else:
+            tasks_df = tasks_df[~tasks_df["RETRIEVED"].isna()].copy()
+            starts = tasks_df["time_worker_start"].to_numpy(dtype=float)
+            ends = tasks_df["time_worker_end"].to_numpy(dtype=float)
+
+        dropped = np.setdiff1d(rows, tasks_df.index.to_numpy(), assume_unique=True)
+        for row in dropped.tolist():
+            live.slots.remove(row)
+        live.tasks.discard(dropped)
+
+        slots = []
+        for (row, worker, start, end) in zip(tasks_df.index.tolist(), tasks_df["worker_id"], starts.tolist(), ends.tolist()):
+            if isinstance(worker, str):
+                slots.append(live.slots.place(row, worker, start, end))
+            else:
+                live.slots.remove(row)
+                slots.append(None)
+        tasks_df["slot"] = pd.array(slots, dtype="Int64")
+        live.tasks.write(tasks_df)
+        return live.tasks.to_frame()
+
+    def update_table_workers(self, rows):
+        live = self.live
+
+        # workers still connected get the current termination of the manager
+        rows = np.union1d(rows, live.open_workers)
+        workers_df = self.worker_lifetime.to_frame(rows)
+        workers_df.index = rows
+        still_open = workers_df["DISCONNECTION"].isna().to_numpy()
+        live.open_workers = rows[still_open]
+        workers_df.loc[still_open, "DISCONNECTION"] = self.termination
+
+        if self.filter is not None:
+            selected = self.filter.select_workers(workers_df)
+            live.workers.discard(np.setdiff1d(rows, selected.index.to_numpy(), assume_unique=True))
+            workers_df = selected
+        live.workers.write(workers_df)
+        return live.workers.to_frame()
+
+    def update_table_transfers(self, rows, workers_df):
+        # transfers are only appended
+        transfers_df = self.worker_transfers.to_frame(rows)
+        transfers_df.index = rows
+        if self.filter is not None:
+            transfers_df = self.filter.select_transfers(transfers_df, workers_df)
+        self.live.transfers.write(transfers_df)
+        return self.live.transfers.to_frame()
+
+    def new_attempt(self, task_id, attempt_number):
+        row = self.task_last_attempt.get(task_id, None)
+        if row is None or self.tasks_attempts.get(row, "attempt_number") != attempt_number:
+            row = self.tasks_attempts.new_row()
+            self.task_last_attempt[task_id] = row
+        return self.tasks_attempts.row(row)
+
+    def last_attempt(self, task_id):
+        return self.tasks_attempts.row(self.task_last_attempt[task_id])
+
+    def finished_tasks(self):
+        return not np.isnan(self.tasks_attempts.column("time_worker_end")).all()
+
+    def worker(self, worker_id, hostport):
+        row = self.worker_rows.get((worker_id, hostport), None)
+        if row is None:
+            row = self.worker_lifetime.new_row()
+            self.worker_rows[(worker_id, hostport)] = row
+        return self.worker_lifetime.row(row)
+
+    def make_table_tasks(self, expand_waiting=False):
+        if not self.finished_tasks():
+            print(f"No tasks that finished were found in the log for manager pid {self.pid}")
+            sys.exit(1)
+
+        # attempts of the same task are kept together, in the order tasks first appear in the log
+        order = first_seen_order(self.tasks_attempts.column("task_id"))
+        tasks_df = self.tasks_attempts.to_frame(order)
+
+        # before any column derived from the times the hook may fill in
+        self.complete_tasks(tasks_df)
+        tasks_df["measured_wall_time"] = tasks_df["time_worker_end"] - tasks_df["time_worker_start"]
+        if self.filter is not None:
+            tasks_df = self.filter.select_tasks(tasks_df, self.worker_lifetime.to_frame())
+
+        return self.assign_slots(tasks_df, expand_waiting)
+
+    def complete_tasks(self, tasks_df):
+        # hook for plot scripts that need to fill in task times before slots
+        # are assigned.
+        pass
+
+    def assign_slots(self, ts, expand_waiting):
+        if expand_waiting:
+            # keep attempts that were dispatched to some worker
+            ts = ts[~ts["RUNNING"].isna()].copy()
+            ts["time_worker_end"] = ts["time_worker_end"].fillna(ts["last_state_time"])
+            starts = ts["RUNNING"]
+        else:
+            # when showing only execution slots, we do not have enough
+            # information to plot tasks lost on disconnection
+            ts = ts[~ts["RETRIEVED"].isna()].copy()
+            starts = ts["time_worker_start"]
+
+        (workers, _) = pd.factorize(ts["worker_id"])
+        slots = assign_slots(workers, starts.to_numpy(dtype=float), ts["time_worker_end"].to_numpy(dtype=float))
+        ts["slot"] = pd.arrays.IntegerArray(slots, workers < 0)
+        return ts
+
+    def make_table_workers(self):
+        workers_df = self.worker_lifetime.to_frame()
+
+        # fill up disconnect times for workers that survive the manager
+        workers_df.loc[workers_df["DISCONNECTION"].isna(), ("DISCONNECTION",)] = self.termination
+        if self.filter is not None:
+            workers_df = self.filter.select_workers(workers_df)
+        return workers_df
+
+    def make_table_transfers(self):
+        # transfers of the same worker are kept together, in the order of their first transfer
+        xs = self.worker_transfers
+        keys = xs.column("worker_id") * (len(self.hostports) + 1) + xs.column("hostport")
+        transfers_df = xs.to_frame(first_seen_order(keys))
+        if self.filter is not None:
+            transfers_df = self.filter.select_transfers(transfers_df, self.worker_lifetime.to_frame())
+        return transfers_df
+
+
+class ParseTxn:
+    # plot scripts may set this to a subclass of Manager
+    manager_class = Manager
+
+    # the partitions of a parallel parse make the tables only after they are
+    # merged (see vine_txn_parallel.py)
+    defer_tables = False
+
+    def __init__(self, logfile, expand_waiting=False, tasks_range_spec=None, cache=True, follow=False, jobs=1, filter_spec=None):
+        self._log = logfile
+        self._reader = LogReader(logfile)
+        self.managers = {}
+        self.cm = None  # current manager
+
+        # number of processes parsing the log. The tables are the same for
+        # any number of jobs. Following a log is always sequential.
+        self.jobs = jobs
+
+        # when following a log that is still being written, the cache is not
+        # used, and the last line is not read until complete.
+        self.follow = follow
+        cache = cache and not follow
+
+        self.expand_waiting = expand_waiting
+        self.tasks_range = self.expand_range(tasks_range_spec)
+
+        # records are filtered as the lines are read, see vine_txn_filter.py
+        from vine_txn_filter import TxnFilter
+        self.filter = TxnFilter(filter_spec, self.check_task_range if self.tasks_range != (1, None, 1) else None)
+
+        if cache:
+            self.managers = vine_txn_cache.load(self._log, self.cache_options(), self.manager_class)
+        if not self.managers:
+            self.managers = {}
+            self._parse()
+            if cache:
+                vine_txn_cache.save(self._log, self.cache_options(), self.managers)
+
+    def update(self):
+        # parse the lines appended to the log since it was last read, and
+        # update the tables of the manager still running with the rows that
+        # changed (see Manager.update_tables). Returns True if there were new
+        # lines.
+        offset = self._reader.offset
+        self._parse()
+        return self._reader.offset != offset
+
+    def tables_ready(self):
+        return bool(self.managers) and all(m.tasks is not None for m in self.managers.values())
+
+    def cache_options(self):
+        # everything, besides the log itself, that changes the parsed tables
+        return {"version": PARSER_VERSION,
+                "manager_class": self.manager_class.__qualname__,
+                "expand_waiting": self.expand_waiting,
+                "tasks_range": self.tasks_range,
+                "filter": self.filter.spec}
+
+    def expand_range(self, tasks_range_spec):
+        start, end, step = 1, None, 1
+
+        if tasks_range_spec:
+            rest = tasks_range_spec.split(",")
+            (start, *rest) = rest
+            start = max(1, int(start)) if start else 1
+            if rest:
+                (end, *step) = rest
+                end = max(start+1, int(end)) if end else None
+                step = max(1, int(step[0])) if step else 1
+        return (start,end,step)
+
+    def check_task_range(self, task_id):
+        (start, end, step) = self.tasks_range
+        if start and task_id < start:
+            return False
+        if end and task_id >= end:
+            return False
+        return 0 == (task_id + start) % step
+
+    def write_tables(self, filename):
+        for (i, m) in enumerate(self.managers.values()):
+            m.write_tables(filename, i)
+
+    def _next_line(self):
+        lines = self.filter.lines(self._reader.lines(partial_last_line=not self.follow))
+        for (time, manager_pid, subject, target, event, arg) in tokenize_lines(lines):
+            if self.cm and self.cm.pid == manager_pid:
+                time -= self.cm.origin
+
+            yield (time, manager_pid, subject, target, event, arg)
+
+    def arg_to_xfer(self, worker_id, hostport, time, direction, arg):
+        (filename, size, wall_time, start_time) = xfer_values(time, self.cm.origin, arg)
+
+        try:
+            (filetype, rest) = filename.split("-", maxsplit=1)
+        except:
+            filetype = "file"
+
+        return [worker_id, hostport, time, direction, filetype, filename, size, wall_time, start_time]
+
+    def arg_to_values(self, ca, prefix, names, arg):
+        # values of the form [value, "units"], see vine_txn_values.py
+        values = value_decoder.decode(arg)
+        ca.store.set_floats(ca.row, [prefix + r for r in names], [values[r] for r in names])
+
+    def arg_to_resources(self, ca, prefix, arg):
+        self.arg_to_values(ca, prefix, resources_names, arg)
+
+    def arg_to_task_report(self, ca, arg):
+        # absolute times are made relative to the start of the manager
+        values = value_decoder.decode(arg)
+        origin = self.cm.origin
+        ca.store.set_floats(ca.row, task_report_all,
+                            [values[r] - origin if r in task_report_abs else values[r] for r in task_report_all])
+
+    def _parse_manager(self, time, manager_pid, event):
+        if event == "START":
+            self.cm = self.manager_class(manager_pid, time)
+            self.cm.filter = self.filter if self.filter.spec else None
+            self.managers[manager_pid] = self.cm
+        elif event == "END":
+            if not self.defer_tables:
+                self._make_tables()
+            self.cm = None
+
+    def _parse_worker(self, time, manager_pid, worker_id, event, arg):
+        if not worker_id.startswith("worker-"):
+            return
+
+        if event == "CONNECTION":
+            hostport = arg
+            self.cm.last_host_port[worker_id] = hostport
+            w = self.cm.worker(worker_id, hostport)
+            w["worker_id"] = worker_id
+            w["hostport"] = hostport
+            w[event] = time
+            w["DISCONNECTION"] = pd.NA
+        elif event == "DISCONNECTION":
+            reason = arg
+            hostport = self.cm.last_host_port[worker_id]
+            w = self.cm.worker(worker_id, hostport)
+            w[event] = time
+            w["reason"] = reason
+            self._disconnect_tasks(time, worker_id)
+        elif event == "RESOURCES":
+            hostport = self.cm.last_host_port[worker_id]
+            self.arg_to_resources(self.cm.worker(worker_id, hostport), "", arg)
+        elif event == "CACHE_UPDATE":
+            hostport = self.cm.last_host_port[worker_id]
+            xfer = self.arg_to_xfer(worker_id, hostport, time, event, arg)
+            self.cm.worker_transfers.append(xfer)
+        elif event == "TRANSFER":
+            hostport = self.cm.last_host_port[worker_id]
+            (direction, arg) = arg.split(maxsplit=1)
+            xfer = self.arg_to_xfer(worker_id, hostport, time, direction, arg)
+            self.cm.worker_transfers.append(xfer)
+
+    def _disconnect_tasks(self, time, worker_id):
+        # tasks still on a worker when it disconnects
+        for row in self.cm.tasks_on_worker[worker_id].values():
+            ca = self.cm.tasks_attempts.row(row)
+            ca["reason"] = "DISCONNECTION"
+            ca["DISCONNECTION"] = time
+            ca["last_state"] = "DISCONNECTION"
+            ca["last_state_time"] = time
+        self.cm.tasks_on_worker.pop(worker_id, None)
+
+    def _parse_category(self, time, manager_pid, category, event, arg):
+        if event == "MAX":
+            pass
+        elif event == "MIN":
+            pass
+        elif event == "FIRST":
+            (mode, arg) = arg.split(maxsplit=1)
+            pass
+
+    def _parse_library(self, time, manager_pid, task_id, event, arg):
+        task_id = int(task_id)
+        ca = self.cm.last_attempt(task_id)
+
+        if event == "SENT":
+            ca["time_worker_start"] = time
+            ca["time_commit_start"] = time
+        elif event == "STARTED":
+            ca["library"] = time
+            ca["RETRIEVED"] = ca["DONE"]
+            ca["time_worker_end"] = time
+            ca["time_commit_end"] = time
+            ca["reason"] = "SUCCESS"
+            ca["exit_code"] = 0
+        elif event == "FAILURE":
+            pass
+
+    def _parse_task(self, time, manager_pid, task_id, event, arg):
+        task_id = int(task_id)
+
+        if not self.check_task_range(task_id):
+            return
+
+        if event == "WAITING":
+            (category, allocation, *attempt_number, arg) = arg.split()
+            if attempt_number:
+                attempt_number = int(attempt_number[0])
+            else:
+                # old format, without the attempt number
+                row = self.cm.task_last_attempt.get(task_id, None)
+                attempt_number = 1 if row is None else self.cm.tasks_attempts.get(row, "attempt_number") + 1
+            ca = self.cm.new_attempt(task_id, attempt_number)
+        else:
+            ca = self.cm.last_attempt(task_id)
+
+        ca[event] = time
+        ca["last_state"] = event
+        ca["last_state_time"] = time
+
+        if event == "WAITING":
+            ca["task_id"] = task_id
+            ca["attempt_number"] = attempt_number
+            ca["category"] = category
+            self.arg_to_resources(ca, "requested_", arg)
+            ca["library"] = pd.NA   # we do not know if it a library
+        elif event == "RUNNING":
+            (worker_id, allocation, arg) = arg.split()
+            self.cm.tasks_on_worker[worker_id][task_id] = ca.row
+            ca["worker_id"] = worker_id
+            self.arg_to_resources(ca, "allocated_", arg)
+            self.arg_to_task_report(ca, arg)
+            ca["DISCONNECTION"] = pd.NA  # add field to keep time in case of worker disconnection
+        elif event == "WAITING_RETRIEVAL":
+            pass
+        elif event == "RETRIEVED":
+            (reason, exit_code, l, m) = arg.split()
+            ca["reason"] = reason
+            ca["exit_code"] = int(exit_code)
+            self.arg_to_task_report(ca, m)
+            self.arg_to_resources(ca, "measured_", m)
+            try:
+                del self.cm.tasks_on_worker[ca["worker_id"]][task_id]
+            except KeyError:
+                # got the message of the worker disconnecting before the
+                # retrieved transaction. Mark the task as not a disconnection
+                ca["DISCONNECTION"] = pd.NA
+        elif event == "DONE":
+            # e.g. libraries, that are done without being retrieved
+            on_worker = self.cm.tasks_on_worker.get(ca["worker_id"])
+            if on_worker:
+                on_worker.pop(task_id, None)
+
+    def _parse_event(self, time, manager_pid, subject, target, event, arg):
+        if self.cm and self.cm.pid == manager_pid:
+            # set each last time know to the termination time of the manager
+            self.cm.termination = time
+
+        if subject == "MANAGER":
+            self._parse_manager(time, manager_pid, event)
+        elif subject == "WORKER":
+            self._parse_worker(time, manager_pid, target, event, arg)
+        elif subject == "CATEGORY":
+            self._parse_category(time, manager_pid, target, event, arg)
+        elif subject == "LIBRARY":
+            self._parse_library(time, manager_pid, target, event, arg)
+        elif subject == "TASK":
+            self._parse_task(time, manager_pid, target, event, arg)
+        elif subject == "TRANSFER":
+            # oldest format, with the transfers recorded by task, the tasks
+            # running on a host:port, and no worker times in the task reports
+            print(f"Unsupported format of the log {self._log}: transfers are recorded as "
+                  f"TRANSFER (INPUT|OUTPUT) task_id, and tasks have no worker times")
+            sys.exit(1)
+
+    def _parse(self):
+        if self.jobs > 1 and not self.follow:
+            from vine_txn_parallel import parse_parallel
+            managers = parse_parallel(self, self.jobs)
+            if managers is not None:
+                self.managers = managers
+                return
+
+        offset = self._reader.offset
+        for (time, manager_pid, subject, target, event, arg) in self._next_line():
+            self._parse_event(time, manager_pid, subject, target, event, arg)
+
+        if self.cm and self._reader.offset != offset:
+            # if self.cm still assigned, then END record missing. Here we force
+            # the generation of tables in that case. This is useful when
+            # plotting partial logs while the workflow is still active.
+            if self.follow and self.cm.live is None and not self.cm.finished_tasks():
+                # wait for more of the log
+                return
+            self._make_tables()
+
+    def _make_tables(self):
+        # when following, the tables are updated with the rows that changed
+        # since the last time they were made.
+        if self.follow:
+            self.cm.update_tables(self.expand_waiting)
+        else:
+            self.cm.make_tables(self.expand_waiting)
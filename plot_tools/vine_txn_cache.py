@@ -0,0 +1,123 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Sidecar cache of the tables parsed from a transaction log.
+#
+# The tasks, workers, and transfers tables of each manager are written next to
+# the log as .<log name>.<options hash>.txncache.npz (or next to the archive,
+# for logs inside a tar archive). The cache is keyed by the path, size, and
+# modification time of the log, the parser options, and the parser version,
+# and it is ignored (and later overwritten) when any of them changes.
+#
+# Columns are stored as plain numpy arrays: numbers as is, nullable integers
+# as values and mask, and strings as codes into an array of unique strings, so
+# that no python objects are pickled.
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from vine_txn_input import split_member
+
+TABLES = ["tasks", "workers", "transfers"]
+
+
+def cache_key(log, options):
+    # logs inside an archive are keyed by the archive and the member
+    (path, member) = split_member(log)
+    stat = os.stat(path)
+    return {"log": str(Path(path).resolve()) + (f":{member}" if member else ""),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "options": json.loads(json.dumps(options))}
+
+
+def cache_path(log, options):
+    # the cache of a member of an archive is next to the archive
+    (path, member) = split_member(log)
+    if member:
+        options = dict(options, member=member)
+    path = Path(path)
+    digest = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+    return path.with_name(f".{path.name}.{digest}.txncache.npz")
+
+
+def frame_to_arrays(prefix, df, arrays):
+    arrays[f"{prefix}.columns"] = np.array(df.columns, dtype=str)
+    arrays[f"{prefix}.index"] = df.index.to_numpy(dtype=np.int64)
+    for (i, name) in enumerate(df.columns):
+        column = df[name]
+        key = f"{prefix}.{i}"
+        if isinstance(column.dtype, pd.Int64Dtype):
+            arrays[f"{key}.int"] = column.fillna(0).to_numpy(dtype=np.int64)
+            arrays[f"{key}.mask"] = column.isna().to_numpy()
+        elif column.dtype == object or isinstance(column.dtype, pd.StringDtype):
+            (codes, uniques) = pd.factorize(column)
+            arrays[f"{key}.codes"] = codes
+            arrays[f"{key}.strings"] = np.array(uniques, dtype=str)
+        else:
+            arrays[f"{key}.values"] = column.to_numpy()
+
+
+def arrays_to_frame(prefix, arrays):
+    frame = {}
+    columns = arrays[f"{prefix}.columns"].tolist()
+    for (i, name) in enumerate(columns):
+        key = f"{prefix}.{i}"
+        if f"{key}.int" in arrays:
+            frame[name] = pd.arrays.IntegerArray(arrays[f"{key}.int"], arrays[f"{key}.mask"])
+        elif f"{key}.codes" in arrays:
+            strings = np.empty(len(arrays[f"{key}.strings"]) + 1, dtype=object)
+            strings[:-1] = arrays[f"{key}.strings"].tolist()
+            strings[-1] = pd.NA
+            frame[name] = strings[arrays[f"{key}.codes"]]
+        else:
+            frame[name] = arrays[f"{key}.values"]
+    return pd.DataFrame(frame, columns=columns, index=arrays[f"{prefix}.index"])
+
+
+def save(log, options, managers):
+    # managers: {pid: Manager}, with tables already made.
+    arrays = {}
+    info = []
+    for (i, m) in enumerate(managers.values()):
+        info.append({"pid": m.pid, "origin": m.origin, "termination": m.termination})
+        for (table, df) in zip(TABLES, [m.tasks, m.workers, m.transfers]):
+            frame_to_arrays(f"m{i}.{table}", df, arrays)
+
+    arrays["key"] = np.array(json.dumps(cache_key(log, options)))
+    arrays["managers"] = np.array(json.dumps(info))
+
+    path = cache_path(log, options)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not write cache {path}: {e}", file=sys.stderr)
+
+
+def load(log, options, manager_class):
+    # returns {pid: Manager} if a valid cache exists for log and options, otherwise None.
+    path = cache_path(log, options)
+    try:
+        with np.load(path) as arrays:
+            if json.loads(arrays["key"].item()) != cache_key(log, options):
+                return None
+            arrays = dict(arrays)
+    except (OSError, KeyError, ValueError):
+        return None
+
+    managers = {}
+    for (i, info) in enumerate(json.loads(arrays["managers"].item())):
+        m = manager_class(info["pid"], info["origin"])
+        m.termination = info["termination"]
+        (m.tasks, m.workers, m.transfers) = (arrays_to_frame(f"m{i}.{table}", arrays) for table in TABLES)
+        managers[m.pid] = m
+    return managers
@@ -0,0 +1,248 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Filters of the records of a transaction log, applied while reading it.
+#
+# A filter is a space separated list of terms key=values, with values
+# separated by commas. A record is kept if it matches every term, and a term
+# if any of its values. Categories, worker ids, and hosts may be globs.
+#
+#   time=START:END      seconds since the start of the manager. Either may be
+#                       omitted, e.g., time=3600: or time=:600.
+#   category=NAMES      tasks of these categories
+#   worker=IDS          tasks, workers, and transfers of these workers
+#   host=HOSTS          same, by the host:port of the workers
+#   reason=REASONS      task attempts that ended with these reasons (SUCCESS,
+#                       SIGNAL, ..., DISCONNECTION)
+#   direction=NAMES     transfers in these directions (INPUT, OUTPUT,
+#                       CACHE_UPDATE)
+#
+# e.g.: --filter "time=3600:5400 category=blast* reason=SUCCESS,DISCONNECTION"
+#
+# The lines of the log are checked before they are tokenized, from the fields
+# that decide them: the records of tasks of other categories, or outside the
+# --tasks-range, are never parsed, and neither are those of the workers, and
+# transfers, not selected.
+#
+# Logs are written in time order, so reading stops at the first line after
+# the end of the time window, and the tables are those of a log that ends
+# there. Before the window, lines are only split: the records of tasks that
+# are done before the window are dropped (also those that follow their DONE,
+# such as the LIBRARY STARTED of a library), and so are transfers. The
+# records of the tasks that are still running when the window starts, and the
+# records of the workers, are kept, and parsed (in their order in the log)
+# once the window starts, so that the rows of the tables that overlap the
+# window are the same as when parsing the whole log.
+#
+# The reason, worker, and host terms, and the start of the time window, are
+# then applied to the rows of the tables, before assigning the slots of the
+# tasks.
+
+from fnmatch import fnmatchcase
+import math
+import numpy as np
+
+from vine_txn import tokenize
+
+keys = ["time", "category", "worker", "host", "reason", "direction"]
+
+
+class TxnFilter:
+    def __init__(self, spec=None, check_task=None):
+        # check_task: function of the task id, False to skip its records
+        # (the --tasks-range of ParseTxn).
+        self.spec = spec
+        self.check_task = check_task
+        self.start = -math.inf
+        self.end = math.inf
+        self.categories = None
+        self.workers = None
+        self.hosts = None
+        self.reasons = None
+        self.directions = None
+
+        for term in (spec or "").split():
+            (key, sep, values) = term.partition("=")
+            if key not in keys or not sep:
+                raise ValueError(f"filter terms are key=values, with key one of {', '.join(keys)}: {term}")
+            if key == "time":
+                (start, sep, end) = values.partition(":")
+                if not sep:
+                    raise ValueError(f"time filter is START:END: {term}")
+                self.start = float(start) if start else -math.inf
+                self.end = float(end) if end else math.inf
+            else:
+                setattr(self, {"category": "categories", "worker": "workers", "host": "hosts",
+                               "reason": "reasons", "direction": "directions"}[key], values.split(","))
+
+        # state of the lines read so far
+        self.manager = None       # (pid, origin) of the current manager
+        self.number = 0           # lines read
+        self.skipped_tasks = set()
+        self.worker_selected = {}
+        self.before = self.start > -math.inf
+        self.ended = False
+        self.common = []          # (number, line) before the window, besides tasks
+        self.task_lines = {}      # task_id -> [(number, line)] before the window
+
+    def active(self):
+        return bool(self.spec) or self.check_task is not None
+
+    def selects_workers(self):
+        return self.workers is not None or self.hosts is not None
+
+    def match_worker(self, worker_id, hostport):
+        if self.workers is not None and not any(fnmatchcase(worker_id, w) for w in self.workers):
+            return False
+        if self.hosts is not None and not any(fnmatchcase(str(hostport), h) for h in self.hosts):
+            return False
+        return True
+
+    def lines(self, lines):
+        # the lines of the log that pass the filter, in order
+        if not self.active():
+            yield from lines
+            return
+        if self.ended:
+            return
+
+        timed = self.start > -math.inf or self.end < math.inf
+        for line in lines:
+            number = self.number
+            self.number += 1
+
+            fields = line.split(maxsplit=4)
+            if len(fields) < 4:
+                if not self.before:
+                    yield line
+                continue
+            subject = fields[2]
+
+            if subject == "MANAGER":
+                self.manager_line(line)
+
+            if timed and self.manager and fields[1] == self.manager[0]:
+                try:
+                    t = float(fields[0])/1000000 - self.manager[1]
+                except ValueError:
+                    t = None
+                if t is not None and t >= self.end:
+                    self.ended = True
+                    yield from self.flush()
+                    return
+                if self.before and t is not None and t >= self.start:
+                    yield from self.flush()
+
+            if not self.keep(fields, line):
+                continue
+
+            if not self.before:
+                yield line
+            elif subject in ("TASK", "LIBRARY"):
+                self.task_lines.setdefault(fields[3], []).append((number, line))
+                if subject == "TASK" and len(fields) > 4 and fields[4].startswith("DONE"):
+                    # done before the window, and so are its later records
+                    del self.task_lines[fields[3]]
+                    self.skipped_tasks.add(fields[3])
+            elif subject == "WORKER" and len(fields) > 4 and fields[4].startswith(("TRANSFER", "CACHE_UPDATE")):
+                pass
+            elif subject == "MANAGER" and self.manager is None:
+                # the manager ended before the window
+                self.common = []
+                self.task_lines = {}
+            elif subject != "CATEGORY":
+                self.common.append((number, line))
+
+        if self.before:
+            # the log ended before the window
+            yield from self.flush()
+
+    def manager_line(self, line):
+        event = tokenize(line)
+        if not event:
+            return
+        if event.event == "START":
+            self.manager = (event.manager_pid, event.time)
+            self.skipped_tasks = set()
+            self.worker_selected = {}
+        elif event.event == "END" and self.manager and event.manager_pid == self.manager[0]:
+            self.manager = None
+
+    def keep(self, fields, line):
+        # False for lines whose records are filtered out
+        subject = fields[2]
+        if subject in ("TASK", "LIBRARY"):
+            task_id = fields[3]
+            if task_id in self.skipped_tasks:
+                return False
+            if self.check_task is not None:
+                try:
+                    if not self.check_task(int(task_id)):
+                        self.skipped_tasks.add(task_id)
+                        return False
+                except ValueError:
+                    return True
+            if self.categories is not None and subject == "TASK" and len(fields) > 4 and fields[4].startswith("WAITING "):
+                category = fields[4].split(maxsplit=2)[1]
+                if not any(fnmatchcase(category, c) for c in self.categories):
+                    self.skipped_tasks.add(task_id)
+                    return False
+        elif subject == "WORKER":
+            worker_id = fields[3]
+            rest = fields[4] if len(fields) > 4 else ""
+            if self.selects_workers():
+                if "CONNECTION" in rest and not rest.startswith(("TRANSFER", "CACHE_UPDATE")):
+                    event = tokenize(line)
+                    if event and event.event == "CONNECTION":
+                        self.worker_selected[worker_id] = self.match_worker(worker_id, event.arg)
+                if not self.worker_selected.get(worker_id, True):
+                    return False
+            if self.directions is not None:
+                if rest.startswith("CACHE_UPDATE"):
+                    return "CACHE_UPDATE" in self.directions
+                if rest.startswith("TRANSFER"):
+                    return rest.split(maxsplit=2)[1] in self.directions
+        return True
+
+    def flush(self):
+        # lines kept from before the window, in their order in the log
+        self.before = False
+        kept = self.common + [x for lines in self.task_lines.values() for x in lines]
+        (self.common, self.task_lines) = ([], {})
+        for (_, line) in sorted(kept, key=lambda x: x[0]):
+            yield line
+
+    def worker_mask(self, worker_ids, workers_df):
+        # rows of worker_ids that are of selected workers, with their
+        # hostports from the workers table.
+        selected = {w for (w, h) in zip(workers_df["worker_id"], workers_df["hostport"])
+                    if isinstance(w, str) and self.match_worker(w, h)}
+        return worker_ids.isin(selected).to_numpy()
+
+    def select_tasks(self, tasks_df, workers_df):
+        keep = np.ones(len(tasks_df), dtype=bool)
+        if self.start > -math.inf:
+            ends = tasks_df[["RETRIEVED", "DONE", "DISCONNECTION", "time_worker_end"]].astype(float).max(axis=1)
+            keep &= ~(ends < self.start).to_numpy()
+        if self.reasons is not None:
+            keep &= tasks_df["reason"].isin(self.reasons).to_numpy()
+        if self.selects_workers():
+            keep &= self.worker_mask(tasks_df["worker_id"], workers_df)
+        return tasks_df[keep]
+
+    def select_workers(self, workers_df):
+        keep = np.ones(len(workers_df), dtype=bool)
+        if self.start > -math.inf:
+            keep &= ~(workers_df["DISCONNECTION"].astype(float) < self.start).to_numpy()
+        if self.selects_workers():
+            keep &= self.worker_mask(workers_df["worker_id"], workers_df)
+        return workers_df[keep]
+
+    def select_transfers(self, transfers_df, workers_df):
+        keep = np.ones(len(transfers_df), dtype=bool)
+        if self.start > -math.inf:
+            keep &= ~(transfers_df["time"].astype(float) < self.start).to_numpy()
+        if self.selects_workers():
+            keep &= self.worker_mask(transfers_df["worker_id"], workers_df)
+        return transfers_df[keep]
@@ -0,0 +1,59 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Live view of a transaction log that is still being written.
+#
+# The ParseTxn object keeps its state and the position in the log between
+# refreshes, so each refresh only parses the lines appended since the last
+# one, and only converts the rows of the tables that these lines created or
+# changed, placing only their attempts in slots (see Manager.update_tables).
+# Attempts keep their slot across refreshes. The plot is then redrawn on the
+# same figure, from the updated tables: in a window when displaying, or by
+# writing the output file again.
+
+import time
+from vine_lazy import plt
+
+
+def redraw(plot, managers):
+    plot.managers = managers
+    plot.legend = dict(plot.default_legend)
+    for s in plot.subs.flat:
+        s.clear()
+    plot.display_plot()
+
+
+def follow(parser, plot_class, opts):
+    # parser: ParseTxn created with follow=True.
+    # plot_class: TxnPlot subclass, with opts as for the plot scripts.
+    displaying = opts.display or not opts.output
+
+    def wait():
+        if displaying and plt.get_fignums():
+            plt.pause(opts.interval)
+        else:
+            time.sleep(opts.interval)
+
+    try:
+        while not parser.tables_ready():
+            wait()
+            parser.update()
+
+        if displaying:
+            # do not block on plt.show() while following
+            plt.ion()
+        plot = plot_class(parser.managers, opts)
+
+        # follow until the window is closed, or until the managers end when
+        # writing to a file.
+        while True:
+            wait()
+            if displaying and not plt.fignum_exists(plot.fig.number):
+                break
+            if parser.update():
+                redraw(plot, parser.managers)
+            elif not displaying and not parser.cm:
+                break
+    except KeyboardInterrupt:
+        pass
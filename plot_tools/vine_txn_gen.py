@@ -0,0 +1,320 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Generator of synthetic transaction logs, to measure how the tools scale with
+# logs larger than the ones of the experiments.
+#
+# A small discrete event simulation of a manager with workers: all the tasks
+# are submitted at the start, and dispatched in order to the first free core.
+# Each attempt may fail and be retried with a larger allocation, or lose its
+# worker, which disconnects and is replaced by a new worker. Each task fetches
+# some files from the manager (TRANSFER INPUT), some files shared by all tasks
+# that are cached at the worker the first time they are needed (CACHE_UPDATE),
+# and sends its output back (TRANSFER OUTPUT). Some workers may run a library.
+#
+# Events are processed in order of time, and lines are written as they are
+# processed, so the log is in order without sorting it, and only the events
+# already scheduled are kept in memory. The same seed and options always
+# generate the same log.
+#
+# Running the program:
+#   python vine_txn_gen.py <output> [--tasks 10000] [--workers 100] [--seed 0] ...
+
+import argparse
+import heapq
+import json
+import random
+from collections import deque
+from functools import lru_cache
+
+header = """\
+# time manager_pid MANAGER manager_pid START|END time_from_origin
+# time manager_pid WORKER worker_id CONNECTION host:port
+# time manager_pid WORKER worker_id DISCONNECTION (UNKNOWN|IDLE_OUT|FAST_ABORT|FAILURE|STATUS_WORKER|EXPLICIT)
+# time manager_pid WORKER worker_id RESOURCES {resources}
+# time manager_pid WORKER worker_id CACHE_UPDATE filename size_in_mb wall_time_us start_time_us
+# time manager_pid WORKER worker_id TRANSFER (INPUT|OUTPUT) filename size_in_mb wall_time_us start_time_us
+# time manager_pid CATEGORY name MAX {resources_max_per_task}
+# time manager_pid CATEGORY name MIN {resources_min_per_task_per_worker}
+# time manager_pid CATEGORY name FIRST (FIXED|MAX|MIN_WASTE|MAX_THROUGHPUT) {resources_requested}
+# time manager_pid TASK task_id WAITING category_name (FIRST_RESOURCES|MAX_RESOURCES) attempt_number {resources_requested}
+# time manager_pid TASK task_id RUNNING worker_id (FIRST_RESOURCES|MAX_RESOURCES) {resources_allocated}
+# time manager_pid TASK task_id WAITING_RETRIEVAL worker_id
+# time manager_pid TASK task_id RETRIEVED (SUCCESS|UNKNOWN|INPUT_MISSING|OUTPUT_MISSING|STDOUT_MISSING|SIGNAL|RESOURCE_EXHAUSTION|MAX_RETRIES|MAX_END_TIME|MAX_WALL_TIME|FORSAKEN) {limits_exceeded} {resources_measured}
+# time manager_pid TASK task_id DONE (SUCCESS|UNKNOWN|INPUT_MISSING|OUTPUT_MISSING|STDOUT_MISSING|SIGNAL|RESOURCE_EXHAUSTION|MAX_RETRIES|MAX_END_TIME|MAX_WALL_TIME|FORSAKEN) exit_code
+# time manager_pid LIBRARY library_id (WAITING|SENT|STARTED|FAILURE) worker_id
+"""
+
+defaults = {"tasks": 10000,
+            "workers": 100,
+            "cores": 4,
+            "categories": 1,
+            "duration": 30.0,       # mean seconds of execution
+            "retry_rate": 0.0,      # probability that an attempt exhausts its resources and is retried
+            "max_attempts": 3,
+            "disconnect_rate": 0.0, # probability that the worker of an attempt fails while running it
+            "libraries": 0,         # workers that run a library
+            "inputs": 1,            # files sent by the manager to each task
+            "cached": 1,            # files shared by all the tasks, fetched once per worker
+            "files": 10,            # distinct shared files
+            "bandwidth": 100.0,     # MB/s of each transfer
+            "seed": 0}
+
+
+def resources(cores, memory, disk, gpus=None):
+    r = {"memory": [memory, "MB"], "disk": [disk, "MB"]}
+    if gpus is not None:
+        r["gpus"] = [gpus, "gpus"]
+    r["cores"] = [cores, "cores"]
+    return r
+
+
+@lru_cache(maxsize=None)
+def resources_json(cores, memory, disk, gpus=None):
+    return json.dumps(resources(cores, memory, disk, gpus), separators=(",", ":"))
+
+
+def report(times, values=None):
+    # resources json of the task reports, with the times in seconds since the epoch
+    r = {k: [round(v, 6), "s"] for (k, v) in times.items()}
+    r.update(values or {})
+    return json.dumps(r, separators=(",", ":"))
+
+
+class Generator:
+    def __init__(self, out, **options):
+        self.out = out
+        self.o = dict(defaults, **options)
+        self.rng = random.Random(self.o["seed"])
+        self.pid = 1000 + self.rng.randrange(1000000)
+        self.origin = 1680000000.0
+        self.now = self.origin
+
+        # (time, sequence, callback, args), the sequence keeps events at the same time in order of scheduling
+        self.events = []
+        self.sequence = 0
+        self.lines = []
+
+        self.queue = deque()    # (task_id, attempt_number) waiting to be dispatched
+        self.free = deque()     # worker of each free core
+        self.workers = {}       # connected workers: worker -> {"running": {task_id: attempt}, "cached": files, "libraries": task_ids}
+        self.next_worker = 0
+        self.done = 0
+        self.task_ids = 0
+
+    def write(self, time, subject, target, rest):
+        self.lines.append(f"{round(time * 1e6)} {self.pid} {subject} {target} {rest}\n")
+        if len(self.lines) >= 10000:
+            self.flush()
+
+    def flush(self):
+        self.out.write("".join(self.lines))
+        self.lines = []
+
+    def at(self, time, callback, *args):
+        self.sequence += 1
+        heapq.heappush(self.events, (time, self.sequence, callback, args))
+
+    def duration(self, mean):
+        return self.rng.lognormvariate(0, 0.5) * mean / 1.133   # mean of lognormal(0, 0.5) is 1.133
+
+    def worker_name(self):
+        self.next_worker += 1
+        return f"worker-{self.rng.getrandbits(128):032x}"
+
+    def run(self):
+        o = self.o
+        self.out.write(header)
+        self.write(self.now, "MANAGER", self.pid, "START 0")
+
+        for task_id in range(1, o["tasks"] + 1):
+            self.now += 1e-5
+            self.waiting(task_id, 1)
+        self.task_ids = o["tasks"]
+
+        for i in range(o["workers"]):
+            self.at(self.now + 1 + i * 0.01, self.connect, i < o["libraries"])
+
+        while self.events and self.done < o["tasks"]:
+            (self.now, _, callback, args) = heapq.heappop(self.events)
+            callback(*args)
+
+        # transfers of the last tasks may still be scheduled
+        while self.events:
+            (self.now, _, callback, args) = heapq.heappop(self.events)
+            if callback == self.worker_line:
+                callback(*args)
+
+        self.now += 0.1
+        for (worker, w) in self.workers.items():
+            for library in w["libraries"]:
+                self.write(self.now, "TASK", library, "DONE UNKNOWN  -1 ")
+            self.now += 1e-4
+            self.write(self.now, "WORKER", worker, "DISCONNECTION EXPLICIT")
+        self.write(self.now, "MANAGER", self.pid, f"END {round((self.now - self.origin) * 1e6)}")
+        self.flush()
+
+    def category(self, task_id):
+        return f"category-{task_id % self.o['categories']}" if self.o["categories"] > 1 else "default"
+
+    def waiting(self, task_id, attempt):
+        mode = "FIRST_RESOURCES" if attempt == 1 else "MAX_RESOURCES"
+        requested = resources_json(1, 1000 * attempt, 1000 * attempt)
+        self.write(self.now, "TASK", task_id, f"WAITING {self.category(task_id)} {mode} {attempt} {requested}")
+        self.queue.append((task_id, attempt))
+
+    def worker_line(self, worker, subject, target, rest):
+        # lines written when a transfer (or the start of a library) of the
+        # worker completes, dropped if the worker disconnected before
+        if worker in self.workers:
+            self.write(self.now, subject, target, rest)
+
+    def connect(self, with_library=False):
+        o = self.o
+        worker = self.worker_name()
+        self.workers[worker] = {"running": {}, "cached": set(), "libraries": []}
+        host = f"10.{self.next_worker // 65536 % 256}.{self.next_worker // 256 % 256}.{self.next_worker % 256}:{9000 + self.next_worker % 1000}"
+        self.write(self.now, "WORKER", worker, f"CONNECTION {host}")
+        self.write(self.now, "WORKER", worker, "RESOURCES " + resources_json(o["cores"], 4000 * o["cores"], 10000 * o["cores"]))
+
+        if with_library:
+            self.task_ids += 1
+            library = self.task_ids
+            self.write(self.now, "TASK", library, f"WAITING default FIRST_RESOURCES 1 {resources_json(1, 0, 0)}")
+            self.write(self.now, "TASK", library, f"RUNNING {worker}  FIRST_RESOURCES {resources_json(1, 0, 0, 0)}")
+            self.write(self.now, "LIBRARY", library, f"SENT {worker}")
+            self.at(self.now + self.duration(2), self.worker_line, worker, "LIBRARY", library, f"STARTED {worker}")
+            self.workers[worker]["libraries"].append(library)
+
+        for _ in range(o["cores"]):
+            self.free.append(worker)
+        self.dispatch()
+
+    def dispatch(self):
+        while self.queue and self.free:
+            worker = self.free.popleft()
+            if worker not in self.workers:
+                continue    # core of a worker that disconnected
+            (task_id, attempt) = self.queue.popleft()
+            self.start(worker, task_id, attempt)
+
+    def start(self, worker, task_id, attempt):
+        o = self.o
+        w = self.workers[worker]
+        w["running"][task_id] = attempt
+
+        # inputs sent by the manager, one after the other
+        commit_start = self.now
+        t = commit_start + 1e-4
+        input_mb = 0
+        for i in range(o["inputs"]):
+            size = self.rng.uniform(0.1, 10)
+            wall = size / o["bandwidth"]
+            self.at(t + wall, self.worker_line, worker, "WORKER", worker, f"TRANSFER INPUT input-{task_id}-{i} {round(size * 1e6)} {round(wall * 1e6)} {round(t * 1e6)}")
+            t += wall
+            input_mb += size
+        commit_end = t
+
+        times = {"time_commit_start": commit_start, "time_commit_end": commit_end, "time_input_mgr": commit_end - commit_start}
+        allocated = resources(1, 1000 * attempt, 1000 * attempt, 0)
+        self.write(self.now, "TASK", task_id, f"RUNNING {worker}  {'FIRST_RESOURCES' if attempt == 1 else 'MAX_RESOURCES'} "
+                   + report(times, {"size_input_mgr": [round(input_mb, 6), "MB"], **allocated}))
+
+        # shared files fetched by the worker the first time a task needs them
+        fetched = t
+        for _ in range(o["cached"]):
+            f = self.rng.randrange(o["files"])
+            if f in w["cached"]:
+                continue
+            w["cached"].add(f)
+            size = 100 + 10 * f
+            wall = self.duration(size / o["bandwidth"])
+            self.at(fetched + wall, self.worker_line, worker, "WORKER", worker, f"CACHE_UPDATE url-shared-{f} {round(size * 1e6)} {round(wall * 1e6)} {round(fetched * 1e6)}")
+            fetched += wall
+
+        worker_start = fetched + 1e-3
+        worker_end = worker_start + self.duration(o["duration"])
+
+        if self.rng.random() < o["disconnect_rate"]:
+            self.at(self.rng.uniform(self.now, worker_end), self.disconnect, worker)
+
+        failed = attempt < o["max_attempts"] and self.rng.random() < o["retry_rate"]
+        self.at(worker_end + 1e-3, self.finish, worker, task_id, attempt,
+                {"time_worker_start": worker_start, "time_worker_end": worker_end, **times}, failed)
+
+    def finish(self, worker, task_id, attempt, times, failed):
+        if worker not in self.workers:
+            return  # lost with its worker
+        self.write(self.now, "TASK", task_id, f"WAITING_RETRIEVAL {worker} ")
+
+        size = 0.0 if failed else self.rng.uniform(0.01, 1)
+        wall = size / self.o["bandwidth"]
+        if not failed:
+            self.at(self.now + wall, self.worker_line, worker, "WORKER", worker, f"TRANSFER OUTPUT output-{task_id} {round(size * 1e6)} {round(wall * 1e6)} {round(self.now * 1e6)}")
+        times = dict(times, time_output_mgr=wall)
+        self.at(self.now + wall + 1e-4, self.retrieved, worker, task_id, attempt, times, failed, size)
+
+    def retrieved(self, worker, task_id, attempt, times, failed, size):
+        if worker not in self.workers:
+            return
+        del self.workers[worker]["running"][task_id]
+
+        measured = report(times, {"size_output_mgr": [round(size, 6), "MB"]})
+        if failed:
+            self.write(self.now, "TASK", task_id, f"RETRIEVED RESOURCE_EXHAUSTION  0  {{\"memory\":[{1000 * attempt},\"MB\"]}} {measured}")
+            self.waiting(task_id, attempt + 1)
+        else:
+            self.write(self.now, "TASK", task_id, f"RETRIEVED SUCCESS  0  {{}} {measured}")
+            self.write(self.now, "TASK", task_id, "DONE SUCCESS  0 ")
+            self.done += 1
+
+        self.free.append(worker)
+        self.dispatch()
+
+    def disconnect(self, worker):
+        if worker not in self.workers:
+            return
+        w = self.workers.pop(worker)
+        self.write(self.now, "WORKER", worker, "DISCONNECTION FAILURE")
+
+        # the tasks of the worker go back to the queue, first in line
+        for (task_id, attempt) in sorted(w["running"].items(), reverse=True):
+            self.waiting(task_id, attempt + 1)
+            self.queue.appendleft(self.queue.pop())
+
+        # a library of the worker is lost with it
+        for library in w["libraries"]:
+            self.write(self.now, "LIBRARY", library, f"FAILURE {worker}")
+            self.write(self.now, "TASK", library, "DONE UNKNOWN  -1 ")
+
+        self.at(self.now + 5 + self.rng.uniform(0, 5), self.connect, bool(w["libraries"]))
+
+
+def generate(output, **options):
+    # writes a synthetic log to output. See defaults for the options.
+    with open(output, "w") as out:
+        Generator(out, **options).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write a synthetic transaction log.')
+    parser.add_argument('output', help='path of the log to write')
+    parser.add_argument('--tasks', type=int, help='number of tasks', default=defaults["tasks"])
+    parser.add_argument('--workers', type=int, help='number of workers connected at the same time', default=defaults["workers"])
+    parser.add_argument('--cores', type=int, help='cores of each worker, one task per core', default=defaults["cores"])
+    parser.add_argument('--categories', type=int, help='number of task categories', default=defaults["categories"])
+    parser.add_argument('--duration', type=float, help='mean seconds of execution of a task', default=defaults["duration"])
+    parser.add_argument('--retry-rate', type=float, help='probability that an attempt exhausts its resources and is retried', default=defaults["retry_rate"])
+    parser.add_argument('--max-attempts', type=int, help='attempts of a task before it always succeeds', default=defaults["max_attempts"])
+    parser.add_argument('--disconnect-rate', type=float, help='probability that the worker of an attempt fails while running it', default=defaults["disconnect_rate"])
+    parser.add_argument('--libraries', type=int, help='number of workers that run a library', default=defaults["libraries"])
+    parser.add_argument('--inputs', type=int, help='files sent by the manager to each task', default=defaults["inputs"])
+    parser.add_argument('--cached', type=int, help='shared files needed by each task, fetched once per worker', default=defaults["cached"])
+    parser.add_argument('--files', type=int, help='number of distinct shared files', default=defaults["files"])
+    parser.add_argument('--bandwidth', type=float, help='MB/s of each transfer', default=defaults["bandwidth"])
+    parser.add_argument('--seed', type=int, help='seed of the random choices', default=defaults["seed"])
+    args = parser.parse_args()
+
+    options = vars(args)
+    generate(options.pop("output"), **options)
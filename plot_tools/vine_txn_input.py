@@ -0,0 +1,232 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Opens transaction logs that are compressed, or inside tar archives, as if
+# they were plain files.
+#
+#   log                      plain file
+#   log.gz log.bz2 log.xz    decompressed with the python standard library
+#   log.zst                  decompressed with the zstandard module
+#   archive.tar.gz:member    member of a tar archive, compressed or not
+#   archive.tar.gz           the only file in a tar archive
+#
+# Compression is detected from the first bytes of the file, and tar archives
+# from their name. The log is decompressed as it is read, in the chunks asked
+# by the reader, so nothing is extracted to disk and memory does not grow with
+# the size of the log. When more than one cpu is available, decompression
+# runs in a background thread that stays a few chunks ahead of the reader, so
+# that it overlaps tokenizing the lines (zlib, bz2, lzma, and zstandard
+# release the GIL while decompressing).
+#
+# Running the program lists the members of an archive, or writes a log to
+# stdout decompressed:
+#   python vine_txn_input.py <log> [--list]
+
+from pathlib import Path
+import argparse
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import shutil
+import sys
+import tarfile
+import threading
+
+# magic bytes of the compression formats
+formats = {b"\x1f\x8b": "gz", b"BZh": "bz2", b"\xfd7zXZ\x00": "xz", b"\x28\xb5\x2f\xfd": "zst"}
+
+tar_suffixes = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar.zst", ".tzst")
+
+# chunks decompressed ahead of the reader by the background thread
+READ_AHEAD = 4
+
+
+def split_member(log):
+    # returns (path, member) of log. member is None for logs that are not
+    # inside an archive, and "" for archives given without a member.
+    log = str(log)
+    if os.path.exists(log):
+        return (log, "" if log.endswith(tar_suffixes) else None)
+    # the archive is the shortest prefix before a ":" that is a file
+    start = 0
+    while (i := log.find(":", start)) >= 0:
+        if os.path.isfile(log[:i]):
+            return (log[:i], log[i+1:])
+        start = i + 1
+    return (log, None)
+
+
+def compression(path):
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for (magic, name) in formats.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def decompress(f, name):
+    if name == "gz":
+        return gzip.GzipFile(fileobj=f)
+    if name == "bz2":
+        return bz2.BZ2File(f)
+    if name == "xz":
+        return lzma.LZMAFile(f)
+    if name == "zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("reading zstandard compressed logs needs the zstandard module (pip install zstandard)") from None
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    return f
+
+
+def open_compressed(path):
+    name = compression(path)
+    return (decompress(open(path, "rb"), name), name is not None)
+
+
+def members(path):
+    # regular files in the archive at path, in order
+    (f, _) = open_compressed(path)
+    with f, tarfile.open(fileobj=f, mode="r|") as tar:
+        return [m.name for m in tar if m.isfile()]
+
+
+class Member(io.RawIOBase):
+    # a member of a tar archive, read in the order of the archive without
+    # seeking, so that compressed archives are decompressed only once.
+    def __init__(self, path, member):
+        (self._file, _) = open_compressed(path)
+        self._tar = tarfile.open(fileobj=self._file, mode="r|")
+        self._member = None
+        for m in self._tar:
+            if m.name == member and m.isfile():
+                self._member = self._tar.extractfile(m)
+                break
+        if self._member is None:
+            self.close()
+            raise FileNotFoundError(f"no file {member} in {path}")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._member.readinto(b)
+
+    def close(self):
+        if not self.closed:
+            self._tar.close()
+            self._file.close()
+        super().close()
+
+
+class ReadAhead(io.RawIOBase):
+    # reads f in a background thread, up to depth chunks ahead of the reader.
+    def __init__(self, f, chunk_size, depth=READ_AHEAD):
+        self._file = f
+        self._chunks = queue.Queue(depth)
+        self._chunk = memoryview(b"")
+        self._done = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read, args=(chunk_size,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # False if the reader stopped before item could be queued
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _read(self, chunk_size):
+        try:
+            while chunk := self._file.read(chunk_size):
+                if not self._put(chunk):
+                    return
+            self._put(b"")
+        except Exception as e:
+            self._put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._chunk and not self._done:
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                self._done = True
+                raise chunk
+            self._done = not chunk
+            self._chunk = memoryview(chunk)
+        n = min(len(b), len(self._chunk))
+        b[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._file.close()
+        super().close()
+
+
+def open_log(log, background=None, chunk_size=1 << 20):
+    # returns a binary file object with the contents of log, decompressed.
+    # background: decompress in a background thread. None decompresses in
+    # the background only when more than one cpu is available.
+    (path, member) = split_member(log)
+    if member == "":
+        files = members(path)
+        if len(files) != 1:
+            raise ValueError(f"{path} has {len(files)} files, choose one as {path}:<member>: {' '.join(files[:20])}")
+        member = files[0]
+
+    if member is not None:
+        (f, compressed) = (Member(path, member), True)
+    else:
+        (f, compressed) = open_compressed(path)
+
+    if background is None:
+        background = (os.cpu_count() or 1) > 1
+    if compressed and background:
+        f = ReadAhead(f, chunk_size)
+    return f
+
+
+def skip(f, offset):
+    # moves f forward to offset from its start, also when f cannot seek
+    if f.seekable():
+        f.seek(offset)
+        return
+    while offset > 0:
+        chunk = f.read(min(offset, 1 << 20))
+        if not chunk:
+            break
+        offset -= len(chunk)
+
+
+def log_file(log):
+    # the file on disk that holds log
+    return Path(split_member(log)[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write a compressed transaction log, or a member of an archive, to stdout.')
+    parser.add_argument('log', help='log file, compressed or not, or archive.tar.gz:member')
+    parser.add_argument('--list', action='store_true', help='list the files in the archive instead')
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(members(split_member(args.log)[0])))
+    else:
+        with open_log(args.log) as f:
+            shutil.copyfileobj(f, sys.stdout.buffer, 1 << 20)
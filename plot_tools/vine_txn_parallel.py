@@ -0,0 +1,348 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Parallel parsing of a transaction log, used by ParseTxn when jobs > 1.
+#
+# The state that depends on the order of the log is kept per task (its
+# attempts), and per worker (its hostport, and the tasks running on it). The
+# log is then parsed by a number of processes, each parsing only the TASK and
+# LIBRARY records of its share of the task ids, and the WORKER records of its
+# share of the worker ids. The MANAGER records are parsed by every process,
+# and so are worker disconnections, which each process applies to its own
+# tasks on the worker.
+#
+# Uncompressed logs read without a filter are first split into byte ranges
+# that start and end at lines. A process per range reads it, and writes each
+# line to the files of the processes that parse it, so that every line is
+# read and split only once. The parsing processes then read their files, in
+# the order of the ranges. Other logs are read whole by every parsing process,
+# as decompressing and filtering depend on the lines before.
+#
+# Each process returns its rows with the number of the line that created
+# them. Merging the processes puts the rows in the order of those lines,
+# which is the order in which a sequential parse creates them, so that the
+# tables are the same as with one job. If a process dies, or the processes
+# disagree, the log is parsed sequentially after a warning; errors parsing the
+# log are raised as with one job.
+#
+# Running the program compares the tables, and the time, of a sequential and
+# a parallel parse:
+#   python vine_txn_parallel.py <log> [--jobs N]
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zlib
+import numpy as np
+
+from vine_txn import CHUNK_SIZE, LogReader, ParseTxn, tokenize
+from vine_txn_filter import TxnFilter
+from vine_txn_input import compression, split_member
+from vine_txn_store import MISSING_CODE
+
+stores = ["tasks_attempts", "worker_lifetime", "worker_transfers"]
+
+
+def task_owner(task_id, parts):
+    # None when the record is not a valid task id, and every process parses it
+    try:
+        return int(task_id) % parts
+    except ValueError:
+        return None
+
+
+def worker_owner(worker_id, parts, owners):
+    # the same in every process, unlike hash(). owners caches the owner of
+    # each worker id.
+    try:
+        return owners[worker_id]
+    except KeyError:
+        owners[worker_id] = zlib.crc32(worker_id.encode()) % parts
+        return owners[worker_id]
+
+
+def line_owner(fields, parts, owners):
+    # the process that parses the record of a line, from its fields split
+    # with maxsplit=4, or None when every process parses it
+    if len(fields) == 5:
+        if fields[2] in ("TASK", "LIBRARY"):
+            return task_owner(fields[3], parts)
+        if fields[2] == "WORKER" and "DISCONNECTION" not in fields[4]:
+            return worker_owner(fields[3], parts, owners)
+    return None
+
+
+def splittable(log):
+    # whether log is a file that can be read from any byte
+    return split_member(log)[1] is None and compression(log) is None
+
+
+def line_ranges(log, parts):
+    # [(start, end)] bytes of log, split in parts that start at lines
+    size = os.path.getsize(log)
+    bounds = [0]
+    with open(log, "rb") as f:
+        for k in range(1, parts):
+            f.seek(max(size * k // parts, bounds[-1]))
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def range_lines(log, start, end, chunk_size=CHUNK_SIZE):
+    # the lines of log in bytes [start, end)
+    with open(log, "rb") as f:
+        f.seek(start)
+        partial = b""
+        while start < end:
+            chunk = f.read(min(chunk_size, end - start))
+            if not chunk:
+                break
+            start += len(chunk)
+            (complete, newline, partial) = (partial + chunk).rpartition(b"\n")
+            if newline:
+                yield from complete.decode().split("\n")
+        if partial:
+            yield partial.decode()
+
+
+def split_range(log, start, end, index, parts, directory):
+    # writes the lines of log in bytes [start, end) to <directory>/<index>.<part>
+    # for the processes that parse them, and their numbers, from index << 40,
+    # to <directory>/<index>.<part>.numbers.
+    owners = {}
+    outputs = [([], array("q")) for _ in range(parts)]
+    files = [(open(os.path.join(directory, f"{index}.{part}"), "w", newline=""),
+              open(os.path.join(directory, f"{index}.{part}.numbers"), "wb")) for part in range(parts)]
+    try:
+        for (number, line) in enumerate(range_lines(log, start, end), start=index << 40):
+            if not line or line.startswith("#"):
+                continue
+            owner = line_owner(line.split(maxsplit=4), parts, owners)
+            for (lines, numbers) in (outputs if owner is None else [outputs[owner]]):
+                lines.append(line)
+                numbers.append(number)
+            if number % 100000 == 0:
+                write_lines(files, outputs)
+        write_lines(files, outputs)
+    finally:
+        for (f, numbers) in files:
+            f.close()
+            numbers.close()
+
+
+def write_lines(files, outputs):
+    for ((f, numbers_file), (lines, numbers)) in zip(files, outputs):
+        if lines:
+            f.write("".join(line + "\n" for line in lines))
+            numbers.tofile(numbers_file)
+            lines.clear()
+            del numbers[:]
+
+
+def split_lines(directory, ranges, part):
+    # (number, line) of the lines of the process part, written by split_range
+    for index in range(ranges):
+        path = os.path.join(directory, f"{index}.{part}")
+        numbers = np.fromfile(path + ".numbers", dtype=np.int64).tolist()
+        with open(path, newline="") as f:
+            lines = f.read().split("\n")
+        yield from zip(numbers, lines)
+
+
+def parse_partition(parser_class, log, expand_waiting, tasks_range, filter_spec, part, parts, split=None):
+    # split: (directory, ranges) of the lines written by split_range, or None
+    # to read the whole log
+    p = parser_class.__new__(parser_class)
+    p._log = log
+    p._reader = LogReader(log)
+    p.managers = {}
+    p.cm = None
+    p.follow = False
+    p.jobs = 1
+    p.expand_waiting = expand_waiting
+    p.tasks_range = tasks_range
+    p.filter = TxnFilter(filter_spec, p.check_task_range if tasks_range != (1, None, 1) else None)
+    p.defer_tables = True
+
+    # every manager started in the log, in order, with the lines that created
+    # its rows, the line of its last termination time, and whether a
+    # sequential parse makes its tables.
+    started = []
+    lines = {}
+    owners = {}
+
+    if split:
+        numbered = split_lines(*split, part)
+    else:
+        numbered = enumerate(p.filter.lines(p._reader.lines()))
+    for (number, line) in numbered:
+        fields = line.split(maxsplit=4)
+        only_disconnection = False
+        if len(fields) == 5:
+            if fields[2] in ("TASK", "LIBRARY"):
+                if task_owner(fields[3], parts) not in (None, part):
+                    continue
+            elif fields[2] == "WORKER" and worker_owner(fields[3], parts, owners) != part:
+                if "DISCONNECTION" not in fields[4]:
+                    continue
+                only_disconnection = True
+
+        event = tokenize(line)
+        if not event:
+            continue
+        (t, manager_pid, subject, target, name, arg) = event
+
+        cm = p.cm
+        if cm and cm.pid == manager_pid:
+            t -= cm.origin
+
+        if only_disconnection:
+            if cm and cm.pid == manager_pid:
+                cm.termination = t
+                lines[id(cm)]["termination_line"] = number
+            if name == "DISCONNECTION" and target.startswith("worker-"):
+                p._disconnect_tasks(t, target)
+            continue
+
+        sizes = [len(getattr(cm, s)) for s in stores] if cm else None
+        p._parse_event(t, manager_pid, subject, target, name, arg)
+
+        if cm:
+            if cm.pid == manager_pid:
+                lines[id(cm)]["termination_line"] = number
+            for (s, size) in zip(stores, sizes):
+                grown = len(getattr(cm, s)) - size
+                if grown > 0:
+                    lines[id(cm)][s].extend([number] * grown)
+            if subject == "MANAGER" and name == "END":
+                lines[id(cm)]["tables"] = True
+        if p.cm is not cm and p.cm is not None:
+            started.append(p.cm)
+            lines[id(p.cm)] = {"termination_line": -1, "tables": False, **{s: array("q") for s in stores}}
+
+    if p.cm:
+        # END record missing, the tables are made at the end of the log
+        lines[id(p.cm)]["tables"] = True
+
+    return [{"pid": m.pid, "origin": m.origin, "termination": m.termination,
+             "stores": [getattr(m, s) for s in stores], **lines[id(m)]} for m in started]
+
+
+def merge_store(target, sources, rows):
+    # sources: ColumnStores of the processes, rows: the lines that created
+    # their rows. The rows of target are those of sources ordered by line.
+    columns = [list(s.data) for s in sources]
+    if any(c != columns[0] for c in columns):
+        raise ValueError("processes found different columns")
+    for name in columns[0]:
+        if name not in target.data:
+            target.add_column(name, sources[0].kinds[name])
+    if list(target.data) != columns[0]:
+        raise ValueError("processes found columns in a different order")
+
+    order = np.argsort(np.concatenate([np.frombuffer(r, dtype=np.int64) for r in rows]), kind="stable")
+    for name in columns[0]:
+        if target.kinds[name] == "str":
+            table = target.tables[name]
+            parts = []
+            for s in sources:
+                codes = np.array([table.intern(v) for v in s.tables[name].strings] + [MISSING_CODE], dtype=np.int64)
+                parts.append(codes[s.column(name)])
+            values = np.concatenate(parts)[order]
+            target.data[name] = array("q", values.tobytes())
+        else:
+            values = np.concatenate([s.column(name) for s in sources])[order]
+            target.data[name] = array("d", values.tobytes())
+    target.rows = len(order)
+
+
+def merge(manager_class, partitions, parser_filter=None):
+    # partitions: results of parse_partition, one per process. Returns the
+    # managers as (Manager, make_tables) in the order they started.
+    managers = []
+    for ms in zip(*partitions):
+        if len({(m["pid"], m["origin"]) for m in ms}) != 1:
+            raise ValueError("processes found different managers")
+        # the termination time is that of the last line of the manager
+        last = max(ms, key=lambda m: m["termination_line"])
+        manager = manager_class(last["pid"], last["origin"])
+        manager.termination = last["termination"]
+        manager.filter = parser_filter
+        for (i, s) in enumerate(stores):
+            merge_store(getattr(manager, s), [m["stores"][i] for m in ms], [m[s] for m in ms])
+        managers.append((manager, ms[0]["tables"]))
+    return managers
+
+
+def parse_parallel(parser, jobs):
+    # returns {pid: Manager} as ParseTxn would, or None if the processes
+    # failed and the log should be parsed sequentially.
+    log = parser._log
+    args = (type(parser), log, parser.expand_waiting, parser.tasks_range, parser.filter.spec)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+            if not parser.filter.active() and splittable(log):
+                with tempfile.TemporaryDirectory(prefix="vine_txn_parallel.") as directory:
+                    ranges = line_ranges(log, jobs)
+                    futures = [pool.submit(split_range, log, start, end, index, jobs, directory)
+                               for (index, (start, end)) in enumerate(ranges)]
+                    for f in futures:
+                        f.result()
+                    futures = [pool.submit(parse_partition, *args, part, jobs, (directory, len(ranges))) for part in range(jobs)]
+                    partitions = [f.result() for f in futures]
+            else:
+                futures = [pool.submit(parse_partition, *args, part, jobs) for part in range(jobs)]
+                partitions = [f.result() for f in futures]
+    except BrokenProcessPool as e:
+        print(f"a process of the parallel parse of {log} died ({e}), parsing it with one job", file=sys.stderr)
+        return None
+
+    try:
+        if len({len(p) for p in partitions}) != 1:
+            raise ValueError("processes found different numbers of managers")
+        started = merge(parser.manager_class, partitions, parser.filter if parser.filter.spec else None)
+    except ValueError as e:
+        print(f"parallel parse of {log} failed ({e}), parsing it with one job", file=sys.stderr)
+        return None
+
+    managers = {}
+    for (m, make_tables) in started:
+        if make_tables:
+            m.make_tables(parser.expand_waiting)
+        managers[m.pid] = m
+    return managers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the tables and time of a sequential and a parallel parse of a transaction log.')
+    parser.add_argument('log', help='transaction log')
+    parser.add_argument('--jobs', type=int, help='number of processes of the parallel parse', default=multiprocessing.cpu_count())
+    parser.add_argument('--expand-waiting', action='store_true', help='parse as with --expand-waiting of the plot scripts')
+    args = parser.parse_args()
+
+    results = []
+    for jobs in [1, args.jobs]:
+        t = time.perf_counter()
+        p = ParseTxn(args.log, args.expand_waiting, cache=False, jobs=jobs)
+        print(f"jobs {jobs:>3}: {time.perf_counter() - t:8.3f}s")
+        results.append(p.managers)
+
+    (sequential, parallel) = results
+    same = list(sequential) == list(parallel)
+    for (a, b) in zip(sequential.values(), parallel.values()):
+        same = same and a.termination == b.termination
+        for table in ["tasks", "workers", "transfers"]:
+            same = same and getattr(a, table).equals(getattr(b, table))
+    print("tables are the same" if same else "tables differ")
+    sys.exit(0 if same else 1)
@@ -0,0 +1,257 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Columnar storage for the records parsed from a transaction log.
+#
+# Each column is a typed array that grows one row at a time. Numbers are kept
+# as doubles with NaN marking a missing value. Strings (worker ids, hostports,
+# categories, ...) are interned in a StringTable and the column keeps only the
+# integer code of each string, with -1 marking a missing value. Tables are
+# converted to pandas DataFrames in one step, without building a python
+# object per row.
+
+from array import array
+import math
+import numpy as np
+import pandas as pd
+
+MISSING_CODE = -1
+
+
+class StringTable:
+    def __init__(self):
+        # string -> code
+        self.codes = {}
+        # code -> string
+        self.strings = []
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, value):
+        try:
+            return self.codes[value]
+        except KeyError:
+            code = len(self.strings)
+            self.codes[value] = code
+            self.strings.append(value)
+            return code
+
+    def lookup(self, code):
+        return self.strings[code] if code != MISSING_CODE else pd.NA
+
+    def decode(self, codes):
+        # the extra NA at the end is selected by MISSING_CODE
+        strings = np.empty(len(self.strings) + 1, dtype=object)
+        strings[:-1] = self.strings
+        strings[-1] = pd.NA
+        return strings[codes]
+
+
+class RowView:
+    # dictionary-like access to one row of a ColumnStore
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, name):
+        return self.store.get(self.row, name)
+
+    def __setitem__(self, name, value):
+        self.store.set(self.row, name, value)
+
+
+class ColumnStore:
+    # columns is a list of (name, kind), with kind one of "float", "int", or
+    # "str". Integers are stored as doubles, and converted to a nullable
+    # integer column when making the DataFrame. tables maps names of "str"
+    # columns to StringTables, so that tables can be shared among stores.
+    def __init__(self, columns, tables=None):
+        tables = tables or {}
+
+        self.kinds = {}
+        self.data = {}
+        self.tables = {}
+        self.missing = {}
+        self.rows = 0
+
+        # rows created or set since the last call to take_changed, or None
+        # when not tracked (see track_changes)
+        self.changed = None
+
+        for (name, kind) in columns:
+            self.add_column(name, kind, tables.get(name, None))
+
+    def __len__(self):
+        return self.rows
+
+    def add_column(self, name, kind, table=None):
+        self.kinds[name] = kind
+        if kind == "str":
+            self.tables[name] = table if table is not None else StringTable()
+            self.missing[name] = MISSING_CODE
+            self.data[name] = array("q", [MISSING_CODE]) * self.rows
+        else:
+            self.missing[name] = math.nan
+            self.data[name] = array("d", [math.nan]) * self.rows
+
+    def track_changes(self):
+        # record the rows that are created or set from now on, e.g., to update
+        # the tables while following a log.
+        self.changed = set()
+
+    def take_changed(self):
+        # sorted indices of the rows changed since the last call
+        rows = np.fromiter(self.changed, dtype=np.int64, count=len(self.changed))
+        rows.sort()
+        self.changed.clear()
+        return rows
+
+    def new_row(self):
+        missing = self.missing
+        for (name, column) in self.data.items():
+            column.append(missing[name])
+        self.rows += 1
+        if self.changed is not None:
+            self.changed.add(self.rows - 1)
+        return self.rows - 1
+
+    def append(self, values):
+        # values in the order of the columns
+        row = self.new_row()
+        for (name, value) in zip(self.data, values):
+            self.set(row, name, value)
+        return row
+
+    def row(self, row):
+        return RowView(self, row)
+
+    def get(self, row, name):
+        value = self.data[name][row]
+        if self.kinds[name] == "str":
+            return self.tables[name].lookup(value)
+        return pd.NA if math.isnan(value) else value
+
+    def set(self, row, name, value):
+        if self.changed is not None:
+            self.changed.add(row)
+        if name not in self.data:
+            self.add_column(name, "str" if isinstance(value, str) else "float")
+
+        table = self.tables.get(name, None)
+        if table is not None:
+            self.data[name][row] = MISSING_CODE if value is None or value is pd.NA else table.intern(value)
+        else:
+            try:
+                self.data[name][row] = value
+            except TypeError:
+                # None or pd.NA
+                self.data[name][row] = math.nan
+
+    def set_floats(self, row, names, values):
+        # values of numeric columns, with NaN for missing values
+        if self.changed is not None:
+            self.changed.add(row)
+        for (name, value) in zip(names, values):
+            try:
+                self.data[name][row] = value
+            except KeyError:
+                self.set(row, name, value)
+
+    def column(self, name):
+        # numpy view of the raw column: doubles, or codes for strings.
+        return np.frombuffer(self.data[name], dtype=np.int64 if self.kinds[name] == "str" else np.float64)
+
+    def to_frame(self, order=None):
+        # order: row indices in the order of the DataFrame, default as stored.
+        frame = {}
+        for name in self.data:
+            values = self.column(name)
+            if order is not None:
+                values = values[order]
+            kind = self.kinds[name]
+            if kind == "str":
+                values = self.tables[name].decode(values)
+            elif kind == "int":
+                values = pd.array(values, dtype="Int64")
+            else:
+                values = values.copy()
+            frame[name] = values
+        return pd.DataFrame(frame)
+
+
+class LiveTable:
+    # A table with one row per row of a ColumnStore, updated in place when
+    # following a log: only the rows that changed are written, and the
+    # DataFrame is selected from the rows kept, in their order in the store.
+    def __init__(self):
+        self.capacity = 0
+        self.columns = []
+        self.dtypes = {}
+        self.values = {}    # name -> numpy array indexed by store row
+        self.kept = np.zeros(0, dtype=bool)
+        self.frame = None   # last DataFrame made, while no row changes
+
+    def write(self, frame):
+        # frame: new values of some rows, indexed by their rows in the store.
+        # The rows are kept until discarded.
+        rows = frame.index.to_numpy(dtype=np.int64)
+        if len(rows) == 0:
+            return
+        self.frame = None
+        if rows.max() >= self.capacity:
+            self.grow(max(rows.max() + 1, 2*self.capacity))
+        for name in frame.columns:
+            series = frame[name]
+            if name not in self.values:
+                self.add_column(name, series.dtype)
+            elif series.notna().any():
+                # e.g., strings in a column that only had missing values
+                self.dtypes[name] = series.dtype
+            if self.values[name].dtype == object:
+                self.values[name][rows] = series.to_numpy(dtype=object)
+            else:
+                self.values[name][rows] = series.to_numpy(dtype=float, na_value=math.nan)
+        self.columns = list(frame.columns) + [c for c in self.columns if c not in frame]
+        self.kept[rows] = True
+
+    def discard(self, rows):
+        rows = rows[rows < self.capacity]
+        if self.kept[rows].any():
+            self.kept[rows] = False
+            self.frame = None
+
+    def add_column(self, name, dtype):
+        numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        self.dtypes[name] = dtype
+        self.values[name] = np.full(self.capacity, math.nan if numeric else None, dtype=float if numeric else object)
+
+    def grow(self, capacity):
+        extra = capacity - self.capacity
+        for (name, values) in self.values.items():
+            fill = np.full(extra, math.nan if values.dtype != object else None, dtype=values.dtype)
+            self.values[name] = np.concatenate([values, fill])
+        self.kept = np.concatenate([self.kept, np.zeros(extra, dtype=bool)])
+        self.capacity = capacity
+
+    def to_frame(self):
+        if self.frame is None:
+            rows = np.flatnonzero(self.kept)
+            frame = {}
+            for name in self.columns:
+                (values, dtype) = (self.values[name][rows], self.dtypes[name])
+                frame[name] = values if values.dtype == dtype else pd.array(values, dtype=dtype)
+            self.frame = pd.DataFrame(frame, index=pd.RangeIndex(len(rows)))
+        return self.frame
+
+
+def first_seen_order(keys):
+    # row indices that group rows with equal keys, groups in the order their
+    # key first appears, and rows within a group in their original order.
+    if len(keys) == 0:
+        return np.arange(0)
+    (_, first, inverse) = np.unique(keys, return_index=True, return_inverse=True)
+    return np.argsort(first[inverse], kind="stable")
@@ -0,0 +1,47 @@
+# Copyright (C) 2023- The University of Notre Dame
+# This software is distributed under the GNU General Public License.
+# See the file COPYING for details.
+
+# Decoding of the json objects of resources in a transaction log.
+#
+# Resources are written as {"name":[value,"units"],...}, in the WAITING,
+# RUNNING, and RETRIEVED records of tasks, and the RESOURCES records of
+# workers. Only a few of the names are used by the parser, and only their
+# values are kept, as floats with NaN for missing values, ready to be written
+# to the columns of a ColumnStore.
+#
+# Many of the objects repeat (e.g., the resources requested by the tasks of a
+# category), and the objects of RUNNING and RETRIEVED are read twice, once for
+# the resources and once for the task report. The decoded values are kept in a
+# bounded least-recently-used cache keyed by the text of the object, so that
+# each distinct object is decoded once while it is in the cache.
+
+from functools import lru_cache
+import json
+import math
+
+# objects kept decoded by each ValueDecoder
+CACHE_SIZE = 1 << 12
+
+
+def value(res):
+    # values of the form [value, "units"]. Missing and negative values are NaN.
+    if not res:
+        return math.nan
+    n = float(res[0])
+    if math.isnan(n) or n < 0:
+        return math.nan
+    else:
+        return n
+
+
+class ValueDecoder:
+    def __init__(self, names, cache_size=CACHE_SIZE):
+        self.names = tuple(names)
+        self.decode = lru_cache(maxsize=cache_size)(self._decode)
+
+    def _decode(self, blob):
+        # returns {name: value} for every name, NaN for the missing ones. The
+        # dictionary is shared by every caller with the same blob.
+        from_json = json.loads(blob)
+        return {name: value(from_json.get(name, None)) for name in self.names}